@@ -0,0 +1,286 @@
+"""
+Checks that a change to the frame pipeline keeps the geometry of the frames, together with how it changes the runtime.
+
+    python benchmarks/regression.py record --blender /path/to/blender
+    python benchmarks/regression.py check --blender /path/to/blender
+
+Every case is an SVG with create_eyeglasses_from_svg arguments, formed in a background Blender process.
+record keeps the frame of every case as a golden STL in benchmarks/golden, and its runtime, surface area,
+volume and the commit it was formed on in golden.json.
+check forms the cases again and compares every frame with its golden frame by mesh_distance.compare_meshes,
+the symmetric Hausdorff distance between the surfaces and the relative change of the area and the volume,
+next to the ratio of the runtimes. A case fails when its frame strays further than --max-distance,
+or its area or volume changes by more than --max-change.
+The distances are measured between samples of the surfaces, so --max-distance has to stay above
+the sampling error of --sample-spacing for frames that were only triangulated differently to pass.
+
+pipelines forms every case with both the operators and the bmesh pipeline of create_eyeglasses_from_svg
+and compares the two frames the same way, since the bmesh pipeline is meant to form the same frame.
+
+    python benchmarks/regression.py pipelines --blender /path/to/blender
+
+The default cases are synthetic SVGs of benchmarks/synthetic_svg.py. Other cases are given with --cases,
+a JSON list of {"name": ..., "svg": ... or "points": ..., "parameters": {...}},
+SVG paths relative to the JSON file.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIRECTORY = os.path.dirname(BENCHMARK_DIRECTORY)
+GOLDEN_DIRECTORY = os.path.join(BENCHMARK_DIRECTORY, "golden")
+
+sys.path.append(os.path.join(ROOT_DIRECTORY, "script"))
+
+import mesh_distance
+import mesh_io
+from batch import find_blender, run_blender_job
+from run_benchmarks import get_svg_arguments, get_git_revision, get_machine
+from synthetic_svg import write_svg
+
+GOLDEN_FILE_NAME = "golden.json"
+
+#the parameters the optimizations of the pipeline are most likely to change the geometry of
+DEFAULT_CASES = [{"name": "medium", "points": 256, "parameters": {}},
+                 {"name": "dense", "points": 1024, "parameters": {}},
+                 {"name": "dense_bmesh", "points": 1024, "parameters": {"pipeline": "bmesh"}},
+                 {"name": "dense_resolution", "points": 1024, "parameters": {"resolution_tolerance": 0.05}},
+                 {"name": "dense_symmetry", "points": 1024, "parameters": {"symmetry_tolerance": 0.01}},
+                 {"name": "ornate", "points": 4096, "parameters": {}}]
+
+#the pipelines of create_eyeglasses_from_svg that the pipelines command forms every case with
+PIPELINES = ["operators", "bmesh"]
+
+#in mm, above the sampling error of the default sample spacing
+DEFAULT_MAX_DISTANCE = 0.15
+
+#relative change of the surface area or the volume
+DEFAULT_MAX_CHANGE = 0.001
+
+
+def get_case_inputs(case):
+    return case.get("svg"), case.get("points"), case["parameters"]
+
+
+def load_cases(cases_path=None):
+    if cases_path is None:
+        return [dict(case) for case in DEFAULT_CASES]
+
+    with open(cases_path) as cases_file:
+        cases = json.load(cases_file)
+
+    cases_directory = os.path.dirname(os.path.abspath(cases_path))
+    for case in cases:
+        if "svg" in case:
+            case["svg"] = os.path.join(cases_directory, case["svg"])
+        case.setdefault("parameters", {})
+    return cases
+
+
+def form_cases(cases, output_directory, work_directory, blender_path, importer="blender", timeout=None):
+    """
+    :return: the result of every case, with the frame written to NAME.stl in the output directory
+    """
+    results = []
+    for case in cases:
+        svg_path = case.get("svg")
+        if svg_path is None:
+            svg_path = os.path.join(work_directory, case["name"] + ".svg")
+            write_svg(svg_path, *get_svg_arguments(case["points"]))
+
+        job = {"svg": svg_path,
+               "output": os.path.join(output_directory, case["name"] + ".stl"),
+               "parameters": case["parameters"],
+               "importer": importer}
+        result = run_blender_job(job, blender_path, work_directory, case["name"], timeout)
+        print("[{}] {} {:.2f}s".format(result["status"], case["name"], result["wall_seconds"]))
+        results.append(result)
+    return results
+
+
+def record(arguments):
+    cases = load_cases(arguments.cases)
+    blender_path = find_blender(arguments.blender)
+    if not os.path.isdir(arguments.golden):
+        os.makedirs(arguments.golden)
+
+    commit, dirty = get_git_revision()
+    golden = {"commit": commit,
+              "dirty": dirty,
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "machine": get_machine(),
+              "importer": arguments.importer,
+              "cases": {}}
+
+    work_directory = tempfile.mkdtemp(prefix="pince-nez-regression-")
+    try:
+        results = form_cases(cases, arguments.golden, work_directory, blender_path, arguments.importer,
+                             arguments.timeout)
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    failures = 0
+    for case, result in zip(cases, results):
+        if result["status"] != "ok":
+            failures += 1
+            print("{} failed: {}".format(case["name"], result["error"]))
+            continue
+
+        corners = mesh_io.read_stl(result["output"])
+        case["seconds"] = result["seconds"]
+        case["area"] = mesh_distance.get_surface_area(corners)
+        case["volume"] = mesh_distance.get_volume(corners)
+        golden["cases"][case.pop("name")] = case
+
+    with open(os.path.join(arguments.golden, GOLDEN_FILE_NAME), "w") as golden_file:
+        json.dump(golden, golden_file, indent=2)
+    print("{} golden frames of {} written to {}".format(len(golden["cases"]), commit, arguments.golden))
+    return 1 if failures else 0
+
+
+def check_case(corners, golden_corners, arguments):
+    """:return: the comparison of mesh_distance.compare_meshes and the reasons the case fails"""
+    comparison = mesh_distance.compare_meshes(corners, golden_corners, arguments.sample_spacing)
+
+    reasons = []
+    if comparison["hausdorff_distance"] > arguments.max_distance:
+        reasons.append("strays {:.4f} mm".format(comparison["hausdorff_distance"]))
+    for name in ("area", "volume"):
+        change = comparison[name + "_change"]
+        if change is not None and abs(change) > arguments.max_change:
+            reasons.append("{} changed by {:+.4%}".format(name, change))
+    return comparison, reasons
+
+
+def check(arguments):
+    with open(os.path.join(arguments.golden, GOLDEN_FILE_NAME)) as golden_file:
+        golden = json.load(golden_file)
+
+    if golden["machine"] != get_machine():
+        print("warning: the golden frames were timed on a different machine")
+
+    cases = load_cases(arguments.cases)
+    blender_path = find_blender(arguments.blender)
+
+    work_directory = tempfile.mkdtemp(prefix="pince-nez-regression-")
+    try:
+        results = form_cases(cases, work_directory, work_directory, blender_path, golden.get("importer", "blender"),
+                             arguments.timeout)
+
+        print("{:20} {:>10} {:>10} {:>10} {:>10} {:>10} {:>7}".format("case", "distance", "area", "volume",
+                                                                     golden["commit"], "seconds", "ratio"))
+        failures = 0
+        for case, result in zip(cases, results):
+            golden_case = golden["cases"].get(case["name"])
+            if golden_case is None or get_case_inputs(golden_case) != get_case_inputs(case):
+                failures += 1
+                print("{:20} no golden frame of this SVG and parameters, run record first".format(case["name"]))
+                continue
+            if result["status"] != "ok":
+                failures += 1
+                print("{:20} failed: {}".format(case["name"], result["error"]))
+                continue
+
+            golden_corners = mesh_io.read_stl(os.path.join(arguments.golden, case["name"] + ".stl"))
+            comparison, reasons = check_case(mesh_io.read_stl(result["output"]), golden_corners, arguments)
+            if reasons:
+                failures += 1
+
+            ratio = result["seconds"] / golden_case["seconds"] if golden_case["seconds"] > 0.0 else float("inf")
+            print("{:20} {:10.4f} {:+10.4%} {:+10.4%} {:10.2f} {:10.2f} {:7.2f} {}".format(
+                case["name"], comparison["hausdorff_distance"], comparison["area_change"] or 0.0,
+                comparison["volume_change"] or 0.0, golden_case["seconds"], result["seconds"], ratio,
+                ", ".join(reasons)))
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    print("{} of {} cases strayed from their golden frames".format(failures, len(cases)))
+    return 1 if failures else 0
+
+
+def compare_pipelines(arguments):
+    """forms every case with both pipelines and checks that the bmesh frame stays with the operators frame"""
+    cases = [case for case in load_cases(arguments.cases) if "pipeline" not in case["parameters"]]
+    blender_path = find_blender(arguments.blender)
+
+    work_directory = tempfile.mkdtemp(prefix="pince-nez-regression-")
+    try:
+        results = {}
+        for pipeline in PIPELINES:
+            pipeline_cases = [dict(case, name=case["name"] + "_" + pipeline,
+                                   parameters=dict(case["parameters"], pipeline=pipeline)) for case in cases]
+            results[pipeline] = form_cases(pipeline_cases, work_directory, work_directory, blender_path,
+                                           arguments.importer, arguments.timeout)
+
+        print("{:20} {:>10} {:>10} {:>10} {:>10} {:>10}".format("case", "distance", "area", "volume",
+                                                               "operators", "bmesh"))
+        failures = 0
+        for case, operators_result, bmesh_result in zip(cases, results["operators"], results["bmesh"]):
+            failed_results = [result for result in (operators_result, bmesh_result) if result["status"] != "ok"]
+            if failed_results:
+                failures += 1
+                print("{:20} failed: {}".format(case["name"], failed_results[0]["error"]))
+                continue
+
+            comparison, reasons = check_case(mesh_io.read_stl(bmesh_result["output"]),
+                                             mesh_io.read_stl(operators_result["output"]), arguments)
+            if reasons:
+                failures += 1
+
+            print("{:20} {:10.4f} {:+10.4%} {:+10.4%} {:10.2f} {:10.2f} {}".format(
+                case["name"], comparison["hausdorff_distance"], comparison["area_change"] or 0.0,
+                comparison["volume_change"] or 0.0, operators_result["seconds"], bmesh_result["seconds"],
+                ", ".join(reasons)))
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    print("{} of {} cases formed a different frame with the bmesh pipeline".format(failures, len(cases)))
+    return 1 if failures else 0
+
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Check the frames of the pipeline against golden frames.")
+    commands = parser.add_subparsers(dest="command")
+
+    for command in ("record", "check", "pipelines"):
+        command_parser = commands.add_parser(command)
+        command_parser.add_argument("--cases", default=None, help="JSON list of cases instead of the default ones")
+        command_parser.add_argument("--golden", default=GOLDEN_DIRECTORY, help="directory of the golden frames")
+        command_parser.add_argument("--blender", default=None)
+        command_parser.add_argument("--timeout", type=float, default=None)
+
+    for command in ("record", "pipelines"):
+        commands.choices[command].add_argument("--importer", choices=["blender", "mesh_core"], default="blender")
+
+    for command in ("check", "pipelines"):
+        check_parser = commands.choices[command]
+        check_parser.add_argument("--max-distance", type=float, default=DEFAULT_MAX_DISTANCE,
+                                  help="mm a frame may stray from the frame it is compared with")
+        check_parser.add_argument("--max-change", type=float, default=DEFAULT_MAX_CHANGE,
+                                  help="relative change of the surface area or volume allowed")
+        check_parser.add_argument("--sample-spacing", type=float, default=mesh_distance.DEFAULT_SAMPLE_SPACING,
+                                  help="mm between the samples of the surfaces, their error is spacing / sqrt(3)")
+
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parse_arguments(arguments)
+    if arguments.command == "record":
+        return record(arguments)
+    if arguments.command == "check":
+        return check(arguments)
+    if arguments.command == "pipelines":
+        return compare_pipelines(arguments)
+
+    print("usage: regression.py {record,check,pipelines} ...")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+Benchmarks the frame pipeline on synthetic SVGs of growing complexity.
+
+    python benchmarks/run_benchmarks.py run --suite core
+    python benchmarks/run_benchmarks.py run --suite blender --blender /path/to/blender
+    python benchmarks/run_benchmarks.py compare benchmarks/results/OLD.json benchmarks/results/NEW.json
+
+The core suite times the stages that run without Blender in this process, and measures
+their peak of the memory allocated by Python and NumPy with tracemalloc.
+The blender suite runs create_eyeglasses_from_svg in a background Blender process per SVG,
+with the stage timings of profiling.py and the peak resident memory of the process.
+Results are written to benchmarks/results/COMMIT.json with the commit and machine they were measured on,
+so runs of different commits can be compared.
+
+Every run also reports how each stage grows with the points, as the exponent of the time between
+consecutive point counts, and flags the stages that grow faster than SUPERLINEAR_EXPONENT.
+create_mesh_from_svg_file is expected among them: the ear clipping of triangulation.py checks every
+candidate ear against the whole ring, so it grows about quadratically and the 4096 point case
+takes most of the core suite.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIRECTORY = os.path.dirname(BENCHMARK_DIRECTORY)
+RESULTS_DIRECTORY = os.path.join(BENCHMARK_DIRECTORY, "results")
+
+sys.path.append(os.path.join(ROOT_DIRECTORY, "script"))
+
+import deformation
+import mesh_core
+import mesh_io
+import svg_reader
+import welding
+from batch import find_blender, run_blender_job
+from synthetic_svg import write_svg
+
+DEFAULT_POINTS = (64, 256, 1024, 4096)
+
+#a stage whose time grows faster than the points to this power is flagged
+SUPERLINEAR_EXPONENT = 1.5
+
+DESIRED_WIDTH = 135
+#the default desired_thickness the blender suite forms its frames with, an extrusion in thousandths of the units
+#of the imported SVG rather than a thickness in mm, see mesh_core.create_mesh_from_svg_file.
+#The synthetic SVGs are drawn small, so their frames are about 32 mm thick
+EXTRUDE_AMOUNT = 4.5
+
+
+def get_svg_arguments(number_of_points):
+    """the denser frames get more scallops, so that the point count drives the whole curve"""
+    scallops = number_of_points // 64
+    return number_of_points, scallops, 0.03 if scallops else 0.0
+
+
+def measure(function, repeat):
+    """
+    :return: the fastest of the runs in seconds and the peak traced memory of one more run in bytes
+    """
+    seconds = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start_time)
+
+    #traced separately, tracing slows every allocation down
+    tracemalloc.start()
+    try:
+        function()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"seconds": min(seconds), "peak_bytes": peak_bytes}
+
+
+def get_core_stages(svg_path, work_directory):
+    """
+    :return: the stages that run without Blender, as (name, function) pairs, and the mesh they work on
+    """
+    array_mesh, _ = mesh_core.create_mesh_from_svg_file(svg_path, DESIRED_WIDTH, EXTRUDE_AMOUNT)
+
+    #every triangle with its own corners, as a mesh comes out of a curve conversion
+    unwelded_mesh = mesh_core.ArrayMesh(array_mesh.vertices[array_mesh.faces].reshape(-1, 3),
+                                        numpy.arange(array_mesh.face_count * 3).reshape(-1, 3))
+
+    vertices = array_mesh.vertices
+    nosepad_selection = vertices[:, 0] >= vertices[:, 0].max() - 10.0
+    stl_path = os.path.join(work_directory, "frame.stl")
+
+    stages = [("read_svg_outlines",
+               lambda: svg_reader.read_svg_outlines(svg_path, svg_reader.DEFAULT_CURVE_RESOLUTION)),
+              ("create_mesh_from_svg_file",
+               lambda: mesh_core.create_mesh_from_svg_file(svg_path, DESIRED_WIDTH, EXTRUDE_AMOUNT)),
+              ("weld_array_mesh",
+               lambda: welding.weld_array_mesh(unwelded_mesh)),
+              ("proportional_translate",
+               lambda: deformation.proportional_translate(vertices, nosepad_selection, (0.0, 6.0, 0.0), 15.0)),
+              ("bend",
+               lambda: deformation.bend(vertices, 0.3491)),
+              ("write_stl",
+               lambda: mesh_io.write_stl(stl_path, vertices, array_mesh.faces))]
+    return stages, array_mesh
+
+
+def run_core_suite(points, repeat, work_directory):
+    cases = []
+    for number_of_points in points:
+        svg_path = os.path.join(work_directory, "frame_{}.svg".format(number_of_points))
+        write_svg(svg_path, *get_svg_arguments(number_of_points))
+
+        stages, array_mesh = get_core_stages(svg_path, work_directory)
+        case = {"suite": "core",
+                "points": number_of_points,
+                "vertices": array_mesh.vertex_count,
+                "faces": array_mesh.face_count,
+                "stages": {}}
+        for name, function in stages:
+            case["stages"][name] = measure(function, repeat)
+
+        print_case(case)
+        cases.append(case)
+    return cases
+
+
+def run_blender_suite(points, repeat, work_directory, blender_path=None, pipeline="operators", importer="blender",
+                      timeout=None):
+    blender_path = find_blender(blender_path)
+
+    cases = []
+    for number_of_points in points:
+        svg_path = os.path.join(work_directory, "frame_{}.svg".format(number_of_points))
+        write_svg(svg_path, *get_svg_arguments(number_of_points))
+
+        job = {"svg": svg_path,
+               "output": os.path.join(work_directory, "frame_{}.stl".format(number_of_points)),
+               "parameters": {"pipeline": pipeline},
+               "importer": importer,
+               "profile": True}
+
+        results = [run_blender_job(job, blender_path, work_directory, "{}_{}".format(number_of_points, run), timeout)
+                   for run in range(repeat)]
+        case = {"suite": "blender", "points": number_of_points, "pipeline": pipeline, "importer": importer}
+
+        failures = [result for result in results if result["status"] != "ok"]
+        if failures:
+            case["error"] = failures[0]["error"]
+            cases.append(case)
+            print("{} points failed".format(number_of_points))
+            continue
+
+        #the profile of the fastest run, the stages of one run belong together
+        fastest = min(results, key=lambda result: result["seconds"])
+        case.update(fastest["mesh"])
+        case["stages"] = {"total": {"seconds": fastest["seconds"],
+                                    "peak_bytes": fastest["profile"]["peak_memory_bytes"]},
+                          "startup": {"seconds": fastest["wall_seconds"] - fastest["seconds"]}}
+        for stage in fastest["profile"]["stages"]:
+            stage_times = case["stages"].setdefault(stage["name"], {"seconds": 0.0})
+            #combine_for_frame runs once per lens
+            stage_times["seconds"] += stage["seconds"]
+
+        print_case(case)
+        cases.append(case)
+    return cases
+
+
+def print_case(case):
+    print("{suite} {points} points".format(**case))
+    for name, measurement in sorted(case.get("stages", {}).items()):
+        peak_bytes = measurement.get("peak_bytes")
+        memory = "" if peak_bytes is None else " {:10.1f} MB".format(peak_bytes / 2.0 ** 20)
+        print("    {:32} {:10.4f} s{}".format(name, measurement["seconds"], memory))
+
+
+def get_git_revision():
+    """
+    :return: the commit the benchmarks ran on and whether the tracked files had uncommitted changes
+    """
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIRECTORY)
+        changes = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                          cwd=ROOT_DIRECTORY)
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit.decode("utf-8").strip(), bool(changes.strip())
+
+
+def get_machine():
+    return {"platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__}
+
+
+def run(arguments):
+    commit, dirty = get_git_revision()
+    report = {"commit": commit,
+              "dirty": dirty,
+              "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "machine": get_machine(),
+              "repeat": arguments.repeat,
+              "cases": []}
+
+    work_directory = tempfile.mkdtemp(prefix="pince-nez-benchmark-")
+    try:
+        if arguments.suite in ("core", "all"):
+            report["cases"].extend(run_core_suite(arguments.points, arguments.repeat, work_directory))
+        if arguments.suite in ("blender", "all"):
+            report["cases"].extend(run_blender_suite(arguments.points, arguments.repeat, work_directory,
+                                                     arguments.blender, arguments.pipeline, arguments.importer,
+                                                     arguments.timeout))
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    report["scaling"] = get_scaling(report["cases"])
+    print_scaling(report["scaling"])
+
+    output_path = arguments.output
+    if output_path is None:
+        if not os.path.isdir(RESULTS_DIRECTORY):
+            os.makedirs(RESULTS_DIRECTORY)
+        output_path = os.path.join(RESULTS_DIRECTORY, commit + ("-dirty" if dirty else "") + ".json")
+
+    with open(output_path, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print("results written to {}".format(output_path))
+    return 0
+
+
+def get_scaling(cases):
+    """
+    :return: the exponent of the growth of every stage between consecutive point counts of a suite,
+             as dicts of the suite, stage, points, exponent and whether it is superlinear
+    """
+    stage_times = {}
+    for case in cases:
+        for name, measurement in case.get("stages", {}).items():
+            stage_times.setdefault((case["suite"], name), []).append((case["points"], measurement["seconds"]))
+
+    scaling = []
+    for (suite, name), times in sorted(stage_times.items()):
+        times.sort()
+        for (points, seconds), (next_points, next_seconds) in zip(times, times[1:]):
+            if points == next_points or seconds <= 0.0 or next_seconds <= 0.0:
+                continue
+            exponent = math.log(next_seconds / seconds) / math.log(float(next_points) / points)
+            scaling.append({"suite": suite,
+                            "stage": name,
+                            "points": [points, next_points],
+                            "exponent": exponent,
+                            "superlinear": exponent > SUPERLINEAR_EXPONENT})
+    return scaling
+
+
+def print_scaling(scaling):
+    print("{:8} {:32} {:>15} {:>8}".format("suite", "stage", "points", "exponent"))
+    for growth in scaling:
+        print("{:8} {:32} {:>15} {:8.2f} {}".format(growth["suite"], growth["stage"],
+                                                     "{} -> {}".format(*growth["points"]), growth["exponent"],
+                                                     "superlinear" if growth["superlinear"] else ""))
+
+
+def get_stage_times(report):
+    """:return: the seconds of every (suite, points, stage)"""
+    stage_times = {}
+    for case in report["cases"]:
+        for name, measurement in case.get("stages", {}).items():
+            stage_times[(case["suite"], case["points"], name)] = measurement["seconds"]
+    return stage_times
+
+
+def compare(arguments):
+    with open(arguments.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(arguments.candidate) as candidate_file:
+        candidate = json.load(candidate_file)
+
+    if baseline["machine"] != candidate["machine"]:
+        print("warning: the results were measured on different machines")
+
+    baseline_times = get_stage_times(baseline)
+    candidate_times = get_stage_times(candidate)
+
+    print("{:8} {:>7} {:32} {:>10} {:>10} {:>7}".format("suite", "points", "stage",
+                                                        baseline["commit"], candidate["commit"], "ratio"))
+    slower = 0
+    for key in sorted(set(baseline_times) & set(candidate_times)):
+        baseline_seconds, candidate_seconds = baseline_times[key], candidate_times[key]
+        ratio = candidate_seconds / baseline_seconds if baseline_seconds > 0.0 else float("inf")
+        if ratio > 1.0 + arguments.threshold:
+            slower += 1
+        print("{:8} {:>7} {:32} {:10.4f} {:10.4f} {:7.2f}".format(key[0], key[1], key[2],
+                                                                  baseline_seconds, candidate_seconds, ratio))
+
+    print("{} stages slower by more than {:.0%}".format(slower, arguments.threshold))
+    return 1 if slower else 0
+
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the frame pipeline on synthetic SVGs.")
+    commands = parser.add_subparsers(dest="command")
+
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--suite", choices=["core", "blender", "all"], default="core")
+    run_parser.add_argument("--points", type=int, nargs="+", default=list(DEFAULT_POINTS),
+                            help="points on the outer outline of each synthetic SVG")
+    run_parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is kept")
+    run_parser.add_argument("--output", default=None, help="defaults to benchmarks/results/COMMIT.json")
+    run_parser.add_argument("--blender", default=None)
+    run_parser.add_argument("--pipeline", choices=["operators", "bmesh"], default="operators")
+    run_parser.add_argument("--importer", choices=["blender", "mesh_core"], default="blender")
+    run_parser.add_argument("--timeout", type=float, default=None)
+
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="relative slowdown that counts as slower")
+
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parse_arguments(arguments)
+    if arguments.command == "compare":
+        return compare(arguments)
+    if arguments.command == "run":
+        return run(arguments)
+
+    print("usage: run_benchmarks.py {run,compare} ...")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
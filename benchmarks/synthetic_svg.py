@@ -0,0 +1,128 @@
+"""
+Generates eyeglasses SVGs of scalable complexity for the benchmarks.
+
+The frame is one filled path: the outer outline around both lenses and the bridge,
+with the two lens openings as holes. The complexity is set by the number of points on each
+outline and by scallops, a wavy ornamental edge on the outside of the lenses.
+
+    python synthetic_svg.py frame.svg --points 2048 --scallops 48
+"""
+import argparse
+import math
+import sys
+
+#frame size in SVG units, the pipeline scales the frame to desired_width anyway
+LENS_CENTER = 36.0
+OUTER_RADII = (31.0, 25.0)
+LENS_RADII = (26.0, 20.0)
+#angle from the lens center to where the bridge meets the outline
+BRIDGE_ANGLE = 0.45
+
+#name to (points per outline, scallops, scallop amplitude, cubic curves)
+PRESETS = {"simple": (32, 0, 0.0, True),
+           "medium": (256, 0, 0.0, False),
+           "dense": (2048, 24, 0.03, False),
+           "ornate": (8192, 96, 0.04, False)}
+
+
+def get_ellipse_points(center_x, radii, start_angle, end_angle, number_of_points, scallops=0, amplitude=0.0):
+    """
+    :return: the points from the start to the end angle, included, counter-clockwise in SVG coordinates
+    """
+    points = []
+    for index in range(number_of_points):
+        angle = start_angle + (end_angle - start_angle) * index / (number_of_points - 1)
+        scale = 1.0 + amplitude * math.sin(scallops * angle)
+        #SVG y points down, so negating the sine keeps the points counter-clockwise on screen
+        points.append((center_x + radii[0] * scale * math.cos(angle), -radii[1] * scale * math.sin(angle)))
+    return points
+
+
+def get_outer_outline(number_of_points, scallops=0, amplitude=0.0):
+    """the outside of the left lens, the bottom of the bridge, the outside of the right lens and the top of the bridge"""
+    points_per_lens = max(number_of_points // 2, 3)
+    left_lens = get_ellipse_points(-LENS_CENTER, OUTER_RADII, BRIDGE_ANGLE, 2.0 * math.pi - BRIDGE_ANGLE,
+                                   points_per_lens, scallops, amplitude)
+    right_lens = get_ellipse_points(LENS_CENTER, OUTER_RADII, math.pi + BRIDGE_ANGLE, 3.0 * math.pi - BRIDGE_ANGLE,
+                                    points_per_lens, scallops, amplitude)
+    return left_lens + right_lens
+
+
+def get_lens_outline(center_x, number_of_points):
+    #clockwise, the opposite of the outer outline
+    return get_ellipse_points(center_x, LENS_RADII, 2.0 * math.pi, 0.0, number_of_points + 1)[:-1]
+
+
+def format_point(point):
+    return "{:.4f},{:.4f}".format(*point)
+
+
+def get_polyline_path(points):
+    return "M " + " L ".join(format_point(point) for point in points) + " Z"
+
+
+def get_cubic_path(points):
+    """a closed Catmull-Rom spline through the points, written as cubic Bezier curves"""
+    count = len(points)
+    commands = ["M " + format_point(points[0])]
+    for index in range(count):
+        before, start, end, after = (points[(index + offset) % count] for offset in (-1, 0, 1, 2))
+        first_control = (start[0] + (end[0] - before[0]) / 6.0, start[1] + (end[1] - before[1]) / 6.0)
+        second_control = (end[0] - (after[0] - start[0]) / 6.0, end[1] - (after[1] - start[1]) / 6.0)
+        commands.append("C " + " ".join(format_point(point) for point in (first_control, second_control, end)))
+    return " ".join(commands) + " Z"
+
+
+def create_svg(number_of_points=256, scallops=0, amplitude=0.0, cubic=False):
+    """
+    :param number_of_points: points on the outer outline, each lens opening gets half as many
+    :param scallops: number of waves around each lens, 0 for a smooth outline
+    :param amplitude: height of the waves relative to the lens size
+    :param cubic: write Bezier curves through the points instead of straight lines
+    :return: the SVG document
+    """
+    rings = [get_outer_outline(number_of_points, scallops, amplitude),
+             get_lens_outline(-LENS_CENTER, max(number_of_points // 2, 3)),
+             get_lens_outline(LENS_CENTER, max(number_of_points // 2, 3))]
+
+    get_path = get_cubic_path if cubic else get_polyline_path
+    path_data = " ".join(get_path(ring) for ring in rings)
+
+    width = 2.0 * (LENS_CENTER + OUTER_RADII[0] * (1.0 + amplitude)) + 4.0
+    height = 2.0 * OUTER_RADII[1] * (1.0 + amplitude) + 4.0
+    return ('<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<svg xmlns="http://www.w3.org/2000/svg" width="{width:.1f}mm" height="{height:.1f}mm" '
+            'viewBox="{x:.1f} {y:.1f} {width:.1f} {height:.1f}">\n'
+            '<path fill="#000000" fill-rule="evenodd" d="{path_data}"/>\n'
+            '</svg>\n').format(width=width, height=height, x=-width / 2.0, y=-height / 2.0, path_data=path_data)
+
+
+def write_svg(path, number_of_points=256, scallops=0, amplitude=0.0, cubic=False):
+    with open(path, "w") as svg_file:
+        svg_file.write(create_svg(number_of_points, scallops, amplitude, cubic))
+
+
+def write_preset(path, preset):
+    write_svg(path, *PRESETS[preset])
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic eyeglasses SVG.")
+    parser.add_argument("output")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default=None)
+    parser.add_argument("--points", type=int, default=256, help="points on the outer outline")
+    parser.add_argument("--scallops", type=int, default=0)
+    parser.add_argument("--amplitude", type=float, default=0.03)
+    parser.add_argument("--cubic", action="store_true", help="write Bezier curves instead of straight lines")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.preset:
+        write_preset(arguments.output, arguments.preset)
+    else:
+        amplitude = arguments.amplitude if arguments.scallops else 0.0
+        write_svg(arguments.output, arguments.points, arguments.scallops, amplitude, arguments.cubic)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+"""
+Runs create_eyeglasses_from_svg over many SVGs, one background Blender process per job.
+
+    python batch.py SVG_DIRECTORY_OR_MANIFEST OUTPUT_DIRECTORY --workers 8
+
+A directory runs every SVG in it with the same parameters.
+A manifest is a JSON file with optional shared "parameters" and a list of "jobs":
+    {"parameters": {"desired_width": 135},
+     "jobs": [{"svg": "a.svg", "parameters": {"bridge_width": 12}, "output": "a.stl"}]}
+Relative SVG paths in a manifest are relative to the manifest.
+
+Each finished job appends one line with its status and timing to results.jsonl in the output directory.
+This script does not need Blender's python, only a Blender executable to launch.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from supervisor import Supervisor, DEFAULT_JOBS_PER_WORKER
+
+try:
+    import plating
+except ImportError:
+    #plating needs NumPy, running the jobs does not
+    plating = None
+
+RUN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run.py")
+
+RESULTS_FILE_NAME = "results.jsonl"
+
+
+def find_blender(blender_path=None):
+    blender_path = blender_path or os.environ.get("BLENDER") or shutil.which("blender")
+    if not blender_path:
+        raise RuntimeError("could not find Blender, pass --blender or set BLENDER")
+    return blender_path
+
+
+def get_output_path(svg_path, output_directory, output_format):
+    name = os.path.splitext(os.path.basename(svg_path))[0]
+    return os.path.join(output_directory, name + "." + output_format)
+
+
+def jobs_from_directory(svg_directory, output_directory, parameters, output_format="stl"):
+    jobs = []
+    for file_name in sorted(os.listdir(svg_directory)):
+        if file_name.lower().endswith(".svg"):
+            svg_path = os.path.join(svg_directory, file_name)
+            jobs.append({"svg": svg_path,
+                         "output": get_output_path(svg_path, output_directory, output_format),
+                         "parameters": dict(parameters)})
+    return jobs
+
+
+def jobs_from_manifest(manifest_path, output_directory, parameters, output_format="stl"):
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    manifest_directory = os.path.dirname(os.path.abspath(manifest_path))
+    shared_parameters = dict(parameters)
+    shared_parameters.update(manifest.get("parameters", {}))
+
+    jobs = []
+    for index, entry in enumerate(manifest["jobs"]):
+        svg_path = os.path.join(manifest_directory, entry["svg"])
+
+        job_parameters = dict(shared_parameters)
+        job_parameters.update(entry.get("parameters", {}))
+
+        output_path = entry.get("output")
+        if output_path is None:
+            #several jobs can share an SVG, so the default output is numbered
+            name = "{}_{:04d}.{}".format(os.path.splitext(os.path.basename(svg_path))[0], index, output_format)
+            output_path = os.path.join(output_directory, name)
+        elif not os.path.isabs(output_path):
+            output_path = os.path.join(output_directory, output_path)
+
+        jobs.append({"svg": svg_path, "output": output_path, "parameters": job_parameters})
+    return jobs
+
+
+def load_jobs(source, output_directory, parameters=None, output_format="stl"):
+    """
+    :param source: a directory of SVGs or a JSON manifest
+    """
+    parameters = parameters or {}
+    if os.path.isdir(source):
+        return jobs_from_directory(source, output_directory, parameters, output_format)
+    return jobs_from_manifest(source, output_directory, parameters, output_format)
+
+
+def run_blender_job(job, blender_path, work_directory, job_name, timeout=None):
+    """
+    Runs a single job in its own background Blender process.
+    Never raises, a crash or a timeout is reported as a failed result.
+    """
+    job_path = os.path.join(work_directory, job_name + "_job.json")
+    result_path = os.path.join(work_directory, job_name + "_result.json")
+    log_path = os.path.join(work_directory, job_name + ".log")
+
+    with open(job_path, "w") as job_file:
+        json.dump(job, job_file)
+
+    command = [blender_path, "-b", "--factory-startup", "--python", RUN_SCRIPT, "--", job_path, result_path]
+
+    start_time = time.time()
+    try:
+        with open(log_path, "w") as log_file:
+            return_code = subprocess.call(command, stdout=log_file, stderr=subprocess.STDOUT, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return_code = None
+    wall_seconds = time.time() - start_time
+
+    if os.path.exists(result_path):
+        with open(result_path) as result_file:
+            result = json.load(result_file)
+    else:
+        error = "timed out after {} seconds".format(timeout) if return_code is None else \
+            "blender exited with code {} without writing a result, see {}".format(return_code, log_path)
+        result = {"svg": job.get("svg"), "output": job.get("output"), "status": "failed", "error": error}
+
+    result["parameters"] = job.get("parameters", {})
+    #the time spent in the job itself versus including Blender startup
+    result["wall_seconds"] = wall_seconds
+    return result
+
+
+def run_batch(jobs, output_directory, workers=None, blender_path=None, timeout=None, warm=False,
+              jobs_per_worker=DEFAULT_JOBS_PER_WORKER):
+    """
+    Fans the jobs out over a pool of background Blender processes.
+    Each Blender process is single threaded, so one worker per core scales close to linearly.
+    :param warm: run the jobs in warm workers of supervisor.py instead of starting Blender for every job
+    :param jobs_per_worker: jobs after which a warm worker is replaced
+    :return: the results, in the same order as the jobs
+    """
+    blender_path = find_blender(blender_path)
+    workers = workers or os.cpu_count() or 1
+
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    results_path = os.path.join(output_directory, RESULTS_FILE_NAME)
+    results = [None] * len(jobs)
+
+    work_directory = tempfile.mkdtemp(prefix="pince-nez-batch-")
+    supervisor = Supervisor(blender_path, workers, jobs_per_worker, timeout) if warm else None
+    try:
+        if supervisor:
+            supervisor.start()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor, open(results_path, "a") as results_file:
+            futures = {}
+            for index, job in enumerate(jobs):
+                if supervisor:
+                    future = executor.submit(supervisor.run_job, job)
+                else:
+                    future = executor.submit(run_blender_job, job, blender_path, work_directory,
+                                             "{:06d}".format(index), timeout)
+                futures[future] = index
+
+            for future in as_completed(futures):
+                index = futures[future]
+                result = future.result()
+                results[index] = result
+
+                #written as they finish so an interrupted batch still leaves a record
+                results_file.write(json.dumps(result) + "\n")
+                results_file.flush()
+                print("[{}] {} {:.2f}s".format(result["status"], result["svg"], result["wall_seconds"]))
+    finally:
+        if supervisor:
+            supervisor.stop()
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    return results
+
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Generate eyeglasses frames from many SVGs.")
+    parser.add_argument("source", help="a directory of SVGs or a JSON manifest of jobs")
+    parser.add_argument("output_directory")
+    parser.add_argument("--workers", type=int, default=None, help="number of Blender processes, defaults to the cores")
+    parser.add_argument("--blender", default=None, help="path to the Blender executable")
+    parser.add_argument("--parameters", default="{}",
+                        help="JSON of create_eyeglasses_from_svg arguments shared by every job")
+    parser.add_argument("--format", default="stl", choices=["stl", "3mf", "obj"])
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a job is killed")
+    parser.add_argument("--mesh-core", action="store_true",
+                        help="build the extruded SVG mesh with mesh_core instead of Blender's SVG importer")
+    parser.add_argument("--profile", action="store_true",
+                        help="record the time, mesh sizes and operator calls of every stage in the results")
+    parser.add_argument("--validate", action="store_true",
+                        help="check every frame for open seams, self-intersections and thin walls")
+    parser.add_argument("--warm", action="store_true",
+                        help="run the jobs in warm Blender processes instead of starting Blender for every job")
+    parser.add_argument("--jobs-per-worker", type=int, default=DEFAULT_JOBS_PER_WORKER,
+                        help="jobs after which a warm Blender process is replaced")
+    parser.add_argument("--plate", type=float, nargs=2, default=None, metavar=("WIDTH", "DEPTH"),
+                        help="also pack the finished STL frames onto build plates of this size in mm, see plating.py")
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parse_arguments(arguments)
+    if arguments.plate and arguments.format != "stl":
+        print("--plate reads the frames back as binary STL, use --format stl")
+        return 2
+    if arguments.plate and plating is None:
+        print("--plate needs NumPy")
+        return 2
+
+    jobs = load_jobs(arguments.source, arguments.output_directory, json.loads(arguments.parameters), arguments.format)
+    for job in jobs:
+        if arguments.mesh_core:
+            job["importer"] = "mesh_core"
+        if arguments.profile:
+            job["profile"] = True
+        if arguments.validate:
+            job["validate"] = True
+    results = run_batch(jobs, arguments.output_directory, arguments.workers, arguments.blender, arguments.timeout,
+                        arguments.warm, arguments.jobs_per_worker)
+
+    failures = [result for result in results if result["status"] != "ok"]
+    print("{} jobs, {} failed".format(len(results), len(failures)))
+
+    if arguments.plate:
+        layout = plating.plate_files([result["output"] for result in results if result["status"] == "ok"],
+                                     os.path.join(arguments.output_directory, "plates"), tuple(arguments.plate))
+        print("{} plates, {} frames larger than the bed".format(len(layout["plates"]), len(layout["unplaced"])))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
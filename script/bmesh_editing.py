@@ -0,0 +1,194 @@
+"""
+Building blocks for editing a frame as an in-memory bmesh.
+
+These are the counterparts of the operator based steps in run.py.
+They work on the mesh data directly, so they need no context, no selection and no mode switches.
+Geometry is kept in world space, in mm.
+"""
+import bpy
+import bmesh
+import numpy
+from mathutils import Matrix, Vector
+
+import deformation
+import symmetry
+import welding
+
+
+def create_bmesh_from_curve(curve_object, scene, weld_distance=0.0001):
+    """
+    Converts the curve, including its extrusion, into a bmesh in world space.
+    The curve object itself is left untouched.
+    """
+    curve_mesh = curve_object.to_mesh(scene, True, "PREVIEW")
+
+    mesh = bmesh.new()
+    mesh.from_mesh(curve_mesh)
+    bpy.data.meshes.remove(curve_mesh)
+
+    #weld before transforming so the distance is in the same units as remove_doubles on the curve
+    weld(mesh, weld_distance)
+    bmesh.ops.transform(mesh, matrix=curve_object.matrix_world, verts=mesh.verts)
+
+    return mesh
+
+
+def create_bmesh_from_object(mesh_object):
+    """copies the mesh of the object into a bmesh in world space"""
+    mesh = bmesh.new()
+    mesh.from_mesh(mesh_object.data)
+    bmesh.ops.transform(mesh, matrix=mesh_object.matrix_world, verts=mesh.verts)
+    return mesh
+
+
+def get_coordinates(mesh):
+    return numpy.array([vertex.co[:] for vertex in mesh.verts], dtype=numpy.float64).reshape(-1, 3)
+
+
+def get_edges(mesh):
+    """:return: (edges, 2) array of the vertex indices of every edge"""
+    mesh.verts.index_update()
+    edges = numpy.array([[vertex.index for vertex in edge.verts] for edge in mesh.edges], dtype=numpy.int64)
+    return edges.reshape(-1, 2)
+
+
+def set_coordinates(mesh, coordinates):
+    for vertex, coordinate in zip(mesh.verts, coordinates.tolist()):
+        vertex.co = coordinate
+
+
+def get_dimensions(mesh):
+    coordinates = get_coordinates(mesh)
+    return Vector(coordinates.max(axis=0) - coordinates.min(axis=0))
+
+
+def get_median(mesh):
+    return Vector(get_coordinates(mesh).mean(axis=0))
+
+
+def get_center_of_mass(mesh):
+    """
+    the area weighted center of the faces, as used by ORIGIN_CENTER_OF_MASS
+    """
+    total_area = 0.0
+    center = Vector((0.0, 0.0, 0.0))
+    for face in mesh.faces:
+        area = face.calc_area()
+        center += face.calc_center_median() * area
+        total_area += area
+
+    if total_area == 0.0:
+        return get_median(mesh)
+    return center / total_area
+
+
+def translate(mesh, offset):
+    bmesh.ops.translate(mesh, vec=Vector(offset), verts=mesh.verts)
+
+
+def scale(mesh, scaling_factor, center):
+    bmesh.ops.scale(mesh, vec=Vector((scaling_factor, scaling_factor, scaling_factor)),
+                    space=Matrix.Translation(-Vector(center)), verts=mesh.verts)
+
+
+def rotate(mesh, angle, axis, center):
+    bmesh.ops.rotate(mesh, cent=Vector(center), matrix=Matrix.Rotation(angle, 3, axis), verts=mesh.verts)
+
+
+def bisect(mesh, x_coord, clear_inner=False, clear_outer=False, z_tilt=0.0, z_translation=0.0):
+    """bisect at the x coordinate, same plane as the bisect operator"""
+    geometry = mesh.verts[:] + mesh.edges[:] + mesh.faces[:]
+    bmesh.ops.bisect_plane(mesh,
+                           geom=geometry,
+                           dist=0.0,
+                           plane_co=(x_coord, 0.0, z_translation),
+                           plane_no=(1.0, 0.0, z_tilt),
+                           clear_inner=clear_inner,
+                           clear_outer=clear_outer)
+
+
+def weld(mesh, merge_distance=welding.DEFAULT_MERGE_DISTANCE):
+    """
+    merges the vertices closer than the merge distance, like remove_doubles
+    :return: the number of vertices merged
+    """
+    targets = welding.find_weld_targets(get_coordinates(mesh), merge_distance)
+    merged = numpy.flatnonzero(targets != numpy.arange(len(targets)))
+
+    if len(merged):
+        mesh.verts.ensure_lookup_table()
+        target_map = dict((mesh.verts[index], mesh.verts[targets[index]]) for index in merged.tolist())
+        bmesh.ops.weld_verts(mesh, targetmap=target_map)
+
+    return len(merged)
+
+
+def join(target_mesh, mesh):
+    """appends the geometry of the mesh to the target mesh"""
+    transfer_mesh = bpy.data.meshes.new("join")
+    mesh.to_mesh(transfer_mesh)
+    target_mesh.from_mesh(transfer_mesh)
+    bpy.data.meshes.remove(transfer_mesh)
+
+
+def bridge_boundary_loops(mesh, keep_edge):
+    """
+    bridges the open boundaries whose edges pass keep_edge,
+    the counterpart of select_non_manifold followed by bridge_edge_loops
+    """
+    edges = [edge for edge in mesh.edges if edge.is_boundary and keep_edge(edge)]
+    bmesh.ops.bridge_loops(mesh, edges=edges, use_merge=True, merge_factor=0.5)
+
+
+def get_normals(mesh):
+    mesh.normal_update()
+    return numpy.array([vertex.normal[:] for vertex in mesh.verts], dtype=numpy.float64).reshape(-1, 3)
+
+
+def set_changed_coordinates(mesh, coordinates, changed_coordinates):
+    """only writes back the vertices that moved"""
+    mesh.verts.ensure_lookup_table()
+    for index in numpy.flatnonzero((changed_coordinates != coordinates).any(axis=1)).tolist():
+        mesh.verts[index].co = changed_coordinates[index]
+
+
+def proportional_translate(mesh, selection, offset, proportional_size):
+    coordinates = get_coordinates(mesh)
+    translated_coordinates = deformation.proportional_translate(coordinates, selection, offset, proportional_size)
+    set_changed_coordinates(mesh, coordinates, translated_coordinates)
+
+
+def proportional_shrink_fatten(mesh, selection, shrink_amount, proportional_size):
+    """moves vertices against their normals, a positive amount shrinks"""
+    coordinates = get_coordinates(mesh)
+    shrunk_coordinates = deformation.proportional_shrink_fatten(coordinates, get_normals(mesh), selection,
+                                                                shrink_amount, proportional_size)
+    set_changed_coordinates(mesh, coordinates, shrunk_coordinates)
+
+
+def mirror(mesh):
+    """mirrors the mesh about x=0, keeping its faces facing outward"""
+    set_coordinates(mesh, symmetry.mirror_coordinates(get_coordinates(mesh)))
+    bmesh.ops.reverse_faces(mesh, faces=mesh.faces[:])
+
+
+def bend(mesh, bend_degree, center):
+    """applies the bend of the simple deform modifier around the center"""
+    center = numpy.array(center[:], dtype=numpy.float64)
+    set_coordinates(mesh, deformation.bend(get_coordinates(mesh) - center, bend_degree) + center)
+
+
+def create_object_from_bmesh(mesh, name, scene, location=(0.0, 0.0, 0.0), material=None):
+    """writes the bmesh into a new object with its origin at the location"""
+    translate(mesh, -Vector(location))
+
+    object_mesh = bpy.data.meshes.new(name)
+    mesh.to_mesh(object_mesh)
+    if material is not None:
+        object_mesh.materials.append(material)
+
+    mesh_object = bpy.data.objects.new(name, object_mesh)
+    mesh_object.location = location
+    scene.objects.link(mesh_object)
+
+    return mesh_object
@@ -0,0 +1,104 @@
+"""
+A compact binary file of one mesh, for the meshes handed between the stages of the pipeline and between processes.
+
+A checkpoint is a fixed header followed by the arrays of the mesh, every array starting on a 64 byte boundary:
+
+    header         magic, version, the number of vertices, polygons and loops, and the 4x4 matrix_world
+    vertices       float32 (vertices, 3) local coordinates, the single precision Blender stores
+    loop_totals    int32 number of corners of every polygon
+    loop_vertices  int32 vertex index of every corner, one polygon after the other
+
+All values are little endian. read_checkpoint maps the file and returns views of the map, nothing is parsed or copied,
+and the arrays have the types of Blender's mesh properties, so foreach_set copies them in one block.
+"""
+import mmap
+
+import numpy
+
+MAGIC = b"PNZMESH1"
+VERSION = 1
+
+HEADER = numpy.dtype([("magic", "S8"),
+                      ("version", "<u4"),
+                      ("vertex_count", "<u4"),
+                      ("polygon_count", "<u4"),
+                      ("loop_count", "<u4"),
+                      ("matrix_world", "<f8", (4, 4))])
+
+#key, type and values per element of the arrays, in the order they are stored
+ARRAYS = (("vertices", numpy.dtype("<f4"), 3),
+          ("loop_totals", numpy.dtype("<i4"), 1),
+          ("loop_vertices", numpy.dtype("<i4"), 1))
+
+ALIGNMENT = 64
+
+
+def align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def get_array_offsets(counts):
+    """
+    :param counts: the number of vertices, polygons and loops
+    :return: the offset of every array in bytes and the size of the file
+    """
+    offsets = []
+    offset = HEADER.itemsize
+    for (_, dtype, width), count in zip(ARRAYS, counts):
+        offset = align(offset)
+        offsets.append(offset)
+        offset += count * width * dtype.itemsize
+    return offsets, offset
+
+
+def write_checkpoint(output_file, vertices, loop_totals, loop_vertices, matrix_world=None):
+    """
+    :param output_file: binary file to write the checkpoint to
+    :param matrix_world: 4x4 matrix, the identity when None
+    """
+    arrays = [numpy.ascontiguousarray(array, dtype=dtype).reshape(-1, width) if width > 1 else
+              numpy.ascontiguousarray(array, dtype=dtype).ravel()
+              for array, (_, dtype, width) in zip((vertices, loop_totals, loop_vertices), ARRAYS)]
+
+    header = numpy.zeros(1, dtype=HEADER)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["vertex_count"], header["polygon_count"], header["loop_count"] = (len(array) for array in arrays)
+    header["matrix_world"] = numpy.identity(4) if matrix_world is None else matrix_world
+
+    offsets, _ = get_array_offsets([len(array) for array in arrays])
+    output_file.write(header.tobytes())
+    position = HEADER.itemsize
+    for offset, array in zip(offsets, arrays):
+        output_file.write(b"\0" * (offset - position))
+        output_file.write(array.tobytes())
+        position = offset + array.nbytes
+
+
+def read_checkpoint(path):
+    """
+    :return: dict of the vertices, loop_totals and loop_vertices as read-only views of the memory-mapped file,
+             and a copy of the matrix_world
+    """
+    with open(path, "rb") as checkpoint_file:
+        #the map stays open after the file is closed, until the last array of it is gone
+        buffer = mmap.mmap(checkpoint_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buffer) < HEADER.itemsize:
+        raise ValueError("{} is not a mesh checkpoint".format(path))
+    header = numpy.frombuffer(buffer, dtype=HEADER, count=1)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError("{} is not a mesh checkpoint".format(path))
+    if header["version"] != VERSION:
+        raise ValueError("{} is a version {} mesh checkpoint, expected {}".format(path, header["version"], VERSION))
+
+    counts = [int(header[key]) for key in ("vertex_count", "polygon_count", "loop_count")]
+    offsets, size = get_array_offsets(counts)
+    if len(buffer) < size:
+        raise ValueError("{} is truncated".format(path))
+
+    arrays = {"matrix_world": numpy.array(header["matrix_world"], dtype=numpy.float64)}
+    for (key, dtype, width), offset, count in zip(ARRAYS, offsets, counts):
+        array = numpy.frombuffer(buffer, dtype=dtype, count=count * width, offset=offset)
+        arrays[key] = array.reshape(-1, width) if width > 1 else array
+    return arrays
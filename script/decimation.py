@@ -0,0 +1,326 @@
+"""
+Reduces the triangles of a frame with quadric error half-edge collapses.
+
+A half-edge collapse moves one vertex onto a neighbour, so the decimated mesh keeps a subset
+of the original vertices and its surface never moves away from them.
+Collapses are ordered by the quadric error of the planes merged into the remaining vertex.
+Their error is the largest distance from the remaining vertex to the planes of the original faces
+merged into it, which is what an error bound is checked against and what is reported.
+The outline, the lens openings and other sharp edges are features: planes along them
+are added to the quadrics, their vertices only slide along their own feature line,
+and the vertices where feature lines meet never move.
+Collapses that break the link condition or flip a face are skipped.
+
+Large meshes are cut into blocks of faces along X that are decimated one at a time
+with the vertices they share locked, so the bookkeeping only ever holds one block.
+"""
+import heapq
+import math
+
+import numpy
+
+DEFAULT_FEATURE_ANGLE = math.radians(30.0)
+DEFAULT_BLOCK_FACE_COUNT = 200000
+
+#weight of the planes along feature edges, relative to the planes of the faces
+FEATURE_WEIGHT = 100.0
+
+#a collapse may not turn a face further than this
+MIN_NORMAL_COSINE = 0.0
+
+
+def get_face_normals(vertices, faces):
+    """:return: the unit normals and the areas of the faces"""
+    normals = numpy.cross(vertices[faces[:, 1]] - vertices[faces[:, 0]], vertices[faces[:, 2]] - vertices[faces[:, 0]])
+    lengths = numpy.sqrt((normals ** 2).sum(axis=1))
+    unit_normals = normals / numpy.where(lengths > 0.0, lengths, 1.0)[:, None]
+    return unit_normals, 0.5 * lengths
+
+
+def get_plane_quadrics(normals, points, weights):
+    """:return: (planes, 4, 4) array of weight * p * p^T for the planes p = (normal, -normal . point)"""
+    planes = numpy.column_stack((normals, -(normals * points).sum(axis=1)))
+    return weights[:, None, None] * planes[:, :, None] * planes[:, None, :]
+
+
+def get_edges(faces):
+    """
+    :return: the unique (edges, 2) array with the lower vertex first,
+             and for every corner edge of the faces the index of its unique edge
+    """
+    corner_edges = numpy.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]])).astype(numpy.int64)
+    corner_edges.sort(axis=1)
+    vertex_count = corner_edges.max() + 1 if len(corner_edges) else 0
+    keys, edge_indices = numpy.unique(corner_edges[:, 0] * vertex_count + corner_edges[:, 1], return_inverse=True)
+    edges = numpy.column_stack((keys // vertex_count, keys % vertex_count))
+    return edges, edge_indices.ravel()
+
+
+def find_feature_edges(vertices, faces, feature_angle=DEFAULT_FEATURE_ANGLE):
+    """
+    :return: the unique edges, a mask of the feature edges among them,
+             and the normal of one face next to every edge
+    """
+    edges, edge_indices = get_edges(faces)
+    normals, _ = get_face_normals(vertices, faces)
+    corner_faces = numpy.tile(numpy.arange(len(faces)), 3)
+
+    face_counts = numpy.bincount(edge_indices, minlength=len(edges))
+    #the normals of the first and the last face of every edge, the same face for an open edge
+    order = numpy.argsort(edge_indices, kind="mergesort")
+    starts = numpy.cumsum(face_counts) - face_counts
+    first_normals = normals[corner_faces[order[starts]]]
+    last_normals = normals[corner_faces[order[starts + face_counts - 1]]]
+
+    is_sharp = (first_normals * last_normals).sum(axis=1) < math.cos(feature_angle)
+    is_feature = (face_counts != 2) | is_sharp
+    return edges, is_feature, first_normals
+
+
+def get_vertex_quadrics(vertices, faces, edges, is_feature, edge_normals):
+    quadrics = numpy.zeros((len(vertices), 4, 4))
+
+    #the planes of the faces around every vertex, to order the collapses
+    normals, areas = get_face_normals(vertices, faces)
+    face_quadrics = get_plane_quadrics(normals, vertices[faces[:, 0]], (areas > 0.0).astype(numpy.float64))
+    for corner in range(3):
+        numpy.add.at(quadrics, faces[:, corner], face_quadrics)
+
+    #planes through the feature edges, perpendicular to their faces, keep the features in place
+    feature_edges = edges[is_feature]
+    directions = vertices[feature_edges[:, 1]] - vertices[feature_edges[:, 0]]
+    constraint_normals = numpy.cross(directions, edge_normals[is_feature])
+    lengths = numpy.sqrt((constraint_normals ** 2).sum(axis=1))
+    constraint_normals /= numpy.where(lengths > 0.0, lengths, 1.0)[:, None]
+    weights = numpy.full(len(feature_edges), FEATURE_WEIGHT)
+    edge_quadrics = get_plane_quadrics(constraint_normals, vertices[feature_edges[:, 0]], weights)
+    for end in range(2):
+        numpy.add.at(quadrics, feature_edges[:, end], edge_quadrics)
+
+    return quadrics
+
+
+class BlockDecimator(object):
+    """
+    The collapse bookkeeping of one block of faces, in the local vertex indices of the block
+    """
+
+    def __init__(self, vertices, faces, locked, feature_angle):
+        self.vertices = vertices
+        self.faces = faces.copy()
+        self.face_alive = numpy.ones(len(faces), dtype=bool)
+        self.live_face_count = len(faces)
+        self.removed = numpy.zeros(len(vertices), dtype=bool)
+        self.versions = [0] * len(vertices)
+
+        edges, is_feature, edge_normals = find_feature_edges(vertices, faces, feature_angle)
+        self.quadrics = get_vertex_quadrics(vertices, faces, edges, is_feature, edge_normals)
+
+        #the planes of the original faces and the faces each vertex stands in for, to measure the error
+        normals, areas = get_face_normals(vertices, faces)
+        self.planes = numpy.column_stack((normals, -(normals * vertices[faces[:, 0]]).sum(axis=1)))
+        self.vertex_planes = [[] for _ in range(len(vertices))]
+        for face, corners in enumerate(faces.tolist()):
+            if areas[face] > 0.0:
+                for vertex in corners:
+                    self.vertex_planes[vertex].append(face)
+        self.vertex_planes = [numpy.array(planes, dtype=numpy.int64) for planes in self.vertex_planes]
+        self.max_error = 0.0
+
+        #the vertices on a feature line and their neighbours along it
+        self.feature_neighbours = {}
+        for first_vertex, second_vertex in edges[is_feature].tolist():
+            self.feature_neighbours.setdefault(first_vertex, set()).add(second_vertex)
+            self.feature_neighbours.setdefault(second_vertex, set()).add(first_vertex)
+        feature_degrees = numpy.bincount(edges[is_feature].ravel(), minlength=len(vertices))
+        #corners of the feature lines never move
+        self.locked = locked | ((feature_degrees > 0) & (feature_degrees != 2))
+
+        self.vertex_faces = [[] for _ in range(len(vertices))]
+        for face, corners in enumerate(self.faces.tolist()):
+            for vertex in corners:
+                self.vertex_faces[vertex].append(face)
+
+        self.heap = []
+        self.push_candidates(edges[:, 0], edges[:, 1])
+
+    def get_costs(self, moving_vertices, kept_vertices):
+        """the quadric error of both quadrics at the position of the kept vertex"""
+        points = numpy.column_stack((self.vertices[kept_vertices], numpy.ones(len(kept_vertices))))
+        quadrics = self.quadrics[moving_vertices] + self.quadrics[kept_vertices]
+        return numpy.maximum(numpy.einsum("ni,nij,nj->n", points, quadrics, points), 0.0)
+
+    def get_error(self, moving_vertex, kept_vertex):
+        """the largest distance from the kept vertex to the planes of the original faces of both vertices"""
+        planes = self.planes[numpy.union1d(self.vertex_planes[moving_vertex], self.vertex_planes[kept_vertex])]
+        if not len(planes):
+            return 0.0
+        return float(numpy.abs(planes[:, :3].dot(self.vertices[kept_vertex]) + planes[:, 3]).max())
+
+    def can_move(self, moving_vertex, kept_vertex):
+        if self.locked[moving_vertex]:
+            return False
+        #a feature vertex may only slide along its own feature line
+        if moving_vertex in self.feature_neighbours:
+            return kept_vertex in self.feature_neighbours[moving_vertex]
+        return True
+
+    def push_candidates(self, first_vertices, second_vertices):
+        first_vertices = numpy.asarray(first_vertices, dtype=numpy.int64)
+        second_vertices = numpy.asarray(second_vertices, dtype=numpy.int64)
+        moving_vertices = numpy.concatenate((first_vertices, second_vertices))
+        kept_vertices = numpy.concatenate((second_vertices, first_vertices))
+
+        costs = self.get_costs(moving_vertices, kept_vertices)
+        for cost, moving_vertex, kept_vertex in zip(costs.tolist(), moving_vertices.tolist(), kept_vertices.tolist()):
+            if self.can_move(moving_vertex, kept_vertex):
+                heapq.heappush(self.heap, (cost, moving_vertex, kept_vertex,
+                                           self.versions[moving_vertex], self.versions[kept_vertex]))
+
+    def get_live_faces(self, vertex):
+        live_faces = [face for face in self.vertex_faces[vertex] if self.face_alive[face]]
+        self.vertex_faces[vertex] = live_faces
+        return live_faces
+
+    def get_neighbours(self, vertex):
+        neighbours = set()
+        for face in self.get_live_faces(vertex):
+            neighbours.update(self.faces[face].tolist())
+        neighbours.discard(vertex)
+        return neighbours
+
+    def is_collapsible(self, moving_vertex, kept_vertex):
+        moving_faces = self.get_live_faces(moving_vertex)
+        shared_faces = [face for face in moving_faces if kept_vertex in self.faces[face]]
+        if not shared_faces:
+            return False
+
+        #link condition, the only common neighbours are the corners of the faces of the edge
+        opposite_vertices = set()
+        for face in shared_faces:
+            opposite_vertices.update(self.faces[face].tolist())
+        opposite_vertices -= {moving_vertex, kept_vertex}
+        if self.get_neighbours(moving_vertex) & self.get_neighbours(kept_vertex) != opposite_vertices:
+            return False
+
+        #no face around the moving vertex may flip or collapse to a line
+        moved_faces = self.faces[[face for face in moving_faces if face not in shared_faces]]
+        old_corners = self.vertices[moved_faces]
+        new_corners = old_corners.copy()
+        new_corners[moved_faces == moving_vertex] = self.vertices[kept_vertex]
+
+        old_normals = numpy.cross(old_corners[:, 1] - old_corners[:, 0], old_corners[:, 2] - old_corners[:, 0])
+        new_normals = numpy.cross(new_corners[:, 1] - new_corners[:, 0], new_corners[:, 2] - new_corners[:, 0])
+        old_lengths = numpy.sqrt((old_normals ** 2).sum(axis=1))
+        new_lengths = numpy.sqrt((new_normals ** 2).sum(axis=1))
+        if (old_lengths <= 1e-12).any() or (new_lengths <= 1e-12).any():
+            return False
+        cosines = (old_normals * new_normals).sum(axis=1) / (old_lengths * new_lengths)
+        return bool((cosines > MIN_NORMAL_COSINE).all())
+
+    def collapse(self, moving_vertex, kept_vertex):
+        for face in self.get_live_faces(moving_vertex):
+            corners = self.faces[face]
+            if kept_vertex in corners:
+                self.face_alive[face] = False
+                self.live_face_count -= 1
+            else:
+                corners[corners == moving_vertex] = kept_vertex
+                self.vertex_faces[kept_vertex].append(face)
+
+        self.removed[moving_vertex] = True
+        self.quadrics[kept_vertex] += self.quadrics[moving_vertex]
+        self.vertex_planes[kept_vertex] = numpy.union1d(self.vertex_planes[kept_vertex],
+                                                        self.vertex_planes[moving_vertex])
+        self.vertex_planes[moving_vertex] = None
+
+        #the other feature edge of the moving vertex now ends at the kept vertex
+        if moving_vertex in self.feature_neighbours:
+            kept_neighbours = self.feature_neighbours[kept_vertex]
+            kept_neighbours.discard(moving_vertex)
+            for other_vertex in self.feature_neighbours.pop(moving_vertex):
+                if other_vertex != kept_vertex:
+                    other_neighbours = self.feature_neighbours[other_vertex]
+                    other_neighbours.discard(moving_vertex)
+                    other_neighbours.add(kept_vertex)
+                    kept_neighbours.add(other_vertex)
+
+        neighbours = list(self.get_neighbours(kept_vertex))
+        for vertex in [kept_vertex] + neighbours:
+            self.versions[vertex] += 1
+        self.push_candidates([kept_vertex] * len(neighbours), neighbours)
+
+    def decimate(self, target_face_count, max_error):
+        """collapses the cheapest edges first, skipping the collapses that would stray more than max_error"""
+        while self.heap and self.live_face_count > target_face_count:
+            cost, moving_vertex, kept_vertex, moving_version, kept_version = heapq.heappop(self.heap)
+            if self.removed[moving_vertex] or self.removed[kept_vertex]:
+                continue
+            if self.versions[moving_vertex] != moving_version or self.versions[kept_vertex] != kept_version:
+                continue
+            error = self.get_error(moving_vertex, kept_vertex)
+            if error > max_error or not self.is_collapsible(moving_vertex, kept_vertex):
+                continue
+
+            self.collapse(moving_vertex, kept_vertex)
+            self.max_error = max(self.max_error, error)
+
+        return self.faces[self.face_alive]
+
+
+def split_into_blocks(vertices, faces, block_face_count):
+    """:return: the faces of every block, sorted along X by their centers"""
+    if len(faces) <= block_face_count:
+        return [numpy.arange(len(faces))]
+
+    centers = vertices[faces].mean(axis=1)[:, 0]
+    order = numpy.argsort(centers, kind="mergesort")
+    number_of_blocks = int(math.ceil(len(faces) / float(block_face_count)))
+    return numpy.array_split(order, number_of_blocks)
+
+
+def decimate(vertices, faces, target_face_count=None, max_error=None, feature_angle=DEFAULT_FEATURE_ANGLE,
+             block_face_count=DEFAULT_BLOCK_FACE_COUNT):
+    """
+    :param vertices: (vertices, 3) array
+    :param faces: (faces, 3) array of vertex indices
+    :param target_face_count: stop once there are no more triangles than this
+    :param max_error: only collapse edges whose kept vertex stays within this distance of the planes
+                      of all the original faces merged into it, in the units of the vertices
+    :return: the indices of the vertices that are kept, the faces in those kept vertices,
+             and the achieved error, the largest distance from a kept vertex to the planes
+             of the original faces merged into it, in the units of the vertices
+    """
+    if target_face_count is None and max_error is None:
+        raise ValueError("decimation needs a target face count, an error bound or both")
+
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    faces = numpy.asarray(faces, dtype=numpy.int64)
+    target_face_count = 0 if target_face_count is None else target_face_count
+    max_error = float("inf") if max_error is None else max_error
+
+    blocks = split_into_blocks(vertices, faces, block_face_count)
+
+    #vertices of more than one block stay in place, so the blocks still fit together
+    vertex_blocks = numpy.full(len(vertices), -1)
+    shared = numpy.zeros(len(vertices), dtype=bool)
+    for block_index, block_faces in enumerate(blocks):
+        block_vertices = numpy.unique(faces[block_faces])
+        shared[block_vertices[(vertex_blocks[block_vertices] != -1) & (vertex_blocks[block_vertices] != block_index)]] = True
+        vertex_blocks[block_vertices] = block_index
+
+    decimated_faces = []
+    achieved_error = 0.0
+    for block_faces in blocks:
+        block_vertices, local_faces = numpy.unique(faces[block_faces], return_inverse=True)
+        local_faces = local_faces.reshape(-1, 3)
+
+        block_target = int(round(target_face_count * len(block_faces) / float(len(faces))))
+        decimator = BlockDecimator(vertices[block_vertices], local_faces, shared[block_vertices], feature_angle)
+        decimated_faces.append(block_vertices[decimator.decimate(block_target, max_error)])
+        achieved_error = max(achieved_error, decimator.max_error)
+
+    decimated_faces = numpy.concatenate(decimated_faces)
+    kept_vertices, new_faces = numpy.unique(decimated_faces, return_inverse=True)
+    return kept_vertices, new_faces.reshape(-1, 3), achieved_error
+
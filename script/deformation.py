@@ -0,0 +1,101 @@
+"""
+Proportional editing on vertex arrays, without an edit mode context.
+
+These compute the same displacements as bpy.ops.transform.translate and shrink_fatten
+with proportional="ENABLED" and the SMOOTH falloff, for every affected vertex at once.
+Coordinates are (vertices, 3) arrays in the local space of the mesh.
+When the 4x4 world matrix of the object is given, the falloff distances and the translation
+are in world space like the operators, otherwise local space is world space.
+"""
+import numpy
+
+
+def transform_coordinates(coordinates, matrix):
+    matrix = numpy.asarray(matrix, dtype=numpy.float64)
+    return coordinates.dot(matrix[:3, :3].T) + matrix[:3, 3]
+
+
+def get_smooth_falloff(distances, proportional_size):
+    falloff = numpy.clip(1.0 - distances / proportional_size, 0.0, 1.0)
+    return 3.0 * falloff ** 2 - 2.0 * falloff ** 3
+
+
+def get_proportional_weights(coordinates, selection, proportional_size, chunk_size=64):
+    """
+    the distance of a vertex is the distance to the closest selected vertex,
+    only vertices within the bounding box of the selection grown by proportional_size are measured
+    :return: the indices of the affected vertices and their weights, 1 for the selected vertices
+    """
+    selected_coordinates = coordinates[selection]
+    if not len(selected_coordinates):
+        return numpy.empty(0, dtype=numpy.int64), numpy.empty(0)
+
+    lower_bounds = selected_coordinates.min(axis=0) - proportional_size
+    upper_bounds = selected_coordinates.max(axis=0) + proportional_size
+    candidates = numpy.flatnonzero(((coordinates >= lower_bounds) & (coordinates <= upper_bounds)).all(axis=1))
+    candidate_coordinates = coordinates[candidates]
+
+    distances = numpy.full(len(candidates), numpy.inf)
+    for start in range(0, len(selected_coordinates), chunk_size):
+        chunk = selected_coordinates[start:start + chunk_size]
+        differences = candidate_coordinates[:, None, :] - chunk[None, :, :]
+        numpy.minimum(distances, numpy.sqrt((differences ** 2).sum(axis=2)).min(axis=1), out=distances)
+
+    weights = get_smooth_falloff(distances, proportional_size)
+    affected = weights > 0.0
+    return candidates[affected], weights[affected]
+
+
+def proportional_translate(coordinates, selection, offset, proportional_size, matrix=None):
+    """
+    :return: the coordinates with the selection moved by the offset and its surroundings following
+    """
+    offset = numpy.asarray(offset, dtype=numpy.float64)
+    measured_coordinates = coordinates
+    if matrix is not None:
+        measured_coordinates = transform_coordinates(coordinates, matrix)
+        offset = numpy.linalg.solve(numpy.asarray(matrix, dtype=numpy.float64)[:3, :3], offset)
+
+    indices, weights = get_proportional_weights(measured_coordinates, selection, proportional_size)
+
+    translated_coordinates = coordinates.copy()
+    translated_coordinates[indices] += weights[:, None] * offset
+    return translated_coordinates
+
+
+def proportional_shrink_fatten(coordinates, normals, selection, shrink_amount, proportional_size, matrix=None):
+    """
+    moves vertices along their local normals like shrink_fatten, a positive amount shrinks
+    :param normals: (vertices, 3) array of the local vertex normals
+    """
+    measured_coordinates = coordinates if matrix is None else transform_coordinates(coordinates, matrix)
+    indices, weights = get_proportional_weights(measured_coordinates, selection, proportional_size)
+
+    shrunk_coordinates = coordinates.copy()
+    shrunk_coordinates[indices] -= (weights * shrink_amount)[:, None] * normals[indices]
+    return shrunk_coordinates
+
+
+def bend(coordinates, angle):
+    """
+    the BEND mode of the SimpleDeform modifier with its default origin and limits,
+    bends around the Z axis so that the X extent of the mesh turns by the angle
+    :return: the bent coordinates
+    """
+    bent_coordinates = coordinates.copy()
+    if not len(coordinates):
+        return bent_coordinates
+
+    x_coords, y_coords = coordinates[:, 0], coordinates[:, 1]
+    factor = angle / max(x_coords.max() - x_coords.min(), numpy.finfo(numpy.float32).eps)
+
+    #the modifier leaves the vertices in place for a vanishing bend, consecutive bends do not fold into one
+    #since the factor of the next bend depends on the extent after this one
+    if abs(factor) <= 1e-7:
+        return bent_coordinates
+
+    radius = 1.0 / factor
+    theta = x_coords * factor
+    bent_coordinates[:, 0] = -(y_coords - radius) * numpy.sin(theta)
+    bent_coordinates[:, 1] = (y_coords - radius) * numpy.cos(theta) + radius
+    return bent_coordinates
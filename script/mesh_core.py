@@ -0,0 +1,210 @@
+"""
+Array backed meshes and the SVG to extruded frame step, without Blender.
+
+create_mesh_from_svg_file does what create_mesh_from_svg in run.py does to an imported SVG:
+scale it to the desired width, extrude it and weld it into a single closed mesh.
+The result can be saved and loaded into Blender with create_object_from_array_mesh in run.py,
+so this step can run in any Python process. Its scaling factor gives the object the same local units
+as the SVG imported by Blender, which the operators pipeline measures some of its edits in.
+"""
+import numpy
+
+from svg_reader import read_svg_outlines, DEFAULT_CURVE_RESOLUTION
+from triangulation import triangulate_polygon
+
+#the Blender units Blender's SVG importer gives one SVG user unit, 90 user units per inch in m.
+#The operators pipeline scales the imported SVG up from these units to mm and measures some edits in them
+SVG_IMPORT_SCALE = 1.0 / 90.0 * 0.3048 / 12.0
+
+
+class ArrayMesh(object):
+    """
+    A triangle mesh held as two contiguous arrays.
+    :ivar vertices: (vertices, 3) float64 array
+    :ivar faces: (faces, 3) int32 array of vertex indices, counter-clockwise seen from outside
+    """
+
+    __slots__ = ("vertices", "faces")
+
+    def __init__(self, vertices, faces):
+        self.vertices = numpy.ascontiguousarray(vertices, dtype=numpy.float64).reshape(-1, 3)
+        self.faces = numpy.ascontiguousarray(faces, dtype=numpy.int32).reshape(-1, 3)
+
+    @property
+    def vertex_count(self):
+        return len(self.vertices)
+
+    @property
+    def face_count(self):
+        return len(self.faces)
+
+    def copy(self):
+        return ArrayMesh(self.vertices.copy(), self.faces.copy())
+
+    def get_dimensions(self):
+        return self.vertices.max(axis=0) - self.vertices.min(axis=0)
+
+    def save(self, path):
+        numpy.savez(path, vertices=self.vertices, faces=self.faces)
+
+    @classmethod
+    def load(cls, path):
+        with numpy.load(path) as data:
+            return cls(data["vertices"], data["faces"])
+
+
+class Outline(object):
+    """
+    A filled region of the SVG, an outer ring with the holes inside of it.
+    :ivar outer_ring: (points, 2) array, counter-clockwise
+    :ivar holes: list of (points, 2) arrays, clockwise
+    """
+
+    __slots__ = ("outer_ring", "holes")
+
+    def __init__(self, outer_ring, holes=None):
+        self.outer_ring = outer_ring
+        self.holes = holes or []
+
+    @property
+    def rings(self):
+        return [self.outer_ring] + self.holes
+
+
+def get_signed_area(ring):
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * (numpy.dot(x, numpy.roll(y, -1)) - numpy.dot(y, numpy.roll(x, -1)))
+
+
+def is_inside(points, ring):
+    """even-odd test of the points against the ring, vectorized over the points"""
+    x, y = points[:, 0][:, None], points[:, 1][:, None]
+    start_x, start_y = ring[:, 0][None, :], ring[:, 1][None, :]
+    end_x, end_y = numpy.roll(ring[:, 0], -1)[None, :], numpy.roll(ring[:, 1], -1)[None, :]
+
+    crosses = (start_y > y) != (end_y > y)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        intersection_x = start_x + (y - start_y) * (end_x - start_x) / (end_y - start_y)
+    return (crosses & (x < intersection_x)).sum(axis=1) % 2 == 1
+
+
+def group_rings_into_outlines(rings):
+    """
+    pairs every hole with the ring around it, the same fill nesting Blender uses for SVG curves
+    """
+    areas = numpy.array([abs(get_signed_area(ring)) for ring in rings])
+    #a ring is contained by the rings its first point is inside of
+    containers = [[other for other in range(len(rings)) if other != index and is_inside(ring[:1], rings[other])[0]]
+                  for index, ring in enumerate(rings)]
+
+    outlines = {}
+    holes = []
+    for index, ring in enumerate(rings):
+        if len(containers[index]) % 2 == 0:
+            outlines[index] = Outline(orient_ring(ring, counter_clockwise=True))
+        else:
+            holes.append(index)
+
+    for index in holes:
+        #the smallest container is the direct parent
+        parent = min(containers[index], key=lambda container: areas[container])
+        outlines[parent].holes.append(orient_ring(rings[index], counter_clockwise=False))
+
+    return [outlines[index] for index in sorted(outlines)]
+
+
+def orient_ring(ring, counter_clockwise=True):
+    if (get_signed_area(ring) > 0) != counter_clockwise:
+        return ring[::-1].copy()
+    return ring
+
+
+def compute_scaling_factor(svg_width, desired_width):
+    return desired_width / svg_width
+
+
+def scale_rings_to_lifesize(rings, desired_width):
+    """
+    scales the rings to the desired width around the median of their points,
+    the semantics of compute_svg_scaling_factor and scale_svg_to_lifesize
+    :return: the scaled rings and the scaling factor from SVG user units to mm
+    """
+    points = numpy.concatenate(rings)
+    svg_width = points[:, 0].max() - points[:, 0].min()
+    scaling_factor = compute_scaling_factor(svg_width, desired_width)
+    median = points.mean(axis=0)
+    return [(ring - median) * scaling_factor for ring in rings], scaling_factor
+
+
+def extrude_outlines(outlines, extrude_amount):
+    """
+    Extrudes the filled outlines into a closed mesh from z=-extrude_amount to z=extrude_amount,
+    both ways like the extrude of a Blender curve.
+    Side walls share their vertices with the caps, so the result needs no welding.
+    """
+    vertex_blocks = []
+    face_blocks = []
+    offset = 0
+
+    for outline in outlines:
+        rings = outline.rings
+        ring_points = numpy.concatenate(rings)
+        point_count = len(ring_points)
+
+        top = numpy.column_stack((ring_points, numpy.full(point_count, extrude_amount)))
+        bottom = numpy.column_stack((ring_points, numpy.full(point_count, -extrude_amount)))
+        vertex_blocks.extend((top, bottom))
+
+        cap = numpy.array(triangulate_polygon(outline.outer_ring, outline.holes), dtype=numpy.int64).reshape(-1, 3)
+        cap = orient_triangles_up(cap, ring_points)
+        face_blocks.append(cap + offset)
+        face_blocks.append(cap[:, ::-1] + offset + point_count)
+
+        #walls, the rings are oriented so that the filled side is on the left
+        ring_start = 0
+        for ring in rings:
+            current = numpy.arange(len(ring)) + ring_start
+            following = numpy.roll(current, -1)
+            top_current, top_following = current + offset, following + offset
+            bottom_current, bottom_following = top_current + point_count, top_following + point_count
+            face_blocks.append(numpy.column_stack((bottom_current, bottom_following, top_following)))
+            face_blocks.append(numpy.column_stack((bottom_current, top_following, top_current)))
+            ring_start += len(ring)
+
+        offset += 2 * point_count
+
+    if not vertex_blocks:
+        return ArrayMesh(numpy.zeros((0, 3)), numpy.zeros((0, 3)))
+    return ArrayMesh(numpy.concatenate(vertex_blocks), numpy.concatenate(face_blocks))
+
+
+def orient_triangles_up(triangles, points):
+    """flips the triangles that are clockwise seen from above"""
+    a, b, c = points[triangles[:, 0]], points[triangles[:, 1]], points[triangles[:, 2]]
+    clockwise = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]) < 0
+    triangles = triangles.copy()
+    triangles[clockwise] = triangles[clockwise][:, ::-1]
+    return triangles
+
+
+def create_mesh_from_svg_file(svg_path, desired_width, extrude_amount, curve_resolution=DEFAULT_CURVE_RESOLUTION):
+    """
+    Creates a 3D mesh from a 2D SVG file, with coordinates in mm and desired_width mm wide.
+    The extrusion follows the SVG imported by Blender rather than a thickness in mm:
+    the mesh runs from -extrude_amount / 1000 to extrude_amount / 1000 in the units of the imported SVG,
+    so the thickness in mm is 2 * extrude_amount / 1000 times the returned scaling factor
+    and grows with how small the SVG is drawn.
+    :param desired_width: the width of the frame in mm
+    :param extrude_amount: the desired_thickness of create_eyeglasses_from_svg, see above, not a thickness in mm
+    :param curve_resolution: the segments per curve when flattening the SVG
+    :return: the mesh and the scaling factor from the units of the imported SVG to mm,
+             the scale scale_svg_to_lifesize gives the SVG object
+    """
+    rings = read_svg_outlines(svg_path, curve_resolution)
+    if not rings:
+        raise ValueError("no closed shapes found in {}".format(svg_path))
+
+    rings, scaling_factor = scale_rings_to_lifesize(rings, desired_width)
+    import_scaling_factor = scaling_factor / SVG_IMPORT_SCALE
+    outlines = group_rings_into_outlines(rings)
+    return extrude_outlines(outlines, extrude_amount / 1000 * import_scaling_factor), import_scaling_factor
@@ -0,0 +1,181 @@
+"""
+Measures how far apart two triangle meshes are, to check that a change to the pipeline kept the geometry.
+
+Both surfaces are split by their longest edges until no edge is longer than the sample spacing,
+then the corners of the pieces are their samples.
+Every point of a surface is within spacing / sqrt(3) of one of its samples, so the symmetric Hausdorff distance
+between the samples is within that of the distance between the surfaces, and it is 0 for identical meshes.
+The nearest samples are found with SciPy's cKDTree when it is installed. Otherwise they are looked up
+in a grid of cells as wide as the spacing, skipping the neighbouring cells further away than the closest sample
+found so far, and the samples with no other sample in a neighbouring cell look again in a grid of larger cells.
+"""
+import math
+
+import numpy
+
+from symmetry import CELL_OFFSETS
+from welding import get_cell_keys
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    #the grid of cells is used instead
+    cKDTree = None
+
+#in mm
+DEFAULT_SAMPLE_SPACING = 0.2
+
+#candidate distances computed at once by the grid of cells
+DEFAULT_CHUNK_SIZE = 1 << 22
+
+
+def get_triangle_areas(corners):
+    """:param corners: (triangles, 3, 3) array of the corners of every triangle"""
+    crossings = numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    return numpy.sqrt((crossings ** 2).sum(axis=1)) / 2.0
+
+
+def get_surface_area(corners):
+    return float(get_triangle_areas(corners).sum())
+
+
+def get_volume(corners):
+    """:return: the enclosed volume, for a closed mesh with its triangles facing outward"""
+    return float(numpy.einsum("ij,ij->i", corners[:, 0], numpy.cross(corners[:, 1], corners[:, 2])).sum() / 6.0)
+
+
+def split_long_triangles(corners, max_edge_length):
+    """
+    :return: the triangles split in half across their longest edge, until no edge is longer than max_edge_length
+    """
+    split_corners = []
+    while len(corners):
+        lengths = numpy.sqrt(((corners[:, [1, 2, 0]] - corners) ** 2).sum(axis=2))
+        longest = numpy.argmax(lengths, axis=1)
+        too_long = lengths[numpy.arange(len(corners)), longest] > max_edge_length
+        split_corners.append(corners[~too_long])
+
+        #turned so the longest edge runs from the first to the second corner, which keeps the triangles facing outward
+        order = (longest[too_long, None] + numpy.arange(3)) % 3
+        corners = corners[too_long][numpy.arange(len(order))[:, None], order]
+        first, second, third = corners[:, 0], corners[:, 1], corners[:, 2]
+        middle = (first + second) / 2.0
+        corners = numpy.concatenate((numpy.stack((first, middle, third), axis=1),
+                                     numpy.stack((middle, second, third), axis=1)))
+
+    return numpy.concatenate(split_corners)
+
+
+def sample_surface(corners, spacing=DEFAULT_SAMPLE_SPACING):
+    """:return: (samples, 3) array, every point of the surface is within spacing / sqrt(3) of a sample"""
+    #every point of a triangle is within its longest edge / sqrt(3) of one of its corners
+    points = split_long_triangles(numpy.asarray(corners, dtype=numpy.float64), spacing).reshape(-1, 3)
+
+    #most corners are shared by several pieces, sorting one hash of their bits brings them together much faster
+    #than sorting by X, Y and Z, a rare collision only keeps a duplicate
+    bits = points.view(numpy.uint64)
+    keys = numpy.zeros(len(points), dtype=numpy.uint64)
+    for axis in range(3):
+        #shifted before every multiplication, or the sign bits of mirrored points cancel out
+        keys ^= bits[:, axis]
+        keys ^= keys >> numpy.uint64(31)
+        keys *= numpy.uint64(0x9E3779B97F4A7C15)
+    points = points[numpy.argsort(keys)]
+    return points[numpy.append(True, (numpy.diff(points, axis=0) != 0.0).any(axis=1))]
+
+
+def get_nearest_distances_in_cells(points, reference_points, cell_size, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :return: the distance from every point to the closest reference point
+    """
+    nearest = numpy.full(len(points), numpy.inf)
+    unresolved = numpy.arange(len(points) if len(reference_points) else 0)
+    while len(unresolved):
+        nearest[unresolved] = search_neighbouring_cells(points[unresolved], reference_points, cell_size, chunk_size)
+
+        #a closer reference point may lie outside of the neighbouring cells, those points look again in larger cells
+        unresolved = unresolved[nearest[unresolved] > cell_size]
+        cell_size *= 2.0
+
+    return nearest
+
+
+def search_neighbouring_cells(points, reference_points, cell_size, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :return: the distance from every point to the closest reference point in its own or a neighbouring cell,
+             infinite when there is none
+    """
+    keys, steps = get_cell_keys(numpy.concatenate((points, reference_points)), cell_size)
+    keys, reference_keys = keys[:len(points)], keys[len(points):]
+    order = numpy.argsort(reference_keys, kind="mergesort")
+    sorted_keys = reference_keys[order]
+
+    #the squared distance from every point to the lower and the upper side of its cell along each axis
+    fractions = points / cell_size - numpy.floor(points / cell_size)
+    lower_gaps, upper_gaps = (fractions * cell_size) ** 2, ((1.0 - fractions) * cell_size) ** 2
+
+    nearest = numpy.full(len(points), numpy.inf)
+    #the own cell first, then the cells sharing a face, an edge and a corner with it
+    for offset in sorted(CELL_OFFSETS, key=lambda offset: numpy.abs(offset).sum()):
+        #a cell further away than the closest reference point found so far can not hold a closer one
+        offset = numpy.array(offset)
+        squared_gaps = numpy.zeros(len(points))
+        for axis in numpy.flatnonzero(offset):
+            squared_gaps += (lower_gaps if offset[axis] < 0 else upper_gaps)[:, axis]
+        searched = numpy.flatnonzero(squared_gaps < nearest ** 2)
+
+        neighbour_keys = keys[searched] + offset.dot(steps)
+        starts = numpy.searchsorted(sorted_keys, neighbour_keys, side="left")
+        counts = numpy.searchsorted(sorted_keys, neighbour_keys, side="right") - starts
+
+        #every point expanded into one candidate per reference point in the cell, a bounded number at a time
+        ends = numpy.cumsum(counts)
+        chunk_starts = numpy.searchsorted(ends, numpy.arange(0, ends[-1] if len(ends) else 0, chunk_size), side="right")
+        for first_point, last_point in zip(chunk_starts, numpy.append(chunk_starts[1:], len(searched))):
+            chunk_counts = counts[first_point:last_point]
+            first = numpy.repeat(numpy.arange(first_point, last_point), chunk_counts)
+            if not len(first):
+                continue
+
+            ramp = numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+            second = order[numpy.repeat(starts[first_point:last_point], chunk_counts) + ramp]
+            squared_distances = ((points[searched[first]] - reference_points[second]) ** 2).sum(axis=1)
+
+            #first is sorted, so the closest candidate of every point is the minimum of its run
+            run_starts = numpy.flatnonzero(numpy.diff(numpy.append(-1, first)))
+            candidates = searched[first[run_starts]]
+            closest = numpy.sqrt(numpy.minimum.reduceat(squared_distances, run_starts))
+            nearest[candidates] = numpy.minimum(nearest[candidates], closest)
+
+    return nearest
+
+
+def get_nearest_distances(points, reference_points, cell_size):
+    if cKDTree is not None:
+        return cKDTree(reference_points).query(points)[0]
+    return get_nearest_distances_in_cells(points, reference_points, cell_size)
+
+
+def compare_meshes(corners, reference_corners, sample_spacing=DEFAULT_SAMPLE_SPACING):
+    """
+    :param corners: (triangles, 3, 3) array of the corners of every triangle, such as mesh_io.read_stl returns
+    :return: dict of the symmetric Hausdorff distance and the mean distance between the surfaces in mm,
+             the sampling error they are within, and the area and volume of both meshes with their relative change
+    """
+    samples = sample_surface(corners, sample_spacing)
+    reference_samples = sample_surface(reference_corners, sample_spacing)
+    distances = get_nearest_distances(samples, reference_samples, sample_spacing)
+    reference_distances = get_nearest_distances(reference_samples, samples, sample_spacing)
+
+    comparison = {"hausdorff_distance": float(max(distances.max(), reference_distances.max())),
+                  "mean_distance": float((distances.sum() + reference_distances.sum()) /
+                                         (len(distances) + len(reference_distances))),
+                  "sampling_error": sample_spacing / math.sqrt(3.0)}
+
+    for name, measure in (("area", get_surface_area), ("volume", get_volume)):
+        value, reference_value = measure(corners), measure(reference_corners)
+        comparison[name] = value
+        comparison["reference_" + name] = reference_value
+        comparison[name + "_change"] = (value - reference_value) / reference_value if reference_value else None
+
+    return comparison
@@ -0,0 +1,80 @@
+"""
+Hands meshes and values between Blender processes through a shared directory.
+
+Meshes are stored as checkpoint files and read back memory-mapped,
+so a process maps the arrays instead of parsing them. The directory is created in /dev/shm
+where it exists, which keeps the files in shared memory instead of on disk.
+Every file is written under a temporary name and renamed, so a reader never sees half of a file.
+"""
+import json
+import os
+import tempfile
+import time
+
+import checkpoint
+
+SHARED_MEMORY_DIRECTORY = "/dev/shm"
+
+#how often wait_for_value looks for the value, in seconds
+POLL_INTERVAL = 0.01
+
+
+def create_exchange_directory():
+    parent_directory = SHARED_MEMORY_DIRECTORY if os.path.isdir(SHARED_MEMORY_DIRECTORY) else None
+    return tempfile.mkdtemp(prefix="pince-nez-", dir=parent_directory)
+
+
+def get_mesh_path(directory, name):
+    return os.path.join(directory, name + ".mesh")
+
+
+def write_file_atomically(path, write):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as output_file:
+        write(output_file)
+    os.replace(temporary_path, path)
+
+
+def write_mesh(directory, name, vertices, loop_totals, loop_vertices, matrix_world=None):
+    """
+    :param loop_totals: the number of corners of every polygon
+    :param loop_vertices: the vertex indices of the corners of all polygons, one polygon after the other
+    """
+    write_file_atomically(get_mesh_path(directory, name),
+                          lambda output_file: checkpoint.write_checkpoint(output_file, vertices, loop_totals,
+                                                                          loop_vertices, matrix_world))
+
+
+def has_mesh(directory, name):
+    return os.path.exists(get_mesh_path(directory, name))
+
+
+def read_mesh(directory, name):
+    """
+    :return: dict of the read-only memory-mapped vertices, loop_totals and loop_vertices, and the matrix_world
+    """
+    return checkpoint.read_checkpoint(get_mesh_path(directory, name))
+
+
+def write_value(directory, name, value):
+    """writes a JSON value, such as the parameters of a job or a single number"""
+    write_file_atomically(os.path.join(directory, name + ".json"),
+                          lambda output_file: output_file.write(json.dumps(value).encode("utf-8")))
+
+
+def read_value(directory, name):
+    with open(os.path.join(directory, name + ".json")) as value_file:
+        return json.load(value_file)
+
+
+def wait_for_value(directory, name, timeout=None):
+    """
+    :return: the value once another process has written it
+    """
+    path = os.path.join(directory, name + ".json")
+    start_time = time.time()
+    while not os.path.exists(path):
+        if timeout is not None and time.time() - start_time > timeout:
+            raise RuntimeError("timed out waiting for {} in {}".format(name, directory))
+        time.sleep(POLL_INTERVAL)
+    return read_value(directory, name)
@@ -0,0 +1,167 @@
+"""
+Writes triangle meshes held as arrays to binary STL and 3MF, without Blender's exporters.
+
+The triangles are written a chunk at a time, so the memory used on top of the mesh arrays
+stays bounded no matter how large the mesh is.
+Writing only needs NumPy. STL is written with NumPy and file writes that release the GIL,
+so write_meshes writes many STL files in parallel threads. The text of 3MF is formatted in Python
+while holding the GIL, so of a 3MF write only the compression and the file writes overlap with other threads.
+"""
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy
+
+DEFAULT_CHUNK_SIZE = 65536
+
+STL_HEADER = b"pince-nez binary STL"
+
+STL_TRIANGLE = numpy.dtype([("normal", "<f4", (3,)),
+                            ("vertices", "<f4", (3, 3)),
+                            ("attribute", "<u2")])
+
+THREE_MF_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>
+</Types>
+"""
+
+THREE_MF_RELATIONSHIPS = """<?xml version="1.0" encoding="UTF-8"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Target="/3D/3dmodel.model" Id="rel0"
+ Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>
+</Relationships>
+"""
+
+THREE_MF_MODEL_START = """<?xml version="1.0" encoding="UTF-8"?>
+<model unit="millimeter" xml:lang="en-US" xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">
+<resources>
+<object id="1" type="model">
+<mesh>
+"""
+
+THREE_MF_MODEL_END = """</mesh>
+</object>
+</resources>
+<build>
+<item objectid="1"/>
+</build>
+</model>
+"""
+
+
+def get_triangle_normals(triangle_coordinates):
+    """
+    :param triangle_coordinates: (triangles, 3, 3) array of the corners of every triangle
+    :return: (triangles, 3) array of unit normals, zero for degenerate triangles
+    """
+    normals = numpy.cross(triangle_coordinates[:, 1] - triangle_coordinates[:, 0],
+                          triangle_coordinates[:, 2] - triangle_coordinates[:, 0])
+    lengths = numpy.sqrt((normals ** 2).sum(axis=1))
+    lengths[lengths == 0.0] = 1.0
+    return normals / lengths[:, None]
+
+
+def write_stl(path, vertices, triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :param vertices: (vertices, 3) array, in mm
+    :param triangles: (triangles, 3) array of vertex indices, counter-clockwise seen from outside
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float32)
+    triangles = numpy.asarray(triangles)
+
+    with open(path, "wb") as stl_file:
+        stl_file.write(STL_HEADER.ljust(80, b" "))
+        stl_file.write(numpy.array([len(triangles)], dtype="<u4").tobytes())
+
+        records = numpy.zeros(min(chunk_size, len(triangles)), dtype=STL_TRIANGLE)
+        for start in range(0, len(triangles), chunk_size):
+            chunk = records[:len(triangles[start:start + chunk_size])]
+            chunk["vertices"] = vertices[triangles[start:start + chunk_size]]
+            chunk["normal"] = get_triangle_normals(chunk["vertices"].astype(numpy.float64))
+            stl_file.write(chunk.tobytes())
+
+
+def read_stl(path):
+    """
+    :return: the (triangles, 3, 3) array of the corners of every triangle in a binary STL
+    """
+    with open(path, "rb") as stl_file:
+        stl_file.seek(80)
+        count = int(numpy.frombuffer(stl_file.read(4), dtype="<u4")[0])
+        records = numpy.frombuffer(stl_file.read(count * STL_TRIANGLE.itemsize), dtype=STL_TRIANGLE)
+
+    if len(records) != count:
+        raise ValueError("{} is not a binary STL or is truncated".format(path))
+    return records["vertices"].astype(numpy.float64)
+
+
+def write_chunked_lines(model_file, line_format, values, chunk_size):
+    """formats the rows of values a chunk at a time, with a single string formatting per chunk"""
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        model_file.write(((line_format * len(chunk)) % tuple(chunk.ravel().tolist())).encode("utf-8"))
+
+
+def write_3mf(path, vertices, triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :param vertices: (vertices, 3) array, in mm
+    :param triangles: (triangles, 3) array of vertex indices, counter-clockwise seen from outside
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float32)
+    triangles = numpy.asarray(triangles, dtype=numpy.int64)
+
+    #the model is streamed to a temporary file, the zip module of Blender's python can not stream into an archive
+    model_file_descriptor, model_path = tempfile.mkstemp(suffix=".model")
+    try:
+        with os.fdopen(model_file_descriptor, "wb") as model_file:
+            model_file.write(THREE_MF_MODEL_START.encode("utf-8"))
+            model_file.write(b"<vertices>\n")
+            write_chunked_lines(model_file, '<vertex x="%.6g" y="%.6g" z="%.6g"/>\n', vertices, chunk_size)
+            model_file.write(b"</vertices>\n<triangles>\n")
+            write_chunked_lines(model_file, '<triangle v1="%d" v2="%d" v3="%d"/>\n', triangles, chunk_size)
+            model_file.write(b"</triangles>\n")
+            model_file.write(THREE_MF_MODEL_END.encode("utf-8"))
+
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("[Content_Types].xml", THREE_MF_CONTENT_TYPES)
+            archive.writestr("_rels/.rels", THREE_MF_RELATIONSHIPS)
+            archive.write(model_path, "3D/3dmodel.model")
+    finally:
+        os.remove(model_path)
+
+
+WRITERS = {".stl": write_stl, ".3mf": write_3mf}
+
+
+def is_supported(path):
+    return os.path.splitext(path)[1].lower() in WRITERS
+
+
+def write_mesh(path, vertices, triangles, chunk_size=DEFAULT_CHUNK_SIZE):
+    """writes the mesh in the format of the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError("unsupported output format {}".format(extension))
+
+    output_directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    WRITERS[extension](path, vertices, triangles, chunk_size)
+
+
+def write_meshes(meshes, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :param meshes: list of (path, vertices, triangles)
+    :param workers: number of writing threads, defaults to the cores
+    """
+    workers = workers or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_mesh, path, vertices, triangles, chunk_size)
+                   for path, vertices, triangles in meshes]
+        for future in futures:
+            future.result()
@@ -0,0 +1,269 @@
+"""
+Packs finished frames onto build plates and writes every plate as one mesh file.
+
+    python plating.py FRAMES_DIRECTORY_OR_RESULTS OUTPUT_DIRECTORY --bed 250 210 --spacing 5
+
+The frames are binary STLs, from a directory or from the results.jsonl of batch.py.
+Every frame is laid down on its thinnest side and its footprint is the bounding rectangle of that side.
+The footprints are packed largest first by MaxRects with the best short side fit,
+both as they are and turned by 90 degrees. Frames that do not fit on a plate start the next one.
+The free space of a plate is kept as an array of maximal rectangles,
+so placing a frame is a few vectorized operations over them rather than a loop.
+The layout of every plate is written to plates.json. Like batch.py this only needs NumPy.
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy
+
+import mesh_io
+
+#in mm, the bed of a common desktop printer
+DEFAULT_BED_SIZE = (250.0, 210.0)
+
+#in mm between neighbouring frames, half of it is kept from the edges of the bed
+DEFAULT_SPACING = 5.0
+
+LAYOUT_FILE_NAME = "plates.json"
+
+
+def lay_flat(corners):
+    """
+    :param corners: (triangles, 3, 3) array of the corners of every triangle
+    :return: the corners turned so the thinnest side of the bounding box faces down, with the box starting at 0
+    """
+    points = corners.reshape(-1, 3)
+    thinnest_axis = int(numpy.argmin(points.max(axis=0) - points.min(axis=0)))
+
+    #a cyclic order of the axes is a rotation, so the triangles keep facing outward
+    axes = [(thinnest_axis + 1) % 3, (thinnest_axis + 2) % 3, thinnest_axis]
+    flat_corners = corners[:, :, axes]
+    return flat_corners - flat_corners.reshape(-1, 3).min(axis=0)
+
+
+def get_footprint(flat_corners):
+    """:return: the width and depth of a frame laid flat"""
+    return flat_corners.reshape(-1, 3)[:, :2].max(axis=0)
+
+
+def turn(flat_corners):
+    """:return: the corners turned by 90 degrees about Z, with the box still starting at 0"""
+    turned_corners = flat_corners[:, :, [1, 0, 2]]
+    turned_corners[:, :, 0] *= -1.0
+    return turned_corners - turned_corners.reshape(-1, 3).min(axis=0)
+
+
+class Plate(object):
+    """
+    :ivar free_rectangles: (rectangles, 4) array of the minimum and maximum X and Y of every maximal free rectangle
+    """
+
+    def __init__(self, width, depth):
+        self.free_rectangles = numpy.array([[0.0, 0.0, width, depth]])
+
+    def find_position(self, width, depth):
+        """
+        :return: the X and Y of the best free spot and whether the rectangle is turned to fit it,
+                 None when it does not fit
+        """
+        free_widths = self.free_rectangles[:, 2] - self.free_rectangles[:, 0]
+        free_depths = self.free_rectangles[:, 3] - self.free_rectangles[:, 1]
+
+        best_fit = None
+        for turned, (fitted_width, fitted_depth) in ((False, (width, depth)), (True, (depth, width))):
+            fits = numpy.flatnonzero((free_widths >= fitted_width) & (free_depths >= fitted_depth))
+            if not len(fits):
+                continue
+
+            #the smallest leftover along the shorter side, then along the longer side
+            leftover_widths = free_widths[fits] - fitted_width
+            leftover_depths = free_depths[fits] - fitted_depth
+            short_sides = numpy.minimum(leftover_widths, leftover_depths)
+            long_sides = numpy.maximum(leftover_widths, leftover_depths)
+            best = numpy.lexsort((long_sides, short_sides))[0]
+
+            fit = (short_sides[best], long_sides[best], turned, fits[best])
+            if best_fit is None or fit[:2] < best_fit[:2]:
+                best_fit = fit
+
+        if best_fit is None:
+            return None
+
+        x_coord, y_coord = self.free_rectangles[best_fit[3], :2]
+        return float(x_coord), float(y_coord), best_fit[2]
+
+    def place(self, x_coord, y_coord, width, depth):
+        """splits the free rectangles the placed rectangle overlaps into the free space around it"""
+        placed = numpy.array([x_coord, y_coord, x_coord + width, y_coord + depth])
+        free = self.free_rectangles
+
+        overlaps = ((free[:, 0] < placed[2]) & (free[:, 2] > placed[0]) &
+                    (free[:, 1] < placed[3]) & (free[:, 3] > placed[1]))
+        split = free[overlaps]
+
+        #the parts of every overlapped rectangle left, right, below and above the placed one
+        left, right, below, above = split.copy(), split.copy(), split.copy(), split.copy()
+        left[:, 2] = placed[0]
+        right[:, 0] = placed[2]
+        below[:, 3] = placed[1]
+        above[:, 1] = placed[3]
+        pieces = numpy.concatenate((left, right, below, above))
+        pieces = pieces[(pieces[:, 2] > pieces[:, 0]) & (pieces[:, 3] > pieces[:, 1])]
+
+        self.free_rectangles = remove_contained_rectangles(numpy.concatenate((free[~overlaps], pieces)))
+
+
+def remove_contained_rectangles(rectangles):
+    """:return: the rectangles that are not inside another one, one of every set of equal rectangles"""
+    #contains[i, j] when rectangle j contains rectangle i
+    minimums, maximums = rectangles[:, :2], rectangles[:, 2:]
+    contains = ((minimums[None, :] <= minimums[:, None]).all(axis=2) &
+                (maximums[None, :] >= maximums[:, None]).all(axis=2))
+    equal = (rectangles[None, :, :] == rectangles[:, None, :]).all(axis=2)
+
+    indices = numpy.arange(len(rectangles))
+    #of equal rectangles, the first one stays
+    covered = contains & (~equal | (indices[None, :] < indices[:, None]))
+    return rectangles[~covered.any(axis=1)]
+
+
+def pack_footprints(footprints, bed_size=DEFAULT_BED_SIZE, spacing=DEFAULT_SPACING):
+    """
+    :param footprints: (frames, 2) array of the width and depth of every frame
+    :return: the plate index, X, Y and whether it is turned for every frame, None for frames larger than the bed
+    """
+    footprints = numpy.asarray(footprints, dtype=numpy.float64).reshape(-1, 2) + spacing
+    placements = [None] * len(footprints)
+    plates = []
+
+    for index in numpy.argsort(-footprints.prod(axis=1), kind="mergesort").tolist():
+        width, depth = footprints[index]
+        for plate_index, plate in enumerate(plates + [Plate(*bed_size)]):
+            position = plate.find_position(width, depth)
+            if position is None:
+                continue
+
+            x_coord, y_coord, turned = position
+            plate.place(x_coord, y_coord, *((depth, width) if turned else (width, depth)))
+            if plate_index == len(plates):
+                plates.append(plate)
+
+            placements[index] = (plate_index, x_coord + spacing / 2.0, y_coord + spacing / 2.0, turned)
+            break
+
+    return placements
+
+
+def weld_plate_corners(frame_corners):
+    """
+    merges the corners every frame shares between its triangles, so a 3MF plate holds closed meshes
+    rather than a triangle soup
+    :param frame_corners: list of (triangles, 3, 3) arrays, one per frame on the plate
+    :return: the vertices and the (triangles, 3) array of vertex indices of the plate
+    """
+    vertex_blocks = []
+    triangle_blocks = []
+    offset = 0
+    for corners in frame_corners:
+        vertices, triangles = numpy.unique(corners.reshape(-1, 3), axis=0, return_inverse=True)
+        vertex_blocks.append(vertices)
+        triangle_blocks.append(triangles.reshape(-1, 3) + offset)
+        offset += len(vertices)
+    return numpy.concatenate(vertex_blocks), numpy.concatenate(triangle_blocks)
+
+
+def plate_frames(frames, output_directory, bed_size=DEFAULT_BED_SIZE, spacing=DEFAULT_SPACING, output_format="stl"):
+    """
+    :param frames: list of (name, corners), the corners of every triangle of a finished frame
+    :return: the layout, the path and frames of every plate and the names of the frames larger than the bed
+    """
+    flat_frames = [lay_flat(corners) for _, corners in frames]
+    placements = pack_footprints([get_footprint(flat_corners) for flat_corners in flat_frames], bed_size, spacing)
+
+    plates = []
+    unplaced = []
+    for (name, _), flat_corners, placement in zip(frames, flat_frames, placements):
+        if placement is None:
+            unplaced.append(name)
+            continue
+
+        plate_index, x_coord, y_coord, turned = placement
+        while len(plates) <= plate_index:
+            plates.append({"frames": [], "corners": []})
+
+        placed_corners = turn(flat_corners) if turned else flat_corners.copy()
+        placed_corners[:, :, 0] += x_coord
+        placed_corners[:, :, 1] += y_coord
+        plates[plate_index]["corners"].append(placed_corners)
+        plates[plate_index]["frames"].append({"name": name, "x": x_coord, "y": y_coord, "turned": turned})
+
+    meshes = []
+    for plate_index, plate in enumerate(plates):
+        plate["path"] = os.path.join(output_directory, "plate_{:03d}.{}".format(plate_index, output_format))
+        meshes.append((plate["path"],) + weld_plate_corners(plate.pop("corners")))
+    mesh_io.write_meshes(meshes)
+
+    layout = {"bed_size": list(bed_size), "spacing": spacing, "plates": plates, "unplaced": unplaced}
+    with open(os.path.join(output_directory, LAYOUT_FILE_NAME), "w") as layout_file:
+        json.dump(layout, layout_file, indent=2)
+    return layout
+
+
+def plate_files(paths, output_directory, bed_size=DEFAULT_BED_SIZE, spacing=DEFAULT_SPACING, output_format="stl"):
+    """:param paths: binary STLs of finished frames"""
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    frames = [(os.path.splitext(os.path.basename(path))[0], mesh_io.read_stl(path)) for path in paths]
+    return plate_frames(frames, output_directory, bed_size, spacing, output_format)
+
+
+def find_frame_files(source):
+    """
+    :param source: a directory of STLs, or the results.jsonl of batch.py
+    :return: the paths of the finished frames, from results.jsonl only the last run of every output that still exists
+    """
+    if os.path.isdir(source):
+        return [os.path.join(source, file_name) for file_name in sorted(os.listdir(source))
+                if file_name.lower().endswith(".stl")]
+
+    #batch.py appends to the results, so an output that was run again keeps only its last record
+    latest_results = {}
+    with open(source) as results_file:
+        for line in results_file:
+            if line.strip():
+                result = json.loads(line)
+                latest_results.pop(result["output"], None)
+                latest_results[result["output"]] = result
+    return [output for output, result in latest_results.items()
+            if result["status"] == "ok" and output.lower().endswith(".stl") and os.path.isfile(output)]
+
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Pack finished frames onto build plates.")
+    parser.add_argument("source", help="a directory of STL frames or the results.jsonl of a batch")
+    parser.add_argument("output_directory")
+    parser.add_argument("--bed", type=float, nargs=2, default=DEFAULT_BED_SIZE, metavar=("WIDTH", "DEPTH"),
+                        help="size of the build plate in mm")
+    parser.add_argument("--spacing", type=float, default=DEFAULT_SPACING, help="mm between neighbouring frames")
+    parser.add_argument("--format", default="stl", choices=["stl", "3mf"])
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parse_arguments(arguments)
+
+    layout = plate_files(find_frame_files(arguments.source), arguments.output_directory, tuple(arguments.bed),
+                         arguments.spacing, arguments.format)
+
+    for plate in layout["plates"]:
+        print("{} frames on {}".format(len(plate["frames"]), plate["path"]))
+    if layout["unplaced"]:
+        print("larger than the bed: {}".format(", ".join(layout["unplaced"])))
+    return 1 if layout["unplaced"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Checks that a finished frame can be printed: a closed manifold surface,
+no faces cutting through each other and no walls much thinner than the frame.
+
+Everything works on the vertex and triangle arrays of the frame.
+Self-intersections and wall thickness use Blender's BVHTree when mathutils is available,
+otherwise a sweep over the bounding boxes of the triangles sorted along X, so the checks also run outside Blender.
+"""
+import math
+
+import numpy
+
+from decimation import get_edges, get_face_normals
+
+try:
+    from mathutils import Vector
+    from mathutils.bvhtree import BVHTree
+except ImportError:
+    #outside of Blender
+    BVHTree = None
+
+#walls thinner than this fraction of desired_thickness are reported as thin
+DEFAULT_MIN_THICKNESS_RATIO = 0.25
+
+#rays start this far inside the surface so they do not hit their own faces
+RAY_OFFSET = 1e-5
+
+#candidate pairs of boxes tested at a time
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+
+def check_manifold(faces):
+    """
+    :return: the number of open edges, of edges with more than two faces,
+             and of edges whose two faces disagree on which side is outside
+    """
+    faces = numpy.asarray(faces, dtype=numpy.int64)
+    edges, edge_indices = get_edges(faces)
+    face_counts = numpy.bincount(edge_indices, minlength=len(edges))
+
+    #consistently wound neighbours run along their shared edge in opposite directions
+    directed_edges = numpy.concatenate((faces[:, [0, 1]], faces[:, [1, 2]], faces[:, [2, 0]]))
+    directed_keys = directed_edges[:, 0] * (faces.max() + 1) + directed_edges[:, 1]
+    _, directed_counts = numpy.unique(directed_keys, return_counts=True)
+
+    return {"open_edges": int((face_counts == 1).sum()),
+            "non_manifold_edges": int((face_counts > 2).sum()),
+            "flipped_edges": int((directed_counts > 1).sum())}
+
+
+def get_vertex_normals(vertices, faces):
+    """:return: the area weighted unit normals of the vertices"""
+    face_normals, areas = get_face_normals(vertices, faces)
+    normals = numpy.zeros((len(vertices), 3))
+    for corner in range(3):
+        numpy.add.at(normals, faces[:, corner], face_normals * areas[:, None])
+
+    lengths = numpy.sqrt((normals ** 2).sum(axis=1))
+    return normals / numpy.where(lengths > 0.0, lengths, 1.0)[:, None]
+
+
+def remove_neighbouring_pairs(faces, pairs):
+    """triangles sharing a vertex always touch, that is not an intersection"""
+    first_faces, second_faces = faces[pairs[:, 0]], faces[pairs[:, 1]]
+    shares_vertex = (first_faces[:, :, None] == second_faces[:, None, :]).any(axis=(1, 2))
+    return pairs[~shares_vertex]
+
+
+def sweep_boxes(first_minimums, first_maximums, second_minimums, second_maximums, include_equal, chunk_size):
+    """
+    Finds the second boxes that start along X within each first box, sorted by where they start
+    :return: generator of (pairs, 2) arrays of a first and a second box that overlap, about chunk_size candidates each
+    """
+    order = numpy.argsort(second_minimums[:, 0], kind="mergesort")
+    sorted_starts = second_minimums[order, 0]
+    lows = numpy.searchsorted(sorted_starts, first_minimums[:, 0], side="left" if include_equal else "right")
+    highs = numpy.searchsorted(sorted_starts, first_maximums[:, 0], side="right")
+    counts = numpy.maximum(highs - lows, 0)
+
+    #chunks of first boxes with about chunk_size candidates between them
+    cumulative_counts = numpy.cumsum(counts)
+    total = cumulative_counts[-1] if len(counts) else 0
+    bounds = numpy.searchsorted(cumulative_counts, numpy.arange(chunk_size, total, chunk_size), side="right")
+    bounds = numpy.unique(numpy.concatenate(([0], bounds, [len(counts)])))
+    for chunk_start, chunk_end in zip(bounds[:-1], bounds[1:]):
+        first_boxes = numpy.arange(chunk_start, chunk_end)
+        chunk_counts = counts[first_boxes]
+        first = numpy.repeat(first_boxes, chunk_counts)
+        offsets = numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+        second = order[lows[first] + offsets]
+
+        overlaps = ((first_minimums[first, 1:] <= second_maximums[second, 1:]) &
+                    (second_minimums[second, 1:] <= first_maximums[first, 1:])).all(axis=1)
+        yield numpy.column_stack((first[overlaps], second[overlaps]))
+
+
+def find_box_pairs(first_minimums, first_maximums, second_minimums, second_maximums, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :return: generator of (pairs, 2) arrays of every first and second box that overlap
+    """
+    #boxes overlap when one of them starts within the other
+    for pairs in sweep_boxes(first_minimums, first_maximums, second_minimums, second_maximums, True, chunk_size):
+        yield pairs
+    for pairs in sweep_boxes(second_minimums, second_maximums, first_minimums, first_maximums, False, chunk_size):
+        yield pairs[:, ::-1]
+
+
+def find_overlapping_triangles(vertices, faces, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :return: generator of (pairs, 2) arrays of triangles whose bounding boxes overlap, each pair once
+    """
+    corners = vertices[faces]
+    minimums, maximums = corners.min(axis=1), corners.max(axis=1)
+    for pairs in sweep_boxes(minimums, maximums, minimums, maximums, True, chunk_size):
+        #boxes starting at the same X find each other, only the lower index is kept
+        starts_together = minimums[pairs[:, 0], 0] == minimums[pairs[:, 1], 0]
+        yield pairs[(pairs[:, 0] < pairs[:, 1]) | ~starts_together & (pairs[:, 0] != pairs[:, 1])]
+
+
+def get_segment_crossings(starts, ends, triangle_corners):
+    """
+    Moller-Trumbore for many segments, each against its own triangle
+    :return: how far along its segment each segment passes through the inside of its triangle, inf where it misses
+    """
+    directions = ends - starts
+    first_edges = triangle_corners[:, 1] - triangle_corners[:, 0]
+    second_edges = triangle_corners[:, 2] - triangle_corners[:, 0]
+
+    p = numpy.cross(directions, second_edges)
+    determinants = (first_edges * p).sum(axis=1)
+    parallel = numpy.abs(determinants) < 1e-12
+    inverse_determinants = 1.0 / numpy.where(parallel, 1.0, determinants)
+
+    t = starts - triangle_corners[:, 0]
+    u = (t * p).sum(axis=1) * inverse_determinants
+    q = numpy.cross(t, first_edges)
+    v = (directions * q).sum(axis=1) * inverse_determinants
+    fractions = (second_edges * q).sum(axis=1) * inverse_determinants
+
+    crosses = ~parallel & (u >= 0.0) & (v >= 0.0) & (u + v <= 1.0) & (fractions >= 0.0) & (fractions <= 1.0)
+    return numpy.where(crosses, fractions, numpy.inf)
+
+
+def get_plane_sides(triangle_corners, points):
+    """:return: the sign of the side of the plane of each triangle that each of its three points is on"""
+    origins = triangle_corners[:, 0]
+    normals = numpy.cross(triangle_corners[:, 1] - origins, triangle_corners[:, 2] - origins)
+    distances = ((points - origins[:, None, :]) * normals[:, None, :]).sum(axis=2)
+    scale = numpy.sqrt((normals ** 2).sum(axis=1))[:, None]
+    return numpy.sign(numpy.where(numpy.abs(distances) > 1e-9 * scale, distances, 0.0))
+
+
+def triangles_intersect(vertices, faces, pairs):
+    """
+    Two triangles that are not coplanar intersect when an edge of one passes through the other
+    :return: mask of the pairs that intersect
+    """
+    first_corners, second_corners = vertices[faces[pairs[:, 0]]], vertices[faces[pairs[:, 1]]]
+
+    #triangles with all corners of the other on one side of their plane can not intersect
+    first_sides = get_plane_sides(first_corners, second_corners)
+    second_sides = get_plane_sides(second_corners, first_corners)
+    straddle = ((numpy.abs(first_sides.sum(axis=1)) < 3) & (numpy.abs(second_sides.sum(axis=1)) < 3) &
+                first_sides.any(axis=1) & second_sides.any(axis=1))
+
+    intersect = numpy.zeros(len(pairs), dtype=bool)
+    candidates = numpy.nonzero(straddle)[0]
+    first_corners, second_corners = first_corners[candidates], second_corners[candidates]
+    for edge_corners, triangle_corners in ((first_corners, second_corners), (second_corners, first_corners)):
+        for start, end in ((0, 1), (1, 2), (2, 0)):
+            crossings = get_segment_crossings(edge_corners[:, start], edge_corners[:, end], triangle_corners)
+            intersect[candidates] |= numpy.isfinite(crossings)
+    return intersect
+
+
+def find_self_intersections(vertices, faces, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    :return: (pairs, 2) array of triangles that cut through each other
+    """
+    if BVHTree is not None:
+        tree = BVHTree.FromPolygons(vertices.tolist(), faces.tolist(), all_triangles=True)
+        pairs = numpy.array(tree.overlap(tree), dtype=numpy.int64).reshape(-1, 2)
+        pairs = pairs[pairs[:, 0] < pairs[:, 1]]
+        return remove_neighbouring_pairs(faces, pairs)
+
+    intersecting = [numpy.zeros((0, 2), dtype=numpy.int64)]
+    for pairs in find_overlapping_triangles(vertices, faces, chunk_size):
+        pairs = remove_neighbouring_pairs(faces, pairs)
+        intersecting.append(pairs[triangles_intersect(vertices, faces, pairs)])
+    return numpy.concatenate(intersecting)
+
+
+def get_wall_thickness_with_rays(vertices, faces, normals, max_thickness):
+    tree = BVHTree.FromPolygons(vertices.tolist(), faces.tolist(), all_triangles=True)
+    thicknesses = numpy.full(len(vertices), numpy.inf)
+    for index, (vertex, normal) in enumerate(zip(vertices.tolist(), normals.tolist())):
+        direction = -Vector(normal)
+        _, _, _, distance = tree.ray_cast(Vector(vertex) + direction * RAY_OFFSET, direction, max_thickness)
+        if distance is not None:
+            thicknesses[index] = distance + RAY_OFFSET
+    return thicknesses
+
+
+def get_wall_thickness_with_segments(vertices, faces, normals, max_thickness, chunk_size=DEFAULT_CHUNK_SIZE):
+    """the same rays as get_wall_thickness_with_rays, as segments tested against the triangles their boxes overlap"""
+    starts = vertices - normals * RAY_OFFSET
+    ends = vertices - normals * max_thickness
+    corners = vertices[faces]
+
+    thicknesses = numpy.full(len(vertices), numpy.inf)
+    for pairs in find_box_pairs(numpy.minimum(starts, ends), numpy.maximum(starts, ends),
+                                corners.min(axis=1), corners.max(axis=1), chunk_size):
+        #the faces around the vertex itself are not the other side of the wall
+        pairs = pairs[(faces[pairs[:, 1]] != pairs[:, 0][:, None]).all(axis=1)]
+        crossings = get_segment_crossings(starts[pairs[:, 0]], ends[pairs[:, 0]], corners[pairs[:, 1]])
+        numpy.minimum.at(thicknesses, pairs[:, 0], RAY_OFFSET + crossings * (max_thickness - RAY_OFFSET))
+    return thicknesses
+
+
+def get_wall_thickness(vertices, faces, max_thickness):
+    """
+    :return: the thickness of the wall behind every vertex, measured against its normal,
+             inf where there is no wall within max_thickness
+    """
+    normals = get_vertex_normals(vertices, faces)
+    if BVHTree is not None:
+        return get_wall_thickness_with_rays(vertices, faces, normals, max_thickness)
+    return get_wall_thickness_with_segments(vertices, faces, normals, max_thickness)
+
+
+def check_printability(vertices, faces, desired_thickness, min_thickness_ratio=DEFAULT_MIN_THICKNESS_RATIO):
+    """
+    :param vertices: (vertices, 3) array, in mm
+    :param faces: (faces, 3) array of vertex indices
+    :param desired_thickness: the thickness the frame was extruded to
+    :return: dict with the counts of the problems found, whether the frame is printable,
+             and the minimum wall thickness, None when no wall is thinner than desired_thickness
+    """
+    vertices = numpy.asarray(vertices, dtype=numpy.float64)
+    faces = numpy.asarray(faces, dtype=numpy.int64)
+
+    report = check_manifold(faces)
+    report["self_intersections"] = len(find_self_intersections(vertices, faces))
+
+    #only walls thinner than the frame matter, so the rays are no longer than desired_thickness
+    thicknesses = get_wall_thickness(vertices, faces, desired_thickness)
+    min_thickness = thicknesses.min() if len(thicknesses) else numpy.inf
+    report["min_thickness"] = None if math.isinf(min_thickness) else float(min_thickness)
+    report["thin_vertices"] = int((thicknesses < desired_thickness * min_thickness_ratio).sum())
+
+    report["printable"] = not any(report[key] for key in ("open_edges", "non_manifold_edges", "flipped_edges",
+                                                          "self_intersections", "thin_vertices"))
+    return report
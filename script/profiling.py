@@ -0,0 +1,239 @@
+"""
+Per-stage timings and mesh sizes of a frame, to find out which stage makes a job slow.
+
+    with profiling.Profiler() as profiler:
+        create_eyeglasses_from_svg()
+    profiler.write("profile.json")
+
+While a profiler runs, every stage records its wall time, the vertex, edge and face counts
+of its objects before and after, and the bpy.ops calls and mode switches made in it.
+The operators are counted by standing in for bpy.ops, which is only done while profiling,
+so when no profiler runs a stage costs a single check.
+"""
+import cProfile
+import json
+import pstats
+import sys
+import time
+from collections import Counter
+
+import bpy
+
+try:
+    import resource
+except ImportError:
+    #not available on Windows
+    resource = None
+
+_active_profiler = None
+
+
+class NullStage(object):
+    """the stage used when nothing is profiled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, exception_traceback):
+        return False
+
+
+NULL_STAGE = NullStage()
+
+
+def stage(name, *mesh_objects):
+    """
+    :param mesh_objects: the objects the stage changes, to count their vertices, edges and faces
+    :return: a context manager around the stage, recorded by the running profiler if there is one
+    """
+    if _active_profiler is None:
+        return NULL_STAGE
+    return Stage(_active_profiler, name, mesh_objects)
+
+
+def get_peak_memory():
+    """:return: the peak resident memory of the process in bytes, None where it can not be read"""
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_mesh_counts(mesh_objects):
+    counts = {"vertices": 0, "edges": 0, "faces": 0}
+    for mesh_object in mesh_objects:
+        try:
+            if mesh_object.type != "MESH":
+                continue
+            mesh = mesh_object.data
+        except ReferenceError:
+            #joined into another object and removed during the stage
+            continue
+
+        counts["vertices"] += len(mesh.vertices)
+        counts["edges"] += len(mesh.edges)
+        counts["faces"] += len(mesh.polygons)
+    return counts
+
+
+class Stage(object):
+
+    def __init__(self, profiler, name, mesh_objects):
+        self.profiler = profiler
+        self.name = name
+        self.mesh_objects = mesh_objects
+
+    def __enter__(self):
+        self.before = get_mesh_counts(self.mesh_objects)
+        self.operator_calls = self.profiler.get_operator_call_count()
+        self.mode_switches = self.profiler.mode_switches
+        self.start_time = time.time()
+        return self
+
+    def __exit__(self, exception_type, exception, exception_traceback):
+        seconds = time.time() - self.start_time
+        self.profiler.stages.append({"name": self.name,
+                                     "seconds": seconds,
+                                     "before": self.before,
+                                     "after": get_mesh_counts(self.mesh_objects),
+                                     "operator_calls": self.profiler.get_operator_call_count() - self.operator_calls,
+                                     "mode_switches": self.profiler.mode_switches - self.mode_switches,
+                                     "failed": exception_type is not None})
+        return False
+
+
+class OperatorModuleCounter(object):
+    """stands in for a module of bpy.ops, such as bpy.ops.mesh"""
+
+    def __init__(self, profiler, module_name, operator_module):
+        self._profiler = profiler
+        self._module_name = module_name
+        self._operator_module = operator_module
+
+    def __getattr__(self, operator_name):
+        operator = getattr(self._operator_module, operator_name)
+        name = self._module_name + "." + operator_name
+        profiler = self._profiler
+
+        def call_operator(*args, **kwargs):
+            profiler.count_operator(name, kwargs)
+            return operator(*args, **kwargs)
+
+        return call_operator
+
+
+class OperatorCounter(object):
+    """stands in for bpy.ops while profiling"""
+
+    def __init__(self, profiler, operators):
+        self._profiler = profiler
+        self._operators = operators
+
+    def __getattr__(self, module_name):
+        return OperatorModuleCounter(self._profiler, module_name, getattr(self._operators, module_name))
+
+
+class Profiler(object):
+    """
+    :ivar stages: the records of the stages, in the order they finished
+    :ivar operator_calls: the number of calls of each bpy.ops operator
+    :ivar mode_switches: the number of mode_set calls that changed the mode
+    """
+
+    def __init__(self, enabled=True, use_cprofile=False, cprofile_path=None):
+        """
+        :param enabled: False for a profiler that records nothing, so callers need no separate code path
+        :param use_cprofile: also run cProfile, the stats are written to cprofile_path if there is one
+        """
+        self.enabled = enabled
+        self.use_cprofile = use_cprofile or cprofile_path is not None
+        self.cprofile_path = cprofile_path
+        self.stages = []
+        self.operator_calls = Counter()
+        self.mode_switches = 0
+        self.seconds = 0.0
+        self._operators = None
+        self._cprofile = None
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception, exception_traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        global _active_profiler
+        if not self.enabled:
+            return
+        if _active_profiler is not None:
+            raise RuntimeError("a profiler is already running")
+        _active_profiler = self
+
+        self._operators = bpy.ops
+        bpy.ops = OperatorCounter(self, self._operators)
+
+        if self.use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._start_time = time.time()
+
+    def stop(self):
+        global _active_profiler
+        if not self.enabled:
+            return
+        self.seconds += time.time() - self._start_time
+
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            if self.cprofile_path is not None:
+                self._cprofile.dump_stats(self.cprofile_path)
+
+        bpy.ops = self._operators
+        _active_profiler = None
+
+    def get_operator_call_count(self):
+        return sum(self.operator_calls.values())
+
+    def count_operator(self, name, arguments):
+        self.operator_calls[name] += 1
+
+        if name == "object.mode_set":
+            active_object = bpy.context.object
+            if active_object is None or active_object.mode != arguments.get("mode", "OBJECT"):
+                self.mode_switches += 1
+
+    def get_cprofile_stats(self, number_of_functions=20):
+        """:return: the functions with the most cumulative time, or None without cProfile"""
+        if self._cprofile is None:
+            return None
+
+        stats = pstats.Stats(self._cprofile)
+        rows = []
+        for function, (_, call_count, total_time, cumulative_time, _) in stats.stats.items():
+            rows.append({"function": "{}:{}({})".format(*function),
+                         "calls": call_count,
+                         "seconds": total_time,
+                         "cumulative_seconds": cumulative_time})
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:number_of_functions]
+
+    def get_report(self):
+        report = {"seconds": self.seconds,
+                  "stages": self.stages,
+                  "operator_calls": dict(self.operator_calls),
+                  "total_operator_calls": self.get_operator_call_count(),
+                  "mode_switches": self.mode_switches,
+                  "peak_memory_bytes": get_peak_memory()}
+        if self.use_cprofile:
+            report["cprofile"] = self.get_cprofile_stats()
+            report["cprofile_path"] = self.cprofile_path
+        return report
+
+    def write(self, path):
+        with open(path, "w") as report_file:
+            json.dump(self.get_report(), report_file, indent=2)
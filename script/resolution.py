@@ -0,0 +1,69 @@
+"""
+Picks where to add resolution before a bend from a geometric error tolerance.
+
+Bending maps a straight segment along X onto an arc, the segment stays within the tolerance
+as long as the sagitta of its arc does. The arc of a segment of length L bent with the factor
+angle / width at the radius r has the sagitta r * (1 - cos(L * factor / 2)), which is largest
+for the vertices furthest from the bend axis. Cuts are only placed where edges are longer than that.
+"""
+import math
+
+import numpy
+
+#fewest bridge segments, so that the protrusion still has vertices to move
+MINIMUM_BRIDGE_SEGMENTS = 2
+
+
+def get_max_segment_length(bend_angle, width, thickness, tolerance):
+    """
+    :param width: the extent along X that the bend angle is spread over
+    :param thickness: the extent along Y, the distance of the furthest vertices from the neutral line
+    :return: the longest segment along X whose bent chord stays within the tolerance, infinite for no bend
+    """
+    if bend_angle == 0.0 or width <= 0.0:
+        return float("inf")
+
+    factor = abs(bend_angle) / width
+    max_radius = 1.0 / factor + thickness
+    if tolerance >= 2.0 * max_radius:
+        return float("inf")
+
+    return 2.0 * math.acos(1.0 - tolerance / max_radius) / factor
+
+
+def get_adaptive_cuts(coordinates, edges, max_segment_length):
+    """
+    Spreads cuts evenly over the X extent at no more than max_segment_length apart,
+    then keeps only the cuts that split an edge longer than max_segment_length.
+    :param coordinates: (vertices, 3) array
+    :param edges: (edges, 2) array of vertex indices
+    :return: the x coordinates of the cuts
+    """
+    x_coords = coordinates[:, 0]
+    width = x_coords.max() - x_coords.min()
+    if not math.isfinite(max_segment_length) or width <= max_segment_length:
+        return []
+
+    number_of_segments = int(math.ceil(width / max_segment_length))
+    cuts = x_coords.min() + numpy.arange(1, number_of_segments) * (width / number_of_segments)
+
+    edge_x_coords = x_coords[edges]
+    starts, ends = edge_x_coords.min(axis=1), edge_x_coords.max(axis=1)
+    long_edges = ends - starts > max_segment_length
+    starts, ends = numpy.sort(starts[long_edges]), numpy.sort(ends[long_edges])
+
+    #the number of long edges starting before a cut minus the number ending at or before it
+    crossing_edges = numpy.searchsorted(starts, cuts, side="left") - numpy.searchsorted(ends, cuts, side="right")
+    return cuts[crossing_edges > 0].tolist()
+
+
+def get_bridge_segment_count(bridge_width, frame_width, frame_thickness, frame_bend, tolerance):
+    """
+    :return: the number of segments for get_spread_for_bridge, so that the bend of the whole frame
+             stays within the tolerance over the bridge
+    """
+    max_segment_length = get_max_segment_length(frame_bend, frame_width, frame_thickness, tolerance)
+    if not math.isfinite(max_segment_length):
+        return MINIMUM_BRIDGE_SEGMENTS
+
+    return max(MINIMUM_BRIDGE_SEGMENTS, int(math.ceil(bridge_width / max_segment_length)))
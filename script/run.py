@@ -3,9 +3,74 @@ A simple script to procedurally generate 3D printable eyeglasses frames from an
 
 The order of operations is listed in the create_eyeglasses_from_svg method.
 In addition to the arguments, the script expects a SVG to be loaded and selected in Blender.
+
+The script can also run headless, one job per background Blender process:
+    blender -b --factory-startup --python run.py -- job.json result.json
+where job.json holds the "svg" to import, the "output" mesh path and the "parameters"
+passed on to create_eyeglasses_from_svg. See batch.py for running many jobs at once
+and sweep.py for running many parameter variants of one SVG.
+It can also run as a warm worker that runs the jobs supervisor.py sends it, see supervisor.py.
 """
+import binascii
+import inspect
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+
 import bpy
 import bmesh
+import numpy
+from mathutils import Matrix
+
+#Blender does not put the script directory on the path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import bmesh_editing
+import checkpoint
+import decimation
+import deformation
+import mesh_core
+import mesh_exchange
+import mesh_io
+import printability
+import profiling
+import resolution
+import seams
+import slicer
+import stage_cache
+import symmetry
+from supervisor import AUTHKEY_VARIABLE
+from vertex_arrays import get_vertex_coordinates, set_vertex_coordinates, get_vertex_selection, set_vertex_selection
+from vertex_arrays import get_edge_vertices, get_polygon_triangles, get_vertex_normals, set_mesh_triangles
+from vertex_arrays import get_polygon_loops, set_mesh_polygons
+
+#threads writing the files of run_variants in the background
+EXPORT_WORKERS = 2
+
+#seconds a lens area worker of form_parts_concurrently may take
+PART_TIMEOUT = 600
+
+#what each quality of create_eyeglasses_from_svg spends on the frame:
+#the segments per curve of the SVG, None to keep the resolution of the SVG,
+#the edge loops cut into each lens area and the segments of the bridge for their bends,
+#whether resolution_tolerance is followed instead of those fixed numbers,
+#and whether the seams between the lens areas and the bridge are closed or the parts are only joined
+QUALITY_SETTINGS = {"final": {"curve_resolution": None,
+                              "lens_loops": 13,
+                              "bridge_segments": 20,
+                              "adaptive_resolution": True,
+                              "close_seams": True},
+                    "preview": {"curve_resolution": 2,
+                                "lens_loops": 3,
+                                "bridge_segments": 4,
+                                "adaptive_resolution": False,
+                                "close_seams": False}}
 
 
 def deselect_all_vertices():
@@ -57,28 +122,28 @@ def move_to_origin(selected_object):
 
 
 def bend_object(selected_object, bend_degree):
-    """apply the bend simple deform modifier"""
+    """apply the bend of the simple deform modifier, computed directly on the vertices"""
     bpy.ops.object.mode_set(mode="OBJECT")
 
-    #add simple deform modifier
-    bpy.ops.object.modifier_add(type="SIMPLE_DEFORM")
-    simple_deform_modifier = selected_object.modifiers["SimpleDeform"]
-    simple_deform_modifier.deform_method = "BEND"
+    mesh = selected_object.data
+    set_vertex_coordinates(mesh, deformation.bend(get_vertex_coordinates(mesh), bend_degree))
 
-    simple_deform_modifier.angle = bend_degree
 
-    #Apply modifier
-    bpy.ops.object.modifier_apply(apply_as="DATA", modifier="SimpleDeform")
+def remove_duplicate_vertices(selected_object):
+    """
+    remove duplicate vertices by welding them together
+    :return: the number of vertices merged
+    """
+    bpy.ops.object.mode_set(mode="OBJECT")
 
+    mesh = bmesh.new()
+    mesh.from_mesh(selected_object.data)
+    merged_count = bmesh_editing.weld(mesh)
+    mesh.to_mesh(selected_object.data)
+    mesh.free()
 
-def remove_duplicate_vertices():
-    """remove duplicate vertices by welding them together"""
-    bpy.ops.object.mode_set(mode="EDIT")
-    bpy.ops.mesh.select_all(action="SELECT")
-
-    bpy.ops.mesh.remove_doubles(use_unselected=True)
-    #need to switch modes for the remove doubles to apply
-    bpy.ops.object.mode_set(mode="OBJECT")
+    selected_object.data.update()
+    return merged_count
 
 
 def move_object_origin_to_center_of_mass():
@@ -96,6 +161,24 @@ def setup_environment():
     bpy.context.scene.unit_settings.system = 'METRIC'
 
 
+def get_quality_settings(quality):
+    if quality not in QUALITY_SETTINGS:
+        raise ValueError("unknown quality {}".format(quality))
+    return QUALITY_SETTINGS[quality]
+
+
+def set_curve_resolution(curve_object, quality):
+    """flattens the curves of the SVG into the segments of the quality, like the curve_resolution of svg_reader"""
+    curve_resolution = get_quality_settings(quality)["curve_resolution"]
+    if curve_resolution is None:
+        return
+
+    curve = curve_object.data
+    curve.resolution_u = curve_resolution
+    for spline in curve.splines:
+        spline.resolution_u = curve_resolution
+
+
 def create_mesh_from_svg(selected_object, desired_width, extrude_amount):
     """
     Creates a 3D mesh from the imported 2D SVG
@@ -107,7 +190,7 @@ def create_mesh_from_svg(selected_object, desired_width, extrude_amount):
     change_mesh_color_for_better_visualization(selected_object)
 
     #clean up by wielding the sides together
-    remove_duplicate_vertices()
+    remove_duplicate_vertices(selected_object)
 
 
 def get_svg_width(selected_svg_object):
@@ -179,26 +262,45 @@ def form_lens_and_bridge(bridge_width,
                          frame_bend,
                          bridge_slant,
                          bridge_protrusion_amount,
-                         nosepad_shrink_amount):
-
-    bridge_object, left_lens_object, right_lens_object = duplicate_object(2)
-
-    form_bridge(bridge_object, bridge_width, bridge_slant, bridge_protrusion_amount)
-    bottom_of_bridge = find_min_z_coord_of_object(bridge_object)
-
-    form_left_lens_area(left_lens_object,
-                        bridge_width,
-                        lens_bend,
-                        bridge_slant,
-                        bottom_of_bridge,
-                        nosepad_shrink_amount)
+                         nosepad_shrink_amount,
+                         resolution_tolerance=None,
+                         symmetry_tolerance=None,
+                         concurrent_parts=False,
+                         quality="final"):
 
-    form_right_lens_area(right_lens_object,
-                         bridge_width,
-                         lens_bend,
-                         bridge_slant,
-                         bottom_of_bridge,
-                         nosepad_shrink_amount)
+    frame_object = bpy.context.scene.objects.active
+    bpy.ops.object.mode_set(mode="OBJECT")
+    frame_coordinates = deformation.transform_coordinates(get_vertex_coordinates(frame_object.data),
+                                                          frame_object.matrix_world)
+    #a symmetric frame only forms the left lens area, the right one is its mirror image
+    symmetric = is_frame_symmetric(frame_coordinates, symmetry_tolerance)
+
+    form = form_parts_concurrently if concurrent_parts else form_parts
+    bridge_object, left_lens_object, right_lens_object = form(frame_object,
+                                                              symmetric,
+                                                              bridge_width,
+                                                              lens_bend,
+                                                              frame_bend,
+                                                              bridge_slant,
+                                                              bridge_protrusion_amount,
+                                                              nosepad_shrink_amount,
+                                                              resolution_tolerance,
+                                                              quality)
+
+    if symmetric:
+        with profiling.stage("mirror_right_lens_area", left_lens_object):
+            right_lens_object = copy_object(left_lens_object)
+            mirror_object(right_lens_object)
+
+    return join_lens_areas_and_bridge(bridge_object, left_lens_object, right_lens_object, frame_bend, quality)
+
+
+def join_lens_areas_and_bridge(bridge_object, left_lens_object, right_lens_object, frame_bend, quality="final"):
+    """
+    Joins the formed lens areas onto the bridge and bends the whole frame
+    :return: the complete frame
+    """
+    close_seams = get_quality_settings(quality)["close_seams"]
 
     #leave a little bit gap to lessen the artifacts when merging
     #gap is 4% of the length of the bridge
@@ -208,22 +310,221 @@ def form_lens_and_bridge(bridge_width,
     select_object(bridge_object)
     bpy.ops.transform.translate(value=(0,1,0))
 
-    partial_frame = combine_left_lens_object_and_bridge(left_lens_object, bridge_object)
-    complete_frame = combine_right_lens_object_and_partial_frame(right_lens_object, partial_frame)
+    with profiling.stage("combine_for_frame", bridge_object, left_lens_object, right_lens_object):
+        partial_frame = combine_left_lens_object_and_bridge(left_lens_object, bridge_object, close_seams)
+        complete_frame = combine_right_lens_object_and_partial_frame(right_lens_object, partial_frame, close_seams)
 
-    select_object(complete_frame)
-    move_object_origin_to_center_of_mass()
+    with profiling.stage("bend_object", complete_frame):
+        select_object(complete_frame)
+        move_object_origin_to_center_of_mass()
+
+        bend_object(complete_frame, frame_bend)
 
-    bend_object(complete_frame, frame_bend)
+    return complete_frame
 
 
+def form_parts(frame_object,
+               symmetric,
+               bridge_width,
+               lens_bend,
+               frame_bend,
+               bridge_slant,
+               bridge_protrusion_amount,
+               nosepad_shrink_amount,
+               resolution_tolerance=None,
+               quality="final"):
+    """
+    Forms the bridge and the lens areas one after another from duplicates of the frame
+    :return: the bridge, the left lens area and the right lens area, None for a symmetric frame
+    """
+    select_object(frame_object)
+    if symmetric:
+        bridge_object, left_lens_object = duplicate_object(1)
+        right_lens_object = None
+    else:
+        bridge_object, left_lens_object, right_lens_object = duplicate_object(2)
 
-def combine_left_lens_object_and_bridge(left_lens_object, bridge_object):
-    return combine_for_frame(left_lens_object, bridge_object, right_two_pieces=False)
+    number_of_segments = get_number_of_bridge_segments(bridge_object.dimensions, bridge_width, frame_bend,
+                                                       resolution_tolerance, quality)
+    with profiling.stage("form_bridge", bridge_object):
+        form_bridge(bridge_object, bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments)
+    bottom_of_bridge = find_min_z_coord_of_object(bridge_object)
 
+    with profiling.stage("form_left_lens_area", left_lens_object):
+        form_left_lens_area(left_lens_object,
+                            bridge_width,
+                            lens_bend,
+                            bridge_slant,
+                            bottom_of_bridge,
+                            nosepad_shrink_amount,
+                            resolution_tolerance,
+                            quality)
+
+    if right_lens_object is not None:
+        with profiling.stage("form_right_lens_area", right_lens_object):
+            form_right_lens_area(right_lens_object,
+                                 bridge_width,
+                                 lens_bend,
+                                 bridge_slant,
+                                 bottom_of_bridge,
+                                 nosepad_shrink_amount,
+                                 resolution_tolerance,
+                                 quality)
+
+    return bridge_object, left_lens_object, right_lens_object
+
+
+def form_parts_concurrently(frame_object,
+                            symmetric,
+                            bridge_width,
+                            lens_bend,
+                            frame_bend,
+                            bridge_slant,
+                            bridge_protrusion_amount,
+                            nosepad_shrink_amount,
+                            resolution_tolerance=None,
+                            quality="final"):
+    """
+    Forms the lens areas in background Blender processes while this process forms the bridge.
+    The workers get the frame through mesh_exchange and separate their lens areas right away,
+    only their nosepads wait for the bottom of the bridge.
+    :return: the bridge, the left lens area and the right lens area, None for a symmetric frame
+    """
+    parts = ["left_lens"] if symmetric else ["left_lens", "right_lens"]
+    material = frame_object.data.materials[0] if frame_object.data.materials else None
+    exchange_directory = mesh_exchange.create_exchange_directory()
+    workers = []
+
+    try:
+        write_exchanged_object(frame_object, exchange_directory, "frame")
+        mesh_exchange.write_value(exchange_directory, "parameters",
+                                  {"bridge_width": bridge_width,
+                                   "lens_bend": lens_bend,
+                                   "bridge_slant": bridge_slant,
+                                   "nosepad_shrink_amount": nosepad_shrink_amount,
+                                   "resolution_tolerance": resolution_tolerance,
+                                   "quality": quality})
+        workers = [start_part_worker(part, exchange_directory) for part in parts]
+
+        #the frame itself becomes the bridge, the workers have their own copies
+        bridge_object = frame_object
+        number_of_segments = get_number_of_bridge_segments(bridge_object.dimensions, bridge_width, frame_bend,
+                                                           resolution_tolerance, quality)
+        with profiling.stage("form_bridge", bridge_object):
+            form_bridge(bridge_object, bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments)
+        mesh_exchange.write_value(exchange_directory, "bottom_of_bridge", find_min_z_coord_of_object(bridge_object))
+
+        with profiling.stage("wait_for_lens_areas"):
+            lens_objects = [read_part(worker, part, exchange_directory, material)
+                            for worker, part in zip(workers, parts)]
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.kill()
+        shutil.rmtree(exchange_directory, ignore_errors=True)
+
+    return bridge_object, lens_objects[0], lens_objects[1] if len(lens_objects) > 1 else None
+
+
+def start_part_worker(part, exchange_directory):
+    command = [bpy.app.binary_path, "-b", "--factory-startup", "--python", os.path.abspath(__file__),
+               "--", "--form-part", part, exchange_directory]
+    with open(os.path.join(exchange_directory, part + ".log"), "w") as log_file:
+        return subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def read_part(worker, part, exchange_directory, material=None):
+    return_code = worker.wait(timeout=PART_TIMEOUT)
+    if return_code != 0 or not mesh_exchange.has_mesh(exchange_directory, part):
+        with open(os.path.join(exchange_directory, part + ".log")) as log_file:
+            raise RuntimeError("forming the {} failed:\n{}".format(part, log_file.read()))
+
+    return read_exchanged_object(exchange_directory, part, material)
+
+
+def form_part_from_command_line(part, exchange_directory):
+    """
+    Runs in a worker process started by form_parts_concurrently and writes the formed lens area back
+    """
+    parameters = mesh_exchange.read_value(exchange_directory, "parameters")
 
-def combine_right_lens_object_and_partial_frame(right_lens_object, partial_frame):
-    return combine_for_frame(right_lens_object, partial_frame, right_two_pieces=True)
+    bpy.ops.wm.read_homefile(use_empty=True)
+    setup_environment()
+    lens_object = read_exchanged_object(exchange_directory, "frame")
+
+    separate_lens_area, create_nosepad = LENS_AREA_STEPS[part]
+    separate_lens_area(lens_object, parameters["bridge_width"], parameters["bridge_slant"])
+
+    bottom_of_bridge = mesh_exchange.wait_for_value(exchange_directory, "bottom_of_bridge", PART_TIMEOUT)
+    create_nosepad(lens_object, bottom_of_bridge, parameters["nosepad_shrink_amount"])
+    bend_lens_area(lens_object, parameters["lens_bend"], parameters["resolution_tolerance"], parameters["quality"])
+
+    write_exchanged_object(lens_object, exchange_directory, part)
+
+
+def write_exchanged_object(mesh_object, exchange_directory, name):
+    bpy.ops.object.mode_set(mode="OBJECT")
+    mesh = mesh_object.data
+    _, loop_totals, loop_vertices = get_polygon_loops(mesh)
+    mesh_exchange.write_mesh(exchange_directory, name, get_vertex_coordinates(mesh, numpy.float32), loop_totals,
+                             loop_vertices, numpy.array(mesh_object.matrix_world))
+
+
+def read_exchanged_object(exchange_directory, name, material=None):
+    """
+    Links a new mesh object built from the exchanged mesh and makes it the active object
+    """
+    arrays = mesh_exchange.read_mesh(exchange_directory, name)
+
+    mesh = bpy.data.meshes.new(name)
+    set_mesh_polygons(mesh, arrays["vertices"], arrays["loop_totals"], arrays["loop_vertices"])
+    if material is not None:
+        mesh.materials.append(material)
+
+    mesh_object = bpy.data.objects.new(name, mesh)
+    mesh_object.matrix_world = Matrix(arrays["matrix_world"].tolist())
+    bpy.context.scene.objects.link(mesh_object)
+    select_object(mesh_object)
+
+    return mesh_object
+
+
+def is_frame_symmetric(coordinates, symmetry_tolerance=None):
+    """
+    :param coordinates: the vertices of the reoriented frame, in mm
+    :param symmetry_tolerance: in mm, None to always form both lens areas
+    :return: whether the frame is its own mirror image about x=0 within the tolerance
+    """
+    if symmetry_tolerance is None:
+        return False
+    return symmetry.is_mirror_symmetric(coordinates, symmetry_tolerance)
+
+
+def mirror_object(mesh_object):
+    """mirrors the mesh of the object about x=0 in world space, keeping its faces facing outward"""
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    mesh = mesh_object.data
+    coordinates = deformation.transform_coordinates(get_vertex_coordinates(mesh), mesh_object.matrix_world)
+    set_vertex_coordinates(mesh, deformation.transform_coordinates(symmetry.mirror_coordinates(coordinates),
+                                                                   mesh_object.matrix_world.inverted()))
+
+    #a mirror image is inside out
+    flipped_mesh = bmesh.new()
+    flipped_mesh.from_mesh(mesh)
+    bmesh.ops.reverse_faces(flipped_mesh, faces=flipped_mesh.faces[:])
+    flipped_mesh.to_mesh(mesh)
+    flipped_mesh.free()
+
+    mesh.update()
+
+
+def combine_left_lens_object_and_bridge(left_lens_object, bridge_object, close_seams=True):
+    return combine_for_frame(left_lens_object, bridge_object, close_seams)
+
+
+def combine_right_lens_object_and_partial_frame(right_lens_object, partial_frame, close_seams=True):
+    return combine_for_frame(right_lens_object, partial_frame, close_seams)
 
 
 def select_object(object):
@@ -234,13 +535,19 @@ def select_object(object):
 
 
 def duplicate_object(number_of_duplicates):
-
+    """
+    :return: the duplicates, newest first, followed by the original object
+    """
     bpy.ops.object.mode_set(mode="OBJECT")
-    bpy.ops.object.duplicate_move(OBJECT_OT_duplicate={"linked": False, "mode":"TRANSLATION"},
-                                  TRANSFORM_OT_translate={"value":(0.0,0.0,0.0)})
-    bpy.ops.object.duplicate_move()
+    duplicated_objects = [bpy.context.scene.objects.active]
+
+    for _ in range(number_of_duplicates):
+        bpy.ops.object.duplicate_move(OBJECT_OT_duplicate={"linked": False, "mode":"TRANSLATION"},
+                                      TRANSFORM_OT_translate={"value":(0.0,0.0,0.0)})
+        #the duplicate becomes the active object, rather than relying on the order of scene.objects
+        duplicated_objects.insert(0, bpy.context.scene.objects.active)
 
-    return bpy.context.scene.objects[0], bpy.context.scene.objects[1], bpy.context.scene.objects[2]
+    return tuple(duplicated_objects)
 
 
 def bisect(x_coord, clear_inner=False, clear_outer=False, z_tilt=0.0, z_translation=0.0):
@@ -265,10 +572,12 @@ def form_left_lens_area(left_lens_object,
                         bend_degree,
                         bridge_slant,
                         bottom_of_bridge,
-                        nosepad_shrink_amount):
+                        nosepad_shrink_amount,
+                        resolution_tolerance=None,
+                        quality="final"):
     separate_left_lens_area(left_lens_object, bridge_width, bridge_slant)
     create_left_nosepad(left_lens_object, bottom_of_bridge, nosepad_shrink_amount)
-    bend_lens_area(left_lens_object, bend_degree)
+    bend_lens_area(left_lens_object, bend_degree, resolution_tolerance, quality)
 
 
 def form_right_lens_area(right_lens_object,
@@ -276,64 +585,83 @@ def form_right_lens_area(right_lens_object,
                          bend_degree,
                          bridge_slant,
                          bottom_of_bridge,
-                         nosepad_shrink_amount):
+                         nosepad_shrink_amount,
+                         resolution_tolerance=None,
+                         quality="final"):
     separate_right_lens_area(right_lens_object, bridge_width, bridge_slant)
     create_right_nosepad(right_lens_object, bottom_of_bridge, nosepad_shrink_amount)
-    bend_lens_area(right_lens_object, bend_degree)
+    bend_lens_area(right_lens_object, bend_degree, resolution_tolerance, quality)
 
 
 def create_left_nosepad(left_lens_object, bottom_of_bridge, nosepad_shrink_amount):
     max_x, min_x = find_left_nosepad_x_coord_range(left_lens_object)
 
-    non_nosepad_vertices_map = cache_non_nosepad_vertices(left_lens_object, max_x, min_x, bottom_of_bridge)
+    non_nosepad_vertices = cache_non_nosepad_vertices(left_lens_object, max_x, min_x, bottom_of_bridge)
 
     select_nosepad_peak_vertices(left_lens_object, bottom_of_bridge, max_x, min_x)
-    shrink_nosepad(nosepad_shrink_amount)
-    extrude_nosepad_peak()
+    shrink_nosepad(left_lens_object, nosepad_shrink_amount)
+    extrude_nosepad_peak(left_lens_object)
 
-    reset_normal_vertices(left_lens_object, non_nosepad_vertices_map)
+    reset_normal_vertices(left_lens_object, non_nosepad_vertices)
 
 
 def create_right_nosepad(right_lens_object, bottom_of_bridge, nosepad_shrink_amount):
     max_x, min_x = find_right_nosepad_x_coord_range(right_lens_object)
 
-    non_nosepad_vertices_map = cache_non_nosepad_vertices(right_lens_object, max_x, min_x, bottom_of_bridge)
+    non_nosepad_vertices = cache_non_nosepad_vertices(right_lens_object, max_x, min_x, bottom_of_bridge)
 
     select_nosepad_peak_vertices(right_lens_object, bottom_of_bridge, max_x, min_x)
-    shrink_nosepad(nosepad_shrink_amount)
-    extrude_nosepad_peak()
+    shrink_nosepad(right_lens_object, nosepad_shrink_amount)
+    extrude_nosepad_peak(right_lens_object)
 
-    reset_normal_vertices(right_lens_object, non_nosepad_vertices_map)
+    reset_normal_vertices(right_lens_object, non_nosepad_vertices)
 
 
-def reset_normal_vertices(left_lens_object, non_nosepad_vertices_map):
+def reset_normal_vertices(left_lens_object, non_nosepad_vertices):
     """set the location of vertices to specified positions"""
     deselect_all_vertices()
 
     bpy.ops.object.mode_set(mode="OBJECT")
 
-    for index, coord in non_nosepad_vertices_map.items():
-        left_lens_object.data.vertices[index].co = coord
+    indices, cached_coordinates = non_nosepad_vertices
+    coordinates = get_vertex_coordinates(left_lens_object.data)
+    coordinates[indices] = cached_coordinates
+    set_vertex_coordinates(left_lens_object.data, coordinates)
 
 
-def extrude_nosepad_peak():
+def extrude_nosepad_peak(lens_object):
     """translate the nosepad along the y-axis"""
-    bpy.ops.object.mode_set(mode="EDIT")
+    proportional_translate(lens_object, (0.0, 6.0, 0), proportional_size=15.0)
 
-    bpy.ops.transform.translate(value=(0.0, 6.0, 0),
-                                proportional="ENABLED",
-                                proportional_edit_falloff="SMOOTH",
-                                proportional_size=15.0)
 
-
-def shrink_nosepad(nosepad_shrink_amount):
+def shrink_nosepad(lens_object, nosepad_shrink_amount):
     """make the nosepad thinner than the frame"""
-    bpy.ops.object.mode_set(mode="EDIT")
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    mesh = lens_object.data
+    coordinates = deformation.proportional_shrink_fatten(get_vertex_coordinates(mesh),
+                                                         get_vertex_normals(mesh),
+                                                         get_vertex_selection(mesh),
+                                                         nosepad_shrink_amount,
+                                                         proportional_size=15.0,
+                                                         matrix=lens_object.matrix_world)
+    set_vertex_coordinates(mesh, coordinates)
+
+
+def proportional_translate(mesh_object, offset, proportional_size):
+    """
+    translate the selected vertices with the SMOOTH proportional falloff,
+    like the translate operator in edit mode but on the vertex arrays
+    """
+    bpy.ops.object.mode_set(mode="OBJECT")
 
-    bpy.ops.transform.shrink_fatten(value=nosepad_shrink_amount,
-                                    proportional="ENABLED",
-                                    proportional_edit_falloff="SMOOTH",
-                                    proportional_size=15.0)
+    mesh = mesh_object.data
+    coordinates = deformation.proportional_translate(get_vertex_coordinates(mesh),
+                                                     get_vertex_selection(mesh),
+                                                     offset,
+                                                     proportional_size,
+                                                     matrix=mesh_object.matrix_world)
+    set_vertex_coordinates(mesh, coordinates)
 
 
 def select_nosepad_peak_vertices(lens_object, bottom_of_bridge, max_x, min_x):
@@ -343,10 +671,12 @@ def select_nosepad_peak_vertices(lens_object, bottom_of_bridge, max_x, min_x):
     deselect_all_vertices()
 
     bpy.ops.object.mode_set(mode="OBJECT")
-    for vertex in lens_object.data.vertices:
-        x,y,z = vertex.co
-        if in_range(max_z, min_z, z) and in_range(max_x, min_x, x):
-            vertex.select = True
+    coordinates = get_vertex_coordinates(lens_object.data)
+    x_coords, z_coords = coordinates[:, 0], coordinates[:, 2]
+
+    selection = get_vertex_selection(lens_object.data)
+    selection |= in_range(max_z, min_z, z_coords) & in_range(max_x, min_x, x_coords)
+    set_vertex_selection(lens_object.data, selection)
 
 
 def find_nosepad_peak_vertices_z_range(bottom_of_bridge, bottom_of_nosepad):
@@ -359,24 +689,23 @@ def find_nosepad_peak_vertices_z_range(bottom_of_bridge, bottom_of_nosepad):
 
 
 def find_bottom_of_nosepad_region(lens_object, max_x, min_x):
-    z_coord = [vertex.co[2] for vertex in lens_object.data.vertices if in_range(max_x, min_x, vertex.co[0])]
-    return min(z_coord)
+    coordinates = get_vertex_coordinates(lens_object.data)
+    z_coords = coordinates[in_range(max_x, min_x, coordinates[:, 0]), 2]
+    return float(z_coords.min())
 
 
 def cache_non_nosepad_vertices(lens_object, range_max_x, range_min_x, range_max_z):
+    """
+    :return: the indices of the vertices to keep in place and their coordinates
+    """
     select_object(lens_object)
-    non_nosepad_vertices = {}
 
-    faces = lens_object.data.polygons
-    vertices = lens_object.data.vertices
+    coordinates = get_vertex_coordinates(lens_object.data)
 
     #cache any vertices above the bottom of the bridge in the nosepad region
-    for vertex in vertices:
-        x,y,z = vertex.co
-        if y <= 0:
-            non_nosepad_vertices[vertex.index] = [x,y,z]
+    indices = numpy.flatnonzero(coordinates[:, 1] <= 0)
 
-    return non_nosepad_vertices
+    return indices, coordinates[indices]
 
 
 def is_front_facing(face):
@@ -385,7 +714,8 @@ def is_front_facing(face):
 
 
 def in_range(max_val, min_val, val):
-    return (val <= max_val) and (val >= min_val)
+    #& instead of and so that val can also be an array of values
+    return (val <= max_val) & (val >= min_val)
 
 
 def find_left_nosepad_x_coord_range(lens_object):
@@ -414,55 +744,97 @@ def find_nosepad_x_coord_range(lens_object, left_nosepad=True):
 def find_max_and_min_x_coord_of_object(mesh_object):
     select_object(mesh_object)
 
-    x_coords = [vertex.co[0] for vertex in mesh_object.data.vertices]
+    x_coords = get_vertex_coordinates(mesh_object.data)[:, 0]
 
-    return max(x_coords), min(x_coords)
+    return float(x_coords.max()), float(x_coords.min())
 
 
 def find_min_z_coord_of_object(mesh_object):
     select_object(mesh_object)
 
-    z_coords = [vertex.co[2] for vertex in mesh_object.data.vertices]
+    z_coords = get_vertex_coordinates(mesh_object.data)[:, 2]
 
-    return min(z_coords)
+    return float(z_coords.min())
 
 
-def form_bridge(bridge_object, bridge_width, bridge_slant, bridge_protrusion_amount):
+def form_bridge(bridge_object, bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments=20):
     cut_bridge(bridge_object, bridge_width, bridge_slant)
-    bisect_bridge_for_resolution(bridge_width, bridge_slant)
+    bisect_bridge_for_resolution(bridge_width, bridge_slant, number_of_segments)
     extrude_bridge(bridge_object, bridge_width, bridge_protrusion_amount)
     select_object(bridge_object)
     move_object_origin_to_center_of_mass()
 
 
-def bend_lens_area(lens_object, bend_degree):
+def bend_lens_area(lens_object, bend_degree, resolution_tolerance=None, quality="final"):
     select_object(lens_object)
     move_object_origin_to_center_of_mass()
-    increase_resolution_for_bending(lens_object)
+    increase_resolution_for_bending(lens_object, bend_degree, resolution_tolerance, quality)
     bend_object(lens_object, bend_degree)
 
 
-def increase_resolution_for_bending(lens_object):
+def increase_resolution_for_bending(lens_object, bend_degree, resolution_tolerance=None, quality="final"):
     select_object(lens_object)
+    quality_settings = get_quality_settings(quality)
+
+    if resolution_tolerance is not None and quality_settings["adaptive_resolution"]:
+        bisect_adaptively_for_bending(lens_object, bend_degree, resolution_tolerance)
+        return
+
     #we bisect here because loopcuts don't work
     bisect_to_increase_edge_loops(center=lens_object.location[0],
                                   width=lens_object.dimensions[0] * 0.75,
-                                  number_of_loops=13)
+                                  number_of_loops=quality_settings["lens_loops"])
 
 
-def bisect_to_increase_edge_loops(center, width, number_of_loops):
-    bpy.ops.object.mode_set(mode="EDIT")
+def bisect_adaptively_for_bending(lens_object, bend_degree, resolution_tolerance):
+    """only bisect where the edges are too long to follow the bend within the tolerance, in mm"""
+    max_segment_length = resolution.get_max_segment_length(bend_degree,
+                                                           lens_object.dimensions[0],
+                                                           lens_object.dimensions[1],
+                                                           resolution_tolerance)
+
+    mesh = lens_object.data
+    coordinates = deformation.transform_coordinates(get_vertex_coordinates(mesh), lens_object.matrix_world)
+    bisection_points = resolution.get_adaptive_cuts(coordinates, get_edge_vertices(mesh), max_segment_length)
+
+    if bisection_points:
+        slice_object(lens_object, *slicer.get_x_planes(bisection_points))
 
+
+def get_bisection_points(center, width, number_of_loops):
     lower_range = int(-1 * number_of_loops/2)
     upper_range = int(number_of_loops/2 + 1)
     spread = range(lower_range, upper_range)
 
     spacing = width / number_of_loops
 
-    bisection_points = [x * spacing + center for x in spread]
+    return [x * spacing + center for x in spread]
+
+
+def bisect_to_increase_edge_loops(center, width, number_of_loops):
+    bisection_points = get_bisection_points(center, width, number_of_loops)
+
+    points, normals = slicer.get_x_planes(bisection_points)
+    slice_object(bpy.context.scene.objects.active, points, normals)
+
+
+def slice_object(mesh_object, points, normals):
+    """
+    insert the edge loops of all the planes in one pass instead of one bisect per plane
+    :param points: points on the planes in world space, like the bisect operator
+    :param normals: normals of the planes in world space
+    """
+    bpy.ops.object.mode_set(mode="OBJECT")
 
-    for x_coord in bisection_points:
-        bisect(x_coord)
+    local_points, local_normals = slicer.transform_planes(points, normals, mesh_object.matrix_world)
+
+    mesh = bmesh.new()
+    mesh.from_mesh(mesh_object.data)
+    slicer.slice_bmesh(mesh, local_points, local_normals)
+    mesh.to_mesh(mesh_object.data)
+    mesh.free()
+
+    mesh_object.data.update()
 
 
 def separate_left_lens_area(left_lens_object, bridge_width, bridge_slant):
@@ -477,6 +849,11 @@ def separate_right_lens_area(right_lens_object, bridge_width, bridge_slant):
     bisect(right_bridge_boundary_from_bridge, clear_inner=True, z_tilt=-1*bridge_slant)
 
 
+#the steps of form_left_lens_area and form_right_lens_area before the bend, for the part workers
+LENS_AREA_STEPS = {"left_lens": (separate_left_lens_area, create_left_nosepad),
+                   "right_lens": (separate_right_lens_area, create_right_nosepad)}
+
+
 def cut_bridge(bridge_object, bridge_width, bridge_slant):
 
     select_object(bridge_object)
@@ -498,90 +875,36 @@ def select_second_object(object):
     object.select = True
 
 
-def merge_objects(object_a, object_b):
-    select_object(object_b)
-    select_second_object(object_a)
-    bpy.ops.object.join()
-    combined_bridge_object = object_b
-    return combined_bridge_object
-
-
-def bridge_gap_between_lens_area_and_bridge(frame_object, gap_on_the_right_side=True):
-    select_non_manifold_vertices()
-    deselect_non_manifold_vertices(frame_object, deselect_left_side=gap_on_the_right_side)
-    bridge_gap()
-
-
-def select_non_manifold_vertices():
-    bpy.ops.object.mode_set(mode="EDIT")
-    bpy.ops.mesh.select_all(action='DESELECT')
-    bpy.ops.mesh.select_non_manifold()
-
-
-def deselect_edge_and_associated_vertices(edge, start_vertex, end_vertex):
-    start_vertex.select = False
-    end_vertex.select = False
-    edge.select = False
-
-
-def get_start_and_end_vertices_from_edge(edge, mesh_object):
-    start_vertex_index, end_vertex_index = edge.vertices
-
-    start_vertex = mesh_object.data.vertices[start_vertex_index]
-    end_vertex = mesh_object.data.vertices[end_vertex_index]
-
-    return start_vertex, end_vertex
-
-
-def on_right_side(vertex):
-    x_coord = vertex.co[0]
-    if x_coord >= 0:
-        return True
-    return False
-
-
-def bridge_gap():
-    bpy.ops.object.mode_set(mode="EDIT")
-    bpy.ops.mesh.bridge_edge_loops(use_merge=True)
-
-
-def combine_for_frame(lens_object, bridge_object, right_two_pieces=True):
-    frame_object = merge_objects(lens_object, bridge_object)
-    select_object(frame_object)
-    bridge_gap_between_lens_area_and_bridge(frame_object, gap_on_the_right_side=right_two_pieces)
-
-    return frame_object
-
-
-def on_left_side(vertex):
-    x_coord = vertex.co[0]
-    if x_coord <= 0:
-        return True
-    return False
-
-
-def deselect_non_manifold_vertices(mesh_object, deselect_left_side=True):
-
-    side_check = on_right_side
-    if deselect_left_side:
-        side_check = on_left_side
-
-    bpy.ops.object.mode_set(mode='EDIT')
+def combine_for_frame(lens_object, bridge_object, close_seams=True):
+    """
+    Joins the lens area into the bridge, welding or stitching the open cut boundaries that face each other,
+    see seams.py. Only the vertices on the boundaries are paired, the rest of both meshes is copied as arrays.
+    :param close_seams: False to leave the cut boundaries open, for a preview
+    :return: the bridge object, which now holds both
+    """
+    bpy.ops.object.mode_set(mode="OBJECT")
 
-    mesh = bmesh.from_edit_mesh(mesh_object.data)
+    bridge_mesh = bridge_object.data
+    _, loop_totals, loop_vertices = get_polygon_loops(bridge_mesh)
+    _, lens_loop_totals, lens_loop_vertices = get_polygon_loops(lens_object.data)
 
-    for edge in mesh.edges:
-        start_vertex, end_vertex = edge.verts
+    #the lens area is moved into the local space of the bridge, as the join operator does
+    matrix = numpy.linalg.inv(numpy.array(bridge_object.matrix_world)).dot(numpy.array(lens_object.matrix_world))
+    lens_coordinates = deformation.transform_coordinates(get_vertex_coordinates(lens_object.data), matrix)
 
-        if side_check(start_vertex) or side_check(end_vertex):
-            deselect_edge_and_associated_vertices(edge, start_vertex, end_vertex)
+    join = seams.join_meshes if close_seams else seams.append_mesh
+    joined_mesh = bpy.data.meshes.new(bridge_mesh.name)
+    set_mesh_polygons(joined_mesh, *join(get_vertex_coordinates(bridge_mesh), loop_totals, loop_vertices,
+                                         lens_coordinates, lens_loop_totals, lens_loop_vertices))
+    for material in bridge_mesh.materials:
+        joined_mesh.materials.append(material)
 
-        else:
-            pass
+    bridge_object.data = joined_mesh
+    bpy.data.meshes.remove(bridge_mesh)
+    remove_object(lens_object)
 
-    for vertex in mesh.verts:
-        if side_check(vertex):
-            vertex.select = False
+    select_object(bridge_object)
+    return bridge_object
 
 
 def align_right_lens_area_and_bridge(right_lens_area_object, bridge_object, gap):
@@ -615,12 +938,12 @@ def get_spread_for_bridge(max_val, number_of_segments=20):
     return val_spread
 
 
-def bisect_bridge_for_resolution(bridge_width, max_slant):
+def bisect_bridge_for_resolution(bridge_width, max_slant, number_of_segments=20):
     z_translation = compute_convergence_point(bridge_width, max_slant)
-    slant_spread = get_spread_for_bridge(max_slant)
+    slant_spread = get_spread_for_bridge(max_slant, number_of_segments)
 
-    for slant in slant_spread:
-        bisect(0.0, z_tilt=slant, z_translation=z_translation)
+    points, normals = slicer.get_fan_planes(slant_spread, z_translation)
+    slice_object(bpy.context.scene.objects.active, points, normals)
 
 
 def extrude_bridge(bridge_object, bridge_width, bridge_protrusion_amount):
@@ -630,7 +953,7 @@ def extrude_bridge(bridge_object, bridge_width, bridge_protrusion_amount):
 
     select_mid_bridge_points(bridge_object, bridge_width)
 
-    protrude_bridge(bridge_protrusion_amount)
+    protrude_bridge(bridge_object, bridge_protrusion_amount)
 
 
 def select_mid_bridge_points(bridge_object, bridge_width):
@@ -642,17 +965,30 @@ def select_mid_bridge_points(bridge_object, bridge_width):
     max_region = 0.1 * scaled_positive_bridge_region
     min_region = -1.0 * max_region
 
-    for vertex in bridge_object.data.vertices:
-        x_coord = vertex.co[0]
-        if in_range(max_region, min_region, x_coord):
-            vertex.select = True
+    x_coords = get_vertex_coordinates(bridge_object.data)[:, 0]
 
+    selection = get_vertex_selection(bridge_object.data)
+    selection |= in_range(max_region, min_region, x_coords)
+    set_vertex_selection(bridge_object.data, selection)
 
-def protrude_bridge(protrusion_amount):
+
+def protrude_bridge(bridge_object, protrusion_amount):
     """translate the middle section of the bridge, with propotional selection"""
-    bpy.ops.object.mode_set(mode="EDIT")
+    proportional_translate(bridge_object, (0.0, protrusion_amount, 0.0), proportional_size=7.0)
+
+
+def get_number_of_bridge_segments(frame_dimensions, bridge_width, frame_bend, resolution_tolerance=None,
+                                  quality="final"):
+    """
+    :param frame_dimensions: the dimensions of the frame before it is cut, in mm
+    :return: the fixed segments of the quality, or as many as the bend of the whole frame needs over the bridge
+    """
+    quality_settings = get_quality_settings(quality)
+    if resolution_tolerance is None or not quality_settings["adaptive_resolution"]:
+        return quality_settings["bridge_segments"]
 
-    bpy.ops.transform.translate(value=(0.0, protrusion_amount, 0.0), proportional="ENABLED", proportional_edit_falloff="SMOOTH", proportional_size=7.0)
+    return resolution.get_bridge_segment_count(bridge_width, frame_dimensions[0], frame_dimensions[1], frame_bend,
+                                               resolution_tolerance)
 
 
 def compute_convergence_point(bridge_width, max_slant):
@@ -671,7 +1007,16 @@ def create_eyeglasses_from_svg(desired_width=135,
                                frame_bend=0.3491,
                                bridge_slant=0.3,
                                bridge_protrusion_amount=-1.0,
-                               nosepad_shrink_amount=0.003):
+                               nosepad_shrink_amount=0.003,
+                               pipeline="operators",
+                               svg_path=None,
+                               resolution_tolerance=None,
+                               symmetry_tolerance=None,
+                               concurrent_parts=False,
+                               target_face_count=None,
+                               max_decimation_error=None,
+                               cache_directory=None,
+                               quality="final"):
     """
     Scale is in mm
     :param desired_width: the width of the frame prior to curving the lens area
@@ -682,22 +1027,929 @@ def create_eyeglasses_from_svg(desired_width=135,
     :param bridge_slant: the z tilt of how the bridge is slanted between the bridge and the lens area (must be >0)
     :param bridge_protrusion_amount: amount to protrude the bridge
     :param nosepad_shrink_amount: amount to shrink the nosepads so that they're thin pieces
+    :param pipeline: "operators" to edit the selected object with bpy.ops,
+                     or "bmesh" to build the frame in memory without operators or mode switches
+    :param svg_path: build the extruded mesh from this SVG file with mesh_core, instead of using the selected SVG
+    :param resolution_tolerance: how far in mm the bent surfaces may stray from the ideal bends,
+                                 None to add a fixed number of edge loops and bridge segments instead
+    :param symmetry_tolerance: when the frame is mirror-symmetric within this many mm, only the left lens area
+                               is formed and mirrored to the right, None to always form both
+    :param concurrent_parts: form the lens areas in background Blender processes while the bridge is formed,
+                             only used by the operators pipeline
+    :param target_face_count: decimate the finished frame down to this many triangles, see decimate_frame
+    :param max_decimation_error: only decimate the finished frame where it strays less than this in mm
+    :param cache_directory: keep the meshes between the stages here and only form the stages whose inputs changed
+                            since an earlier run, see create_frame_with_cache. Only used by the operators pipeline
+    :param quality: "final", or "preview" for a coarse frame in a fraction of the time while tuning the parameters,
+                    with few curve segments, edge loops and bridge segments and the seams between the parts left open,
+                    see QUALITY_SETTINGS. The same parameters with "final" form the full frame
     """
 
     setup_environment()
+    get_quality_settings(quality)
+
+    if cache_directory is not None:
+        if pipeline != "operators":
+            raise ValueError("the stage cache only splits the operators pipeline into stages")
+
+        return create_frame_with_cache(cache_directory,
+                                       svg_path,
+                                       desired_width,
+                                       desired_thickness,
+                                       bridge_width,
+                                       lens_bend,
+                                       frame_bend,
+                                       bridge_slant,
+                                       bridge_protrusion_amount,
+                                       nosepad_shrink_amount,
+                                       resolution_tolerance,
+                                       symmetry_tolerance,
+                                       target_face_count,
+                                       max_decimation_error,
+                                       quality)
+
+    selected_object = get_svg_object(desired_width, desired_thickness, svg_path, quality)
+
+    if pipeline == "bmesh":
+        complete_frame = create_frame_with_bmesh(selected_object,
+                                                 desired_width,
+                                                 desired_thickness,
+                                                 bridge_width,
+                                                 lens_bend,
+                                                 frame_bend,
+                                                 bridge_slant,
+                                                 bridge_protrusion_amount,
+                                                 nosepad_shrink_amount,
+                                                 resolution_tolerance,
+                                                 symmetry_tolerance,
+                                                 quality)
+    elif pipeline == "operators":
+        form_base_frame(selected_object, desired_width, desired_thickness, quality)
+
+        complete_frame = form_lens_and_bridge(bridge_width,
+                                              lens_bend,
+                                              frame_bend,
+                                              bridge_slant,
+                                              bridge_protrusion_amount,
+                                              nosepad_shrink_amount,
+                                              resolution_tolerance,
+                                              symmetry_tolerance,
+                                              concurrent_parts,
+                                              quality)
+    else:
+        raise ValueError("unknown pipeline {}".format(pipeline))
 
-    selected_object = bpy.context.scene.objects.active
+    decimate_frame(complete_frame, target_face_count, max_decimation_error)
+    return complete_frame
 
-    create_mesh_from_svg(selected_object, desired_width, desired_thickness)
 
-    reorient_for_easier_manipulation(selected_object)
+def decimate_frame(complete_frame, target_face_count=None, max_decimation_error=None):
+    """
+    The optional last stage, collapses edges of the finished frame while keeping its outline,
+    lens openings and nosepads, until the frame is down to target_face_count triangles.
+    Collapses that would move the surface more than max_decimation_error mm from the planes of the original faces
+    are skipped. The achieved error, the largest such distance in mm, is kept in the "decimation_error" property.
+    """
+    if target_face_count is None and max_decimation_error is None:
+        return
 
-    form_lens_and_bridge(bridge_width,
-                         lens_bend,
-                         frame_bend,
+    with profiling.stage("decimate_frame", complete_frame):
+        complete_frame["decimation_error"] = decimate_object(complete_frame, target_face_count, max_decimation_error)
+
+
+def decimate_object(mesh_object, target_face_count=None, max_error=None):
+    """
+    Replaces the mesh of the object by its decimated triangles
+    :return: the achieved error in mm
+    """
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    mesh = mesh_object.data
+    local_coordinates = get_vertex_coordinates(mesh)
+    #the error is measured in mm, the objects of the operator pipeline are scaled
+    coordinates = deformation.transform_coordinates(local_coordinates, mesh_object.matrix_world)
+    kept_vertices, faces, error = decimation.decimate(coordinates, get_polygon_triangles(mesh), target_face_count,
+                                                      max_error)
+
+    decimated_mesh = bpy.data.meshes.new(mesh.name)
+    set_mesh_triangles(decimated_mesh, local_coordinates[kept_vertices], faces)
+    for material in mesh.materials:
+        decimated_mesh.materials.append(material)
+
+    mesh_object.data = decimated_mesh
+    bpy.data.meshes.remove(mesh)
+    return error
+
+
+def create_frame_with_cache(cache_directory,
+                            svg_path,
+                            desired_width,
+                            desired_thickness,
+                            bridge_width,
+                            lens_bend,
+                            frame_bend,
+                            bridge_slant,
+                            bridge_protrusion_amount,
+                            nosepad_shrink_amount,
+                            resolution_tolerance=None,
+                            symmetry_tolerance=None,
+                            target_face_count=None,
+                            max_decimation_error=None,
+                            quality="final"):
+    """
+    Runs the operator pipeline as stages that are read back from the cache when their inputs did not change.
+    Each stage is keyed by the fingerprints of the stages it starts from and only its own parameters,
+    the lens areas are keyed by the bottom of the bridge rather than by all the parameters of the bridge.
+    The lens areas are formed one after another, concurrent_parts is not used.
+    """
+    svg_object = None if svg_path is not None else bpy.context.scene.objects.active
+    material = svg_object.data.materials[0] if svg_object is not None and svg_object.data.materials else None
+    stages = CachedStages(stage_cache.StageCache(cache_directory), material)
+
+    curve_resolution = get_quality_settings(quality)["curve_resolution"]
+    base_frame = stages.add("base_frame", [get_svg_fingerprint(svg_object, svg_path), desired_width, desired_thickness,
+                                           curve_resolution],
+                            form_base_frame_stage, svg_path, desired_width, desired_thickness, quality)
+
+    dimensions = stages.get_values("base_frame")["dimensions"]
+    number_of_segments = get_number_of_bridge_segments(dimensions, bridge_width, frame_bend, resolution_tolerance,
+                                                       quality)
+    bridge_arguments = [bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments]
+    bridge = stages.add("bridge", [base_frame] + bridge_arguments, form_bridge_stage, *bridge_arguments)
+
+    lens_arguments = [bridge_width,
+                      lens_bend,
+                      bridge_slant,
+                      stages.get_values("bridge")["bottom_of_bridge"],
+                      nosepad_shrink_amount,
+                      resolution_tolerance,
+                      quality]
+    left_lens_area = stages.add("left_lens_area", [base_frame] + lens_arguments,
+                                form_lens_area_stage, False, *lens_arguments)
+    right_lens_area = stages.add("right_lens_area", [base_frame, symmetry_tolerance] + lens_arguments,
+                                 form_right_lens_area_stage, symmetry_tolerance, *lens_arguments)
+
+    last_stage = "frame"
+    frame = stages.add("frame", [bridge, left_lens_area, right_lens_area, frame_bend, quality],
+                       join_parts_stage, frame_bend, quality)
+    if target_face_count is not None or max_decimation_error is not None:
+        last_stage = "decimated_frame"
+        stages.add("decimated_frame", [frame, target_face_count, max_decimation_error],
+                   decimate_frame_stage, target_face_count, max_decimation_error)
+
+    complete_frame = stages.get_object(last_stage)
+    values = stages.get_values(last_stage)
+    if "decimation_error" in values:
+        complete_frame["decimation_error"] = values["decimation_error"]
+
+    if svg_object is not None and svg_object not in stages.objects.values():
+        #the SVG was not turned into the base frame, it was read from the cache
+        bpy.context.scene.objects.unlink(svg_object)
+    stages.remove_objects_except(complete_frame)
+    select_object(complete_frame)
+
+    return complete_frame
+
+
+class CachedStages(object):
+    """
+    The stages of one frame, each read from a stage_cache.StageCache when its fingerprint is there
+    and otherwise formed and stored. A stage is only read or formed once a later stage needs it,
+    so when the last stage is cached none of the others are read.
+    """
+
+    def __init__(self, cache, material=None):
+        self.cache = cache
+        self.material = material
+        self.stages = {}
+        self.objects = {}
+        self.values = {}
+
+    def add(self, name, inputs, form, *arguments):
+        """
+        :param inputs: JSON values the stage depends on, such as the fingerprints of earlier stages
+        :param form: called with the stages and the arguments, returns the formed object and a dict of values
+        :return: the fingerprint of the stage
+        """
+        #entries of another checkpoint version are missed instead of read
+        fingerprint = stage_cache.get_fingerprint([name, checkpoint.VERSION] + list(inputs))
+        self.stages[name] = (fingerprint, form, arguments)
+        return fingerprint
+
+    def get_values(self, name):
+        if name not in self.values:
+            entry_directory = self.cache.get(self.stages[name][0])
+            if entry_directory is None:
+                self.form(name)
+            else:
+                self.values[name] = mesh_exchange.read_value(entry_directory, "values")
+        return self.values[name]
+
+    def get_object(self, name):
+        """
+        :return: the object of the stage, stages that change it have to work on a copy
+        """
+        if name not in self.objects:
+            entry_directory = self.cache.get(self.stages[name][0])
+            if entry_directory is None:
+                self.form(name)
+            else:
+                with profiling.stage("read_cached_" + name):
+                    self.objects[name] = read_exchanged_object(entry_directory, name, self.material)
+                self.values[name] = mesh_exchange.read_value(entry_directory, "values")
+        return self.objects[name]
+
+    def form(self, name):
+        fingerprint, form, arguments = self.stages[name]
+        mesh_object, values = form(self, *arguments)
+
+        with self.cache.put(fingerprint) as entry_directory:
+            write_exchanged_object(mesh_object, entry_directory, name)
+            mesh_exchange.write_value(entry_directory, "values", values)
+
+        self.objects[name] = mesh_object
+        self.values[name] = values
+
+    def remove_objects_except(self, kept_object):
+        for mesh_object in self.objects.values():
+            if mesh_object != kept_object:
+                remove_object(mesh_object)
+
+
+def get_svg_fingerprint(svg_object, svg_path=None):
+    """
+    :return: the fingerprint of the SVG file mesh_core builds the frame from,
+             or of the curves Blender imported from the SVG
+    """
+    if svg_path is not None:
+        return ["mesh_core", stage_cache.get_file_fingerprint(svg_path)]
+
+    if svg_object.type == "CURVE":
+        arrays = get_curve_arrays(svg_object.data)
+    else:
+        arrays = [get_vertex_coordinates(svg_object.data)] + list(get_polygon_loops(svg_object.data)[1:])
+    return [svg_object.type, stage_cache.get_array_fingerprint([numpy.array(svg_object.matrix_world)] + arrays)]
+
+
+def get_curve_arrays(curve):
+    arrays = [numpy.array([curve.resolution_u])]
+    for spline in curve.splines:
+        arrays.append(numpy.array([spline.use_cyclic_u, spline.resolution_u]))
+        for points, attribute, size in ((spline.bezier_points, "co", 3),
+                                        (spline.bezier_points, "handle_left", 3),
+                                        (spline.bezier_points, "handle_right", 3),
+                                        (spline.points, "co", 4)):
+            values = numpy.empty(len(points) * size, dtype=numpy.float32)
+            points.foreach_get(attribute, values)
+            arrays.append(values)
+    return arrays
+
+
+def form_base_frame_stage(stages, svg_path, desired_width, desired_thickness, quality):
+    base_object = get_svg_object(desired_width, desired_thickness, svg_path, quality)
+    form_base_frame(base_object, desired_width, desired_thickness, quality)
+    return base_object, {"dimensions": list(base_object.dimensions)}
+
+
+def form_bridge_stage(stages, bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments):
+    bridge_object = copy_object(stages.get_object("base_frame"))
+    with profiling.stage("form_bridge", bridge_object):
+        form_bridge(bridge_object, bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments)
+    return bridge_object, {"bottom_of_bridge": find_min_z_coord_of_object(bridge_object)}
+
+
+def form_lens_area_stage(stages, right_lens, *lens_arguments):
+    lens_object = copy_object(stages.get_object("base_frame"))
+    if right_lens:
+        with profiling.stage("form_right_lens_area", lens_object):
+            form_right_lens_area(lens_object, *lens_arguments)
+    else:
+        with profiling.stage("form_left_lens_area", lens_object):
+            form_left_lens_area(lens_object, *lens_arguments)
+    return lens_object, {}
+
+
+def form_right_lens_area_stage(stages, symmetry_tolerance, *lens_arguments):
+    """forms the right lens area, or mirrors the left one when the frame is symmetric"""
+    base_object = stages.get_object("base_frame")
+    bpy.ops.object.mode_set(mode="OBJECT")
+    coordinates = deformation.transform_coordinates(get_vertex_coordinates(base_object.data), base_object.matrix_world)
+    if not is_frame_symmetric(coordinates, symmetry_tolerance):
+        return form_lens_area_stage(stages, True, *lens_arguments)
+
+    left_lens_object = stages.get_object("left_lens_area")
+    with profiling.stage("mirror_right_lens_area", left_lens_object):
+        right_lens_object = copy_object(left_lens_object)
+        mirror_object(right_lens_object)
+    return right_lens_object, {}
+
+
+def join_parts_stage(stages, frame_bend, quality):
+    parts = [copy_object(stages.get_object(name)) for name in ("bridge", "left_lens_area", "right_lens_area")]
+    return join_lens_areas_and_bridge(*parts, frame_bend=frame_bend, quality=quality), {}
+
+
+def decimate_frame_stage(stages, target_face_count, max_decimation_error):
+    complete_frame = copy_object(stages.get_object("frame"))
+    decimate_frame(complete_frame, target_face_count, max_decimation_error)
+    return complete_frame, {"decimation_error": complete_frame["decimation_error"]}
+
+
+def get_svg_object(desired_width, desired_thickness, svg_path=None, quality="final"):
+    """
+    :return: the selected SVG, or a mesh built from the SVG file by mesh_core
+    """
+    if svg_path is None:
+        return bpy.context.scene.objects.active
+
+    curve_resolution = get_quality_settings(quality)["curve_resolution"] or mesh_core.DEFAULT_CURVE_RESOLUTION
+    array_mesh, scaling_factor = mesh_core.create_mesh_from_svg_file(svg_path, desired_width, desired_thickness,
+                                                                     curve_resolution)
+    return create_object_from_array_mesh(array_mesh, os.path.splitext(os.path.basename(svg_path))[0], scaling_factor)
+
+
+def form_base_frame(selected_object, desired_width, desired_thickness, quality="final"):
+    """
+    The stages that only depend on the SVG, desired_width, desired_thickness and the curve resolution of the quality,
+    everything after this is done by form_lens_and_bridge.
+    """
+    #a mesh built by mesh_core is already scaled and extruded
+    if selected_object.type == "CURVE":
+        with profiling.stage("create_mesh_from_svg", selected_object):
+            set_curve_resolution(selected_object, quality)
+            create_mesh_from_svg(selected_object, desired_width, desired_thickness)
+
+    with profiling.stage("reorient_for_easier_manipulation", selected_object):
+        reorient_for_easier_manipulation(selected_object)
+
+
+def get_default_parameters():
+    signature = inspect.signature(create_eyeglasses_from_svg)
+    return dict((name, parameter.default) for name, parameter in signature.parameters.items())
+
+
+def create_frame_with_bmesh(svg_object,
+                            desired_width,
+                            desired_thickness,
+                            bridge_width,
+                            lens_bend,
+                            frame_bend,
+                            bridge_slant,
+                            bridge_protrusion_amount,
+                            nosepad_shrink_amount,
+                            resolution_tolerance=None,
+                            symmetry_tolerance=None,
+                            quality="final"):
+    """
+    Runs the same sequence as the operator pipeline on in-memory bmeshes.
+    The SVG curve is replaced by a new mesh object holding the frame.
+    The operator pipeline shrinks the nosepads and picks the middle of the bridge in the local units
+    of the scaled SVG, here they are converted to mm with the same scaling factor.
+    """
+    scene = bpy.context.scene
+    material = svg_object.data.materials[0] if svg_object.data.materials else None
+
+    if svg_object.type == "MESH":
+        #already scaled and extruded by mesh_core
+        frame_mesh = bmesh_editing.create_bmesh_from_object(svg_object)
+        scaling_factor = svg_object.matrix_world.to_scale()[0]
+    else:
+        set_curve_resolution(svg_object, quality)
+        frame_mesh, scaling_factor = create_bmesh_from_svg(svg_object, desired_width, desired_thickness)
+    reorient_bmesh_for_easier_manipulation(frame_mesh)
+
+    symmetric = is_frame_symmetric(bmesh_editing.get_coordinates(frame_mesh), symmetry_tolerance)
+
+    bridge_mesh = frame_mesh.copy()
+    if symmetric:
+        left_lens_mesh = frame_mesh
+    else:
+        left_lens_mesh = frame_mesh.copy()
+        right_lens_mesh = frame_mesh
+
+    number_of_segments = get_number_of_bridge_segments(bmesh_editing.get_dimensions(frame_mesh), bridge_width,
+                                                       frame_bend, resolution_tolerance, quality)
+    bridge_center = form_bridge_bmesh(bridge_mesh, bridge_width, bridge_slant, bridge_protrusion_amount,
+                                      number_of_segments, scaling_factor)
+
+    #measured from the center of the bridge, like find_min_z_coord_of_object after form_bridge
+    bottom_of_bridge = bmesh_editing.get_coordinates(bridge_mesh)[:, 2].min() - bridge_center[2]
+
+    #shrink_nosepad moves the vertices in the units of the SVG
+    shrink_amount = nosepad_shrink_amount * scaling_factor
+    form_lens_area_bmesh(left_lens_mesh, bridge_width, lens_bend, bridge_slant, bottom_of_bridge,
+                         shrink_amount, resolution_tolerance, left_lens=True, quality=quality)
+    if symmetric:
+        right_lens_mesh = left_lens_mesh.copy()
+        bmesh_editing.mirror(right_lens_mesh)
+    else:
+        form_lens_area_bmesh(right_lens_mesh, bridge_width, lens_bend, bridge_slant, bottom_of_bridge,
+                             shrink_amount, resolution_tolerance, left_lens=False, quality=quality)
+
+    #same gap and offsets as align and the translate in form_lens_and_bridge
+    gap = 0.04 * bmesh_editing.get_dimensions(bridge_mesh)[0]
+    for mesh in (bridge_mesh, left_lens_mesh, right_lens_mesh):
+        align_bmesh_to_y_origin(mesh)
+
+    bmesh_editing.translate(bridge_mesh, (gap, 1.0, 0.0))
+    bmesh_editing.translate(right_lens_mesh, (gap * 2, 0.0, 0.0))
+    bridge_center_x = bridge_center[0] + gap
+
+    #the bridge is the frame that the lens areas are joined into
+    close_seams = get_quality_settings(quality)["close_seams"]
+    bmesh_editing.join(bridge_mesh, left_lens_mesh)
+    if close_seams:
+        bmesh_editing.bridge_boundary_loops(bridge_mesh, lambda edge: all(vertex.co[0] < bridge_center_x
+                                                                          for vertex in edge.verts))
+    bmesh_editing.join(bridge_mesh, right_lens_mesh)
+    if close_seams:
+        bmesh_editing.bridge_boundary_loops(bridge_mesh, lambda edge: all(vertex.co[0] > bridge_center_x
+                                                                          for vertex in edge.verts))
+
+    left_lens_mesh.free()
+    right_lens_mesh.free()
+
+    frame_center = bmesh_editing.get_center_of_mass(bridge_mesh)
+    bmesh_editing.bend(bridge_mesh, frame_bend, frame_center)
+
+    complete_frame = bmesh_editing.create_object_from_bmesh(bridge_mesh, svg_object.name + "_frame", scene,
+                                                           location=frame_center, material=material)
+    bridge_mesh.free()
+
+    scene.objects.unlink(svg_object)
+    select_object(complete_frame)
+
+    return complete_frame
+
+
+def create_bmesh_from_svg(svg_object, desired_width, extrude_amount):
+    """
+    Creates a 3D bmesh from the imported 2D SVG, centered on its median
+    :return: the bmesh in mm and the scaling factor from the units of the SVG to mm
+    """
+    #default extrusion is in meters so will need to be converted
+    svg_object.data.extrude = extrude_amount / 1000
+
+    mesh = bmesh_editing.create_bmesh_from_curve(svg_object, bpy.context.scene)
+
+    scaling_factor = compute_scaling_factor(bmesh_editing.get_dimensions(mesh)[0], desired_width)
+    bmesh_editing.translate(mesh, -bmesh_editing.get_median(mesh))
+    bmesh_editing.scale(mesh, scaling_factor, (0.0, 0.0, 0.0))
+
+    return mesh, scaling_factor
+
+
+def reorient_bmesh_for_easier_manipulation(mesh):
+    #since Bend only bends around the Z axis, the frame have to be rotated.
+    rotation_value = 1.570797
+    bmesh_editing.rotate(mesh, rotation_value, "X", bmesh_editing.get_median(mesh))
+
+    bmesh_editing.translate(mesh, -bmesh_editing.get_center_of_mass(mesh))
+
+
+def align_bmesh_to_y_origin(mesh):
+    """the bmesh counterpart of aligning the negative Y side of the bounding box to the scene origin"""
+    min_y = bmesh_editing.get_coordinates(mesh)[:, 1].min()
+    bmesh_editing.translate(mesh, (0.0, -min_y, 0.0))
+
+
+def form_bridge_bmesh(mesh, bridge_width, bridge_slant, bridge_protrusion_amount, number_of_segments=20,
+                      scaling_factor=1.0):
+    """
+    :param scaling_factor: from the units of the SVG to mm, see create_bmesh_from_svg
+    :return: the center of mass of the formed bridge
+    """
+    bmesh_editing.bisect(mesh, -1.0 * bridge_width / 2.0, clear_inner=True, z_tilt=bridge_slant)
+    bmesh_editing.bisect(mesh, bridge_width / 2.0, clear_outer=True, z_tilt=-1*bridge_slant)
+
+    z_translation = compute_convergence_point(bridge_width, bridge_slant)
+    slant_spread = get_spread_for_bridge(bridge_slant, number_of_segments)
+    slicer.slice_bmesh(mesh, *slicer.get_fan_planes(slant_spread, z_translation))
+
+    #same region as select_mid_bridge_points, which measures it in the units of the SVG
+    max_region = 0.1 * (bridge_width / 2) / 1000 * scaling_factor
+    x_coords = bmesh_editing.get_coordinates(mesh)[:, 0]
+    selection = in_range(max_region, -1.0 * max_region, x_coords)
+    bmesh_editing.proportional_translate(mesh, selection, (0.0, bridge_protrusion_amount, 0.0), 7.0)
+
+    return bmesh_editing.get_center_of_mass(mesh)
+
+
+def form_lens_area_bmesh(mesh,
+                         bridge_width,
+                         bend_degree,
                          bridge_slant,
-                         bridge_protrusion_amount,
-                         nosepad_shrink_amount)
+                         bottom_of_bridge,
+                         nosepad_shrink_amount,
+                         resolution_tolerance=None,
+                         left_lens=True,
+                         quality="final"):
+    if left_lens:
+        bmesh_editing.bisect(mesh, -1.0 * bridge_width / 2.0, clear_outer=True, z_tilt=bridge_slant)
+    else:
+        bmesh_editing.bisect(mesh, bridge_width / 2.0, clear_inner=True, z_tilt=-1*bridge_slant)
+
+    create_nosepad_bmesh(mesh, bottom_of_bridge, nosepad_shrink_amount, left_lens)
+
+    #bend around the center of mass, like bend_lens_area after moving the origin
+    center = bmesh_editing.get_center_of_mass(mesh)
+    dimensions = bmesh_editing.get_dimensions(mesh)
+    quality_settings = get_quality_settings(quality)
+    if resolution_tolerance is None or not quality_settings["adaptive_resolution"]:
+        bisection_points = get_bisection_points(center=center[0], width=dimensions[0] * 0.75,
+                                                number_of_loops=quality_settings["lens_loops"])
+    else:
+        max_segment_length = resolution.get_max_segment_length(bend_degree, dimensions[0], dimensions[1],
+                                                               resolution_tolerance)
+        bisection_points = resolution.get_adaptive_cuts(bmesh_editing.get_coordinates(mesh),
+                                                        bmesh_editing.get_edges(mesh), max_segment_length)
+
+    if bisection_points:
+        slicer.slice_bmesh(mesh, *slicer.get_x_planes(bisection_points))
+    bmesh_editing.bend(mesh, bend_degree, center)
+
+
+def create_nosepad_bmesh(mesh, bottom_of_bridge, nosepad_shrink_amount, left_nosepad=True):
+    """
+    :param nosepad_shrink_amount: in mm, unlike the one of shrink_nosepad which is in the units of the SVG
+    """
+    coordinates = bmesh_editing.get_coordinates(mesh)
+    x_coords, y_coords, z_coords = coordinates.T
+
+    #same ranges as find_nosepad_x_coord_range and select_nosepad_peak_vertices
+    max_x, min_x = x_coords.max(), x_coords.min()
+    nosepad_range_width = 0.25 * (max_x - min_x)
+    if left_nosepad:
+        min_x = max_x - nosepad_range_width
+    else:
+        max_x = min_x + nosepad_range_width
+
+    bottom_of_nosepad = z_coords[in_range(max_x, min_x, x_coords)].min()
+    max_z, min_z = find_nosepad_peak_vertices_z_range(bottom_of_bridge, bottom_of_nosepad)
+    selection = in_range(max_z, min_z, z_coords) & in_range(max_x, min_x, x_coords)
+
+    non_nosepad_indices = numpy.flatnonzero(y_coords <= 0)
+
+    bmesh_editing.proportional_shrink_fatten(mesh, selection, nosepad_shrink_amount, 15.0)
+    bmesh_editing.proportional_translate(mesh, selection, (0.0, 6.0, 0.0), 15.0)
+
+    mesh.verts.ensure_lookup_table()
+    for index, coordinate in zip(non_nosepad_indices.tolist(), coordinates[non_nosepad_indices].tolist()):
+        mesh.verts[index].co = coordinate
+
 
+def create_object_from_array_mesh(array_mesh, name, scaling_factor=1.0):
+    """
+    Links a new mesh object built from a mesh_core.ArrayMesh and makes it the active object
+    :param scaling_factor: the scale of the object, its mesh keeps the vertices divided by it
+                           like an SVG that scale_svg_to_lifesize scaled
+    """
+    mesh = bpy.data.meshes.new(name)
+    set_mesh_triangles(mesh, array_mesh.vertices / scaling_factor, array_mesh.faces)
+
+    mesh_object = bpy.data.objects.new(name, mesh)
+    mesh_object.scale = (scaling_factor, scaling_factor, scaling_factor)
+    bpy.context.scene.objects.link(mesh_object)
+    select_object(mesh_object)
+
+    return mesh_object
+
+
+def import_svg(svg_path):
+    """
+    Imports the SVG into an empty scene and leaves it as the single selected curve object
+    """
+    bpy.ops.wm.read_homefile(use_empty=True)
+    bpy.ops.import_curve.svg(filepath=svg_path)
+
+    #the importer creates one curve object per SVG path, the script expects a single object
+    curve_objects = [scene_object for scene_object in bpy.context.scene.objects if scene_object.type == "CURVE"]
+    if not curve_objects:
+        raise ValueError("no curves found in {}".format(svg_path))
+
+    bpy.ops.object.select_all(action="DESELECT")
+    for curve_object in curve_objects:
+        curve_object.select = True
+    bpy.context.scene.objects.active = curve_objects[0]
+
+    if len(curve_objects) > 1:
+        bpy.ops.object.join()
+
+    return bpy.context.scene.objects.active
+
+
+def export_mesh(mesh_object, output_path):
+    """
+    Writes the object to the output path, the format is picked from the file extension.
+    STL and 3MF are written by mesh_io, OBJ by Blender's exporter.
+    """
+    select_object(mesh_object)
+
+    if mesh_io.is_supported(output_path):
+        mesh_io.write_mesh(output_path, *get_export_arrays(mesh_object))
+        return
+
+    output_directory = os.path.dirname(os.path.abspath(output_path))
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    extension = os.path.splitext(output_path)[1].lower()
+    if extension == ".obj":
+        bpy.ops.export_scene.obj(filepath=output_path, check_existing=False, use_selection=True)
+    else:
+        raise ValueError("unsupported output format {}".format(extension))
+
+
+def get_export_arrays(mesh_object):
+    """
+    :return: the world space vertex coordinates and the triangles of the polygons of the object
+    """
+    bpy.ops.object.mode_set(mode="OBJECT")
+
+    mesh = mesh_object.data
+    vertices = deformation.transform_coordinates(get_vertex_coordinates(mesh), mesh_object.matrix_world)
+    return vertices.astype(numpy.float32), get_polygon_triangles(mesh)
+
+
+def validate_frame(mesh_object, desired_thickness):
+    """
+    Checks the finished frame for open or non-manifold seams, self-intersections and thin walls
+    :return: the report of printability.check_printability
+    """
+    with profiling.stage("validate_frame", mesh_object):
+        return printability.check_printability(*get_export_arrays(mesh_object), desired_thickness=desired_thickness)
+
+
+def get_mesh_stats(mesh_object):
+    mesh = mesh_object.data
+    stats = {"vertices": len(mesh.vertices), "edges": len(mesh.edges), "faces": len(mesh.polygons)}
+    if "decimation_error" in mesh_object:
+        stats["decimation_error"] = mesh_object["decimation_error"]
+    return stats
+
+
+def run_job(job):
+    """
+    Runs a single job and reports how it went instead of raising,
+    so that one bad SVG does not take down the rest of a batch.
+    :param job: dict with the "svg" path, the "output" path, optional "parameters",
+                an optional "importer", "blender" (default) or "mesh_core",
+                an optional "profile", see get_job_profiler,
+                and an optional "validate" true to check that the frame is printable
+    """
+    result = {"svg": job.get("svg"), "output": job.get("output"), "status": "ok", "error": None}
+    start_time = time.time()
+    profiler = get_job_profiler(job)
+
+    try:
+        parameters = dict(job.get("parameters", {}))
+        parameters["svg_path"] = load_job_svg(job)
+
+        with profiler:
+            complete_frame = create_eyeglasses_from_svg(**parameters)
+            with profiling.stage("export_mesh", complete_frame):
+                export_mesh(complete_frame, job["output"])
+            if job.get("validate"):
+                result["validation"] = validate_frame(complete_frame, get_desired_thickness(parameters))
+        result["mesh"] = get_mesh_stats(complete_frame)
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+
+    if profiler.enabled:
+        result["profile"] = profiler.get_report()
 
-create_eyeglasses_from_svg()
+    result["seconds"] = time.time() - start_time
+    return result
+
+
+def get_desired_thickness(parameters):
+    return parameters.get("desired_thickness", get_default_parameters()["desired_thickness"])
+
+
+def get_job_profiler(job):
+    """
+    :param job: with "profile" true to profile the stages, or a dict that can also hold "cprofile" true
+                and a "cprofile_path" to write the cProfile stats to
+    :return: a profiling.Profiler, disabled when the job is not profiled
+    """
+    profile = job.get("profile")
+    if not isinstance(profile, dict):
+        return profiling.Profiler(enabled=bool(profile))
+    return profiling.Profiler(use_cprofile=profile.get("cprofile", False), cprofile_path=profile.get("cprofile_path"))
+
+
+def load_job_svg(job):
+    """
+    Starts from an empty scene with the SVG of the job imported and selected
+    :return: the svg_path to pass on when mesh_core builds the mesh instead of Blender's importer
+    """
+    if job.get("importer") == "mesh_core":
+        bpy.ops.wm.read_homefile(use_empty=True)
+        return job["svg"]
+
+    import_svg(job["svg"])
+    return None
+
+
+def copy_object(mesh_object):
+    object_copy = mesh_object.copy()
+    object_copy.data = mesh_object.data.copy()
+    bpy.context.scene.objects.link(object_copy)
+    return object_copy
+
+
+def remove_object(mesh_object):
+    mesh = mesh_object.data
+    bpy.context.scene.objects.unlink(mesh_object)
+    bpy.data.objects.remove(mesh_object)
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
+
+def remove_objects_except(kept_object):
+    for scene_object in list(bpy.context.scene.objects):
+        if scene_object is not kept_object:
+            bpy.context.scene.objects.unlink(scene_object)
+            bpy.data.objects.remove(scene_object)
+
+    for mesh in list(bpy.data.meshes):
+        if mesh.users == 0:
+            bpy.data.meshes.remove(mesh)
+
+
+def run_variants(job):
+    """
+    Runs variants that share the SVG, desired_width, desired_thickness and quality.
+    The stages before form_lens_and_bridge are only run once and copied for every variant.
+    :param job: dict with the "svg" path, the shared "base_parameters", optional "importer" and "validate",
+                and a list of "variants", each with an "output" path and its own "parameters"
+    """
+    result = {"svg": job.get("svg"), "status": "ok", "error": None, "variants": []}
+    start_time = time.time()
+
+    parameters = get_default_parameters()
+    parameters.update(job.get("base_parameters", {}))
+
+    try:
+        svg_path = load_job_svg(job)
+        setup_environment()
+        base_object = get_svg_object(parameters["desired_width"], parameters["desired_thickness"], svg_path,
+                                     parameters["quality"])
+
+        #the bmesh pipeline reorients on its own, so it starts every variant from the SVG
+        if parameters["pipeline"] != "bmesh":
+            form_base_frame(base_object, parameters["desired_width"], parameters["desired_thickness"],
+                            parameters["quality"])
+    except Exception:
+        result["status"] = "failed"
+        result["error"] = traceback.format_exc()
+        return result
+
+    result["base_seconds"] = time.time() - start_time
+
+    #files are written in the background while the next variant is formed
+    with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as export_executor:
+        writes = []
+        for variant in job["variants"]:
+            variant_result, write = run_variant(base_object, parameters, variant, export_executor,
+                                                job.get("validate", False))
+            result["variants"].append(variant_result)
+            if write is not None:
+                writes.append((variant_result, write))
+
+        for variant_result, write in writes:
+            try:
+                write.result()
+            except Exception:
+                variant_result["status"] = "failed"
+                variant_result["error"] = traceback.format_exc()
+
+    result["seconds"] = time.time() - start_time
+    return result
+
+
+def run_variant(base_object, parameters, variant, export_executor, validate=False):
+    """
+    :return: the result of the variant and the future of its file being written, if it is written in the background
+    """
+    variant_parameters = dict(parameters)
+    variant_parameters.update(variant.get("parameters", {}))
+
+    variant_result = {"output": variant.get("output"), "parameters": variant.get("parameters", {}),
+                      "status": "ok", "error": None}
+    variant_start_time = time.time()
+    write = None
+
+    try:
+        variant_object = copy_object(base_object)
+        select_object(variant_object)
+        complete_frame = form_variant(variant_object, variant_parameters)
+        variant_result["mesh"] = get_mesh_stats(complete_frame)
+        if validate:
+            variant_result["validation"] = validate_frame(complete_frame, variant_parameters["desired_thickness"])
+
+        if mesh_io.is_supported(variant["output"]):
+            write = export_executor.submit(mesh_io.write_mesh, variant["output"], *get_export_arrays(complete_frame))
+        else:
+            export_mesh(complete_frame, variant["output"])
+    except Exception:
+        variant_result["status"] = "failed"
+        variant_result["error"] = traceback.format_exc()
+
+    remove_objects_except(base_object)
+    variant_result["seconds"] = time.time() - variant_start_time
+    return variant_result, write
+
+
+def form_variant(variant_object, parameters):
+    if parameters["pipeline"] == "bmesh":
+        complete_frame = create_frame_with_bmesh(variant_object,
+                                                 parameters["desired_width"],
+                                                 parameters["desired_thickness"],
+                                                 parameters["bridge_width"],
+                                                 parameters["lens_bend"],
+                                                 parameters["frame_bend"],
+                                                 parameters["bridge_slant"],
+                                                 parameters["bridge_protrusion_amount"],
+                                                 parameters["nosepad_shrink_amount"],
+                                                 parameters["resolution_tolerance"],
+                                                 parameters["symmetry_tolerance"],
+                                                 parameters["quality"])
+    else:
+        complete_frame = form_lens_and_bridge(parameters["bridge_width"],
+                                              parameters["lens_bend"],
+                                              parameters["frame_bend"],
+                                              parameters["bridge_slant"],
+                                              parameters["bridge_protrusion_amount"],
+                                              parameters["nosepad_shrink_amount"],
+                                              parameters["resolution_tolerance"],
+                                              parameters["symmetry_tolerance"],
+                                              parameters["concurrent_parts"],
+                                              parameters["quality"])
+
+    decimate_frame(complete_frame, parameters["target_face_count"], parameters["max_decimation_error"])
+    return complete_frame
+
+
+def run_from_command_line(arguments):
+    """
+    Reads a job file, runs it and writes the result file
+    :param arguments: the arguments after "--", the job file path followed by the result file path
+    """
+    job_path, result_path = arguments[:2]
+
+    with open(job_path) as job_file:
+        job = json.load(job_file)
+
+    result = run_job_or_variants(job)
+
+    with open(result_path, "w") as result_file:
+        json.dump(result, result_file, indent=2)
+
+
+def run_job_or_variants(job):
+    if "variants" in job:
+        return run_variants(job)
+    return run_job(job)
+
+
+def reset_scene():
+    """starts over from an empty scene, dropping the meshes of earlier jobs"""
+    if bpy.context.object is not None:
+        bpy.ops.object.mode_set(mode="OBJECT")
+    bpy.ops.wm.read_homefile(use_empty=True)
+
+
+def serve(address):
+    """
+    Runs the jobs supervisor.py sends over the connection at the address, until it sends None.
+    The scene is reset before and after every job, so a job never sees what an earlier one left behind.
+    """
+    authkey = binascii.unhexlify(os.environ[AUTHKEY_VARIABLE].encode("ascii"))
+    listener = Listener(address, authkey=authkey)
+    connection = listener.accept()
+    try:
+        while True:
+            job = connection.recv()
+            if job is None:
+                break
+
+            reset_scene()
+            result = run_job_or_variants(job)
+            reset_scene()
+            connection.send(result)
+    finally:
+        connection.close()
+        listener.close()
+
+
+if __name__ == "__main__":
+    if "--form-part" in sys.argv:
+        form_part_from_command_line(*sys.argv[sys.argv.index("--form-part") + 1:][:2])
+    elif "--serve" in sys.argv:
+        serve(sys.argv[sys.argv.index("--serve") + 1])
+    elif "--" in sys.argv:
+        run_from_command_line(sys.argv[sys.argv.index("--") + 1:])
+    else:
+        create_eyeglasses_from_svg()
@@ -0,0 +1,214 @@
+"""
+Joins two meshes along the open boundaries the cuts left on both of them.
+
+Selecting the non-manifold edges and bridging them walks the whole joined mesh.
+Here the open boundaries of each mesh are found from one count of its polygon edges,
+then every boundary of one mesh is paired with the closest boundary of the other that is not paired yet,
+and only the vertices on the boundaries are paired: by their order when both boundaries have as many vertices,
+in which case they are welded halfway like bridge_edge_loops with use_merge,
+and otherwise by their arc length along the boundaries, with a strip of triangles stitched between them.
+"""
+import numpy
+
+
+def get_next_loops(loop_totals, loop_vertices):
+    """
+    :return: the index of the next loop around the polygon of every loop
+    """
+    loop_starts = numpy.cumsum(loop_totals) - loop_totals
+    next_loops = numpy.arange(1, len(loop_vertices) + 1)
+    next_loops[loop_starts + loop_totals - 1] = loop_starts
+    return next_loops
+
+
+def get_polygon_normals(coordinates, loop_totals, loop_vertices):
+    """
+    :return: (polygons, 3) array of the normals of the polygons by Newell's method, not normalized
+    """
+    points = coordinates[loop_vertices]
+    next_points = coordinates[loop_vertices[get_next_loops(loop_totals, loop_vertices)]]
+    loop_starts = numpy.cumsum(loop_totals) - loop_totals
+    return numpy.add.reduceat(numpy.cross(points, next_points), loop_starts, axis=0)
+
+
+def get_boundary_edges(loop_totals, loop_vertices):
+    """
+    :return: (edges, 2) array of the edges used by a single polygon, in the direction of that polygon,
+             and the index of that polygon for every edge
+    """
+    edges = numpy.column_stack((loop_vertices,
+                                loop_vertices[get_next_loops(loop_totals, loop_vertices)])).astype(numpy.int64)
+    polygons = numpy.repeat(numpy.arange(len(loop_totals)), loop_totals)
+
+    #an inner edge is used once in each direction by the polygons on both of its sides
+    number_of_vertices = int(loop_vertices.max()) + 1 if len(loop_vertices) else 0
+    keys = edges[:, 0] * number_of_vertices + edges[:, 1]
+    reversed_keys = edges[:, 1] * number_of_vertices + edges[:, 0]
+
+    sorted_keys = numpy.sort(keys)
+    positions = numpy.minimum(numpy.searchsorted(sorted_keys, reversed_keys), len(sorted_keys) - 1)
+    is_boundary = sorted_keys[positions] != reversed_keys
+    return edges[is_boundary], polygons[is_boundary]
+
+
+def get_sharpest_turn(coordinates, incoming_edge, normal, outgoing_edges):
+    """
+    :param normal: normal of the polygon of the incoming edge
+    :return: the outgoing edge turning the most towards that polygon from the incoming edge
+    """
+    direction = coordinates[incoming_edge[1]] - coordinates[incoming_edge[0]]
+    outgoing_directions = coordinates[outgoing_edges[:, 1]] - coordinates[outgoing_edges[:, 0]]
+    turns = numpy.arctan2(numpy.cross(direction, outgoing_directions).dot(normal),
+                          outgoing_directions.dot(direction))
+    return numpy.argmax(turns)
+
+
+def get_boundary_loops(coordinates, loop_totals, loop_vertices):
+    """
+    Boundaries touching at a vertex, as left by a cut grazing that vertex, are split there into simple loops
+    by leaving the vertex along the edge that turns the most towards the polygon the boundary came in from.
+    :return: the vertex indices of every open boundary, in the direction of the polygons along it
+    """
+    boundary_edges, edge_polygons = get_boundary_edges(loop_totals, loop_vertices)
+    normals = get_polygon_normals(coordinates, loop_totals, loop_vertices)
+
+    outgoing = {}
+    for index, start_vertex in enumerate(boundary_edges[:, 0].tolist()):
+        outgoing.setdefault(start_vertex, []).append(index)
+
+    boundary_loops = []
+    for first_edge in range(len(boundary_edges)):
+        if first_edge not in outgoing.get(boundary_edges[first_edge, 0], ()):
+            continue
+        edge = first_edge
+        boundary_loop = []
+        while True:
+            start_vertex, vertex = boundary_edges[edge].tolist()
+            outgoing[start_vertex].remove(edge)
+            boundary_loop.append(start_vertex)
+            candidates = outgoing.get(vertex)
+            if vertex == boundary_loop[0] or not candidates:
+                break
+            if len(candidates) == 1:
+                edge = candidates[0]
+            else:
+                edge = candidates[get_sharpest_turn(coordinates, boundary_edges[edge], normals[edge_polygons[edge]],
+                                                    boundary_edges[candidates])]
+        boundary_loops.append(numpy.array(boundary_loop))
+
+    return boundary_loops
+
+
+def get_arc_lengths(coordinates, boundary_loop):
+    """
+    :return: the length along the closed boundary up to each of its vertices and back to the first one,
+             as a fraction of the whole length
+    """
+    points = coordinates[numpy.append(boundary_loop, boundary_loop[0])]
+    lengths = numpy.concatenate(([0.0], numpy.cumsum(numpy.linalg.norm(numpy.diff(points, axis=0), axis=1))))
+    return lengths / lengths[-1] if lengths[-1] > 0.0 else numpy.linspace(0.0, 1.0, len(lengths))
+
+
+def align_facing_loop(coordinates, boundary_loop, facing_loop):
+    """
+    :return: the facing boundary turned around and starting at its vertex closest to the start of the boundary,
+             so both run along the seam in the same direction
+    """
+    facing_loop = facing_loop[::-1]
+    start = numpy.argmin(((coordinates[facing_loop] - coordinates[boundary_loop[0]]) ** 2).sum(axis=1))
+    return numpy.roll(facing_loop, -start)
+
+
+def get_stitch_triangles(coordinates, boundary_loop, facing_loop):
+    """
+    :param facing_loop: aligned by align_facing_loop
+    :return: (triangles, 3) array closing the strip between the boundaries, facing the same way as their polygons
+    """
+    lengths = get_arc_lengths(coordinates, boundary_loop)[1:]
+    facing_lengths = get_arc_lengths(coordinates, facing_loop)[1:]
+
+    #every triangle advances along one of the boundaries, whichever reaches its next vertex first
+    order = numpy.argsort(numpy.concatenate((lengths, facing_lengths)), kind="mergesort")
+    advances = order < len(lengths)
+    steps = numpy.cumsum(advances) - advances
+    facing_steps = numpy.cumsum(~advances) - ~advances
+
+    vertices = boundary_loop[steps % len(boundary_loop)]
+    next_vertices = boundary_loop[(steps + 1) % len(boundary_loop)]
+    facing_vertices = facing_loop[facing_steps % len(facing_loop)]
+    next_facing_vertices = facing_loop[(facing_steps + 1) % len(facing_loop)]
+
+    triangles = numpy.empty((len(order), 3), dtype=numpy.int64)
+    triangles[advances] = numpy.column_stack((next_vertices, vertices, facing_vertices))[advances]
+    triangles[~advances] = numpy.column_stack((facing_vertices, next_facing_vertices, vertices))[~advances]
+    return triangles
+
+
+def pair_closest_loops(coordinates, boundary_loops, other_boundary_loops):
+    """
+    pairs the boundaries one to one, the closest centers first
+    :return: (boundary loop, other boundary loop) pairs, boundaries left without a partner are not paired
+    """
+    if not boundary_loops or not other_boundary_loops:
+        return []
+
+    centers = numpy.array([coordinates[boundary_loop].mean(axis=0) for boundary_loop in boundary_loops])
+    other_centers = numpy.array([coordinates[other_loop].mean(axis=0) for other_loop in other_boundary_loops])
+    distances = ((centers[:, None, :] - other_centers[None, :, :]) ** 2).sum(axis=2)
+
+    pairs = []
+    paired, other_paired = set(), set()
+    for index, other_index in zip(*numpy.unravel_index(numpy.argsort(distances, axis=None), distances.shape)):
+        if index in paired or other_index in other_paired:
+            continue
+        paired.add(index)
+        other_paired.add(other_index)
+        pairs.append((boundary_loops[index], other_boundary_loops[other_index]))
+    return pairs
+
+
+def append_mesh(vertices, loop_totals, loop_vertices, other_vertices, other_loop_totals, other_loop_vertices):
+    """
+    :return: the vertices, loop totals and loop vertices of both meshes in one, with their boundaries left open
+    """
+    return (numpy.concatenate((vertices, other_vertices)),
+            numpy.concatenate((loop_totals, other_loop_totals)),
+            numpy.concatenate((loop_vertices, numpy.asarray(other_loop_vertices) + len(vertices))))
+
+
+def join_meshes(vertices, loop_totals, loop_vertices, other_vertices, other_loop_totals, other_loop_vertices):
+    """
+    Appends the other mesh and joins each of its open boundaries to the closest open boundary of the mesh,
+    each boundary is joined to at most one other. Both meshes have to be in the same space.
+    :return: the vertices, loop totals and loop vertices of the joined mesh
+    """
+    offset = len(vertices)
+    boundary_loops = get_boundary_loops(vertices, loop_totals, loop_vertices)
+    other_boundary_loops = [other_loop + offset for other_loop in
+                            get_boundary_loops(other_vertices, other_loop_totals, other_loop_vertices)]
+
+    coordinates, loop_totals, loop_vertices = append_mesh(vertices, loop_totals, loop_vertices,
+                                                          other_vertices, other_loop_totals, other_loop_vertices)
+
+    #halfway points come from the positions before welding, as a vertex where boundaries touch is on both of them
+    welded_coordinates = coordinates.copy()
+    targets = numpy.arange(len(coordinates))
+    stitch_triangles = []
+    for boundary_loop, other_loop in pair_closest_loops(coordinates, boundary_loops, other_boundary_loops):
+        facing_loop = align_facing_loop(coordinates, boundary_loop, other_loop)
+
+        if len(facing_loop) == len(boundary_loop):
+            welded_coordinates[boundary_loop] = (coordinates[boundary_loop] + coordinates[facing_loop]) / 2.0
+            targets[facing_loop] = boundary_loop
+        else:
+            stitch_triangles.append(get_stitch_triangles(coordinates, boundary_loop, facing_loop))
+
+    if stitch_triangles:
+        triangles = numpy.concatenate(stitch_triangles)
+        loop_totals = numpy.concatenate((loop_totals, numpy.full(len(triangles), 3, dtype=loop_totals.dtype)))
+        loop_vertices = numpy.concatenate((loop_vertices, triangles.ravel()))
+
+    #the welded vertices are dropped and the rest renumbered
+    kept = targets == numpy.arange(len(coordinates))
+    new_indices = numpy.cumsum(kept) - 1
+    return welded_coordinates[kept], loop_totals, new_indices[targets[loop_vertices]]
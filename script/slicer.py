@@ -0,0 +1,177 @@
+"""
+Inserts the edge loops of a whole family of planes in a single pass over a bmesh.
+
+Bisecting once per plane walks the full mesh for every plane.
+Here the signed distances of all vertices to all planes are computed at once,
+then only the edges that cross a plane are split and only the faces they border are cut.
+
+The planes must not cross each other inside the mesh.
+That holds for parallel planes and for a fan of planes meeting outside of the mesh,
+such as the bridge planes meeting at compute_convergence_point.
+"""
+import bmesh
+import numpy
+from mathutils import Vector
+
+
+def get_x_planes(x_coords):
+    """
+    :return: the points and normals of planes perpendicular to the X axis
+    """
+    points = numpy.zeros((len(x_coords), 3))
+    points[:, 0] = x_coords
+    normals = numpy.zeros((len(x_coords), 3))
+    normals[:, 0] = 1.0
+    return points, normals
+
+
+def get_fan_planes(z_tilts, z_translation):
+    """
+    :return: the points and normals of the planes bisect uses for each z tilt,
+             all passing through (0, 0, z_translation)
+    """
+    points = numpy.zeros((len(z_tilts), 3))
+    points[:, 2] = z_translation
+    normals = numpy.zeros((len(z_tilts), 3))
+    normals[:, 0] = 1.0
+    normals[:, 2] = z_tilts
+    return points, normals
+
+
+def transform_planes(points, normals, matrix):
+    """
+    moves planes given in world space into the local space of an object
+    :param matrix: the 4x4 matrix_world of the object
+    """
+    matrix = numpy.array(matrix, dtype=numpy.float64)
+    inverse = numpy.linalg.inv(matrix)
+    local_points = points.dot(inverse[:3, :3].T) + inverse[:3, 3]
+    #normals transform with the transpose of the world matrix
+    local_normals = normals.dot(matrix[:3, :3])
+    return local_points, local_normals
+
+
+def find_plane_crossings(coordinates, edges, points, normals, threshold=1e-6):
+    """
+    :param coordinates: (vertices, 3) array
+    :param edges: (edges, 2) array of vertex indices
+    :return: a (vertices, planes) mask of the vertices lying on each plane,
+             and the edge index, plane index and factor along the edge of every crossing
+    """
+    unit_normals = normals / numpy.linalg.norm(normals, axis=1)[:, None]
+    distances = coordinates.dot(unit_normals.T) - (points * unit_normals).sum(axis=1)
+
+    on_plane = numpy.abs(distances) <= threshold
+    distances[on_plane] = 0.0
+
+    start_distances = distances[edges[:, 0]]
+    end_distances = distances[edges[:, 1]]
+    edge_indices, plane_indices = numpy.nonzero(start_distances * end_distances < 0.0)
+
+    start_distances = start_distances[edge_indices, plane_indices]
+    end_distances = end_distances[edge_indices, plane_indices]
+    factors = start_distances / (start_distances - end_distances)
+
+    return on_plane, edge_indices, plane_indices, factors
+
+
+def slice_bmesh(mesh, points, normals, threshold=1e-6):
+    """
+    Inserts an edge loop along every plane, like bisecting once per plane without clearing.
+    :param points: (planes, 3) array of a point on each plane
+    :param normals: (planes, 3) array of the normal of each plane
+    """
+    mesh.verts.index_update()
+
+    #held on to since splitting invalidates the lookup tables
+    mesh_vertices = mesh.verts[:]
+    mesh_edges = mesh.edges[:]
+
+    coordinates = numpy.array([vertex.co[:] for vertex in mesh_vertices], dtype=numpy.float64).reshape(-1, 3)
+    edges = numpy.array([[vertex.index for vertex in edge.verts] for edge in mesh_edges], dtype=numpy.int64)
+    edges = edges.reshape(-1, 2)
+
+    on_plane, edge_indices, plane_indices, factors = find_plane_crossings(coordinates, edges,
+                                                                          numpy.asarray(points, dtype=numpy.float64),
+                                                                          numpy.asarray(normals, dtype=numpy.float64),
+                                                                          threshold)
+
+    plane_vertices = [set(mesh_vertices[index] for index in numpy.flatnonzero(on_plane[:, plane]).tolist())
+                      for plane in range(len(points))]
+
+    #split each crossed edge at all of its crossings, ordered from the start of the edge
+    order = numpy.lexsort((factors, edge_indices))
+    edge_indices, plane_indices, factors = edge_indices[order], plane_indices[order], factors[order]
+    boundaries = numpy.flatnonzero(numpy.diff(edge_indices)) + 1
+
+    for crossing_edge, crossing_planes, crossing_factors in zip(numpy.split(edge_indices, boundaries),
+                                                                numpy.split(plane_indices, boundaries),
+                                                                numpy.split(factors, boundaries)):
+        if not len(crossing_edge):
+            continue
+
+        start_index, end_index = edges[crossing_edge[0]].tolist()
+        start, end = coordinates[start_index], coordinates[end_index]
+        end_vertex = mesh_vertices[end_index]
+        edge = mesh_edges[int(crossing_edge[0])]
+        vertex = mesh_vertices[start_index]
+        previous_factor = 0.0
+
+        for plane, factor in zip(crossing_planes.tolist(), crossing_factors.tolist()):
+            local_factor = (factor - previous_factor) / (1.0 - previous_factor)
+            new_edge, new_vertex = bmesh.utils.edge_split(edge, vertex, local_factor)
+            new_vertex.co = start + factor * (end - start)
+            plane_vertices[plane].add(new_vertex)
+
+            #carry on along the part of the edge that still reaches the end vertex
+            edge = next(link_edge for link_edge in new_vertex.link_edges if end_vertex in link_edge.verts)
+            vertex = new_vertex
+            previous_factor = factor
+
+    for plane_normal, vertices in zip(normals, plane_vertices):
+        cut_faces_along_plane(vertices, Vector(plane_normal).normalized(), threshold)
+
+
+def cut_faces_along_plane(vertices, plane_normal, threshold=1e-6):
+    """connects the vertices lying on a plane across every face they pass through"""
+    faces = set(face for vertex in vertices for face in vertex.link_faces)
+
+    for face in faces:
+        if not face.is_valid:
+            continue
+
+        face_vertices = [loop.vert for loop in face.loops
+                         if loop.vert in vertices and crosses_plane(loop, plane_normal, threshold)]
+        if len(face_vertices) < 2:
+            continue
+
+        #a concave face can be crossed several times, pair the crossings in order along the cut
+        cut_direction = face.normal.cross(plane_normal)
+        face_vertices.sort(key=lambda vertex: vertex.co.dot(cut_direction))
+
+        for vertex_a, vertex_b in zip(face_vertices[0::2], face_vertices[1::2]):
+            connect_vertices(vertex_a, vertex_b)
+
+
+def crosses_plane(loop, plane_normal, threshold=1e-6):
+    """
+    whether the face passes through the plane at the vertex of the loop,
+    a vertex that only touches the plane has both of its neighbours in the face on the same side
+    :param plane_normal: unit normal of the plane
+    """
+    vertex = loop.vert
+    previous_side = (loop.link_loop_prev.vert.co - vertex.co).dot(plane_normal)
+    next_side = (loop.link_loop_next.vert.co - vertex.co).dot(plane_normal)
+    if abs(previous_side) <= threshold or abs(next_side) <= threshold:
+        return False
+    return (previous_side < 0.0) != (next_side < 0.0)
+
+
+def connect_vertices(vertex_a, vertex_b):
+    if any(vertex_b in edge.verts for edge in vertex_a.link_edges):
+        return
+
+    for face in vertex_a.link_faces:
+        if vertex_b in face.verts:
+            bmesh.utils.face_split(face, vertex_a, vertex_b)
+            return
@@ -0,0 +1,121 @@
+"""
+An on-disk cache of the meshes between the stages of the pipeline,
+so a rerun only forms the stages whose inputs changed.
+
+Every stage is stored under a fingerprint of its inputs, a SHA-256 over the fingerprints of the stages it starts from
+and its own parameters. Changing only the frame_bend finds the bridge and the lens areas in the cache,
+so they are only joined and bent again.
+An entry is a directory of mesh checkpoints and values, moved into place once it is complete,
+so processes sharing the cache never read half of an entry.
+The entries that have not been used for the longest are removed once the cache grows past max_bytes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import numpy
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+#entries being written, skipped when evicting
+TEMPORARY_SUFFIX = ".tmp"
+
+FILE_CHUNK_SIZE = 1 << 20
+
+
+def get_fingerprint(inputs):
+    """
+    :param inputs: JSON values, such as the fingerprints of earlier stages followed by parameters
+    """
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def get_file_fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as input_file:
+        for chunk in iter(lambda: input_file.read(FILE_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_array_fingerprint(arrays):
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = numpy.ascontiguousarray(array)
+        #the same bytes in another shape or type are other inputs
+        digest.update("{}{}".format(array.dtype.str, array.shape).encode("ascii"))
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def get_directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+class StageCache(object):
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param directory: created if it does not exist, can be shared by processes running at the same time
+        :param max_bytes: the size the cache is brought back under after every new entry
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+
+    def get_entry_directory(self, fingerprint):
+        return os.path.join(self.directory, fingerprint)
+
+    def get(self, fingerprint):
+        """
+        :return: the directory of the entry and marks it as just used, None when it is not cached
+        """
+        entry_directory = self.get_entry_directory(fingerprint)
+        try:
+            os.utime(entry_directory)
+        except OSError:
+            return None
+        return entry_directory
+
+    @contextmanager
+    def put(self, fingerprint):
+        """
+        Yields a directory to write the entry to, it becomes the entry when the block finishes without raising
+        """
+        temporary_directory = tempfile.mkdtemp(suffix=TEMPORARY_SUFFIX, dir=self.directory)
+        try:
+            yield temporary_directory
+            try:
+                os.rename(temporary_directory, self.get_entry_directory(fingerprint))
+            except OSError:
+                #another process stored the same stage first
+                pass
+        finally:
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+
+        self.evict()
+
+    def evict(self):
+        """removes the least recently used entries until the cache is no larger than max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            entry_directory = os.path.join(self.directory, name)
+            if name.endswith(TEMPORARY_SUFFIX) or not os.path.isdir(entry_directory):
+                continue
+            try:
+                entries.append((os.path.getmtime(entry_directory), get_directory_size(entry_directory),
+                                entry_directory))
+            except OSError:
+                #evicted by another process in the meantime
+                continue
+
+        size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_directory in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            shutil.rmtree(entry_directory, ignore_errors=True)
+            size -= entry_size
@@ -0,0 +1,196 @@
+"""
+Keeps a pool of warm background Blender processes that run jobs one after another.
+
+Starting Blender, loading run.py and its imports costs more than forming a small frame,
+so every worker pays it once and then runs jobs sent over a local connection:
+    blender -b --factory-startup --python run.py -- --serve ADDRESS
+The worker resets to an empty scene before and after every job. Workers are recycled after
+jobs_per_worker jobs, so the memory Blender does not give back can not keep growing,
+and a worker that crashes or times out is replaced by a fresh one.
+
+    with Supervisor(blender_path, workers=4) as supervisor:
+        result = supervisor.run_job(job)
+
+Like batch.py this does not need Blender's python, only a Blender executable to launch.
+"""
+import binascii
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Client
+
+RUN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run.py")
+
+#the worker reads the key of the connection from the environment rather than from its command line
+AUTHKEY_VARIABLE = "PINCE_NEZ_AUTHKEY"
+
+DEFAULT_JOBS_PER_WORKER = 50
+
+#seconds a worker may take to start listening
+STARTUP_TIMEOUT = 120
+
+
+def get_worker_address(work_directory, name):
+    if sys.platform == "win32":
+        return r"\\.\pipe\pince-nez-{}-{}".format(os.getpid(), name)
+    return os.path.join(work_directory, name + ".sock")
+
+
+class WarmWorker(object):
+    """
+    :ivar jobs_done: the number of jobs the worker has run
+    """
+
+    def __init__(self, blender_path, work_directory, name, authkey):
+        self.name = name
+        self.address = get_worker_address(work_directory, name)
+        self.log_path = os.path.join(work_directory, name + ".log")
+        self.jobs_done = 0
+
+        environment = dict(os.environ)
+        environment[AUTHKEY_VARIABLE] = binascii.hexlify(authkey).decode("ascii")
+        command = [blender_path, "-b", "--factory-startup", "--python", RUN_SCRIPT, "--", "--serve", self.address]
+        with open(self.log_path, "w") as log_file:
+            self.process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, env=environment)
+
+        self.connection = None
+        self.connection = self.connect(authkey)
+
+    def connect(self, authkey):
+        start_time = time.time()
+        while True:
+            try:
+                return Client(self.address, authkey=authkey)
+            except OSError:
+                #not listening yet
+                if self.process.poll() is not None:
+                    raise RuntimeError("worker exited with code {} on startup, see {}".format(self.process.returncode,
+                                                                                              self.log_path))
+                if time.time() - start_time > STARTUP_TIMEOUT:
+                    self.kill()
+                    raise RuntimeError("worker did not start within {} seconds, see {}".format(STARTUP_TIMEOUT,
+                                                                                               self.log_path))
+                time.sleep(0.05)
+
+    def run_job(self, job, timeout=None):
+        """
+        :return: the result of run.py, raises EOFError when the worker died and TimeoutError when it took too long.
+                 A worker that timed out is killed, its late result would otherwise answer the next job
+        """
+        self.connection.send(job)
+        if not self.connection.poll(timeout):
+            self.kill()
+            raise TimeoutError("timed out after {} seconds".format(timeout))
+
+        result = self.connection.recv()
+        self.jobs_done += 1
+        return result
+
+    def stop(self):
+        try:
+            self.connection.send(None)
+            self.connection.close()
+            self.process.wait(timeout=10)
+        except (OSError, EOFError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        if self.connection is not None:
+            self.connection.close()
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+
+class Supervisor(object):
+    """
+    A pool of warm workers, run_job can be called from as many threads as there are workers
+    """
+
+    def __init__(self, blender_path, workers=None, jobs_per_worker=DEFAULT_JOBS_PER_WORKER, timeout=None):
+        """
+        :param jobs_per_worker: jobs after which a worker is replaced by a fresh one
+        :param timeout: seconds before a job is failed and its worker killed
+        """
+        self.blender_path = blender_path
+        self.number_of_workers = workers or os.cpu_count() or 1
+        self.jobs_per_worker = jobs_per_worker
+        self.timeout = timeout
+
+        self.authkey = os.urandom(32)
+        self.work_directory = None
+        self.idle_workers = queue.Queue()
+        self.workers_started = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exception_type, exception, exception_traceback):
+        self.stop()
+        return False
+
+    def start(self):
+        self.work_directory = tempfile.mkdtemp(prefix="pince-nez-workers-")
+        #Blender starts up in all of them at once, a worker that fails to start is tried again on its first job
+        with ThreadPoolExecutor(max_workers=self.number_of_workers) as executor:
+            for worker in executor.map(lambda _: self.try_start_worker(), range(self.number_of_workers)):
+                self.idle_workers.put(worker)
+
+    def start_worker(self):
+        with self.lock:
+            self.workers_started += 1
+            name = "worker_{:04d}".format(self.workers_started)
+        return WarmWorker(self.blender_path, self.work_directory, name, self.authkey)
+
+    def stop(self):
+        while not self.idle_workers.empty():
+            worker = self.idle_workers.get()
+            if worker is not None:
+                worker.stop()
+        shutil.rmtree(self.work_directory, ignore_errors=True)
+
+    def run_job(self, job):
+        """
+        Never raises, a crash or a timeout is reported as a failed result like batch.run_blender_job
+        """
+        #None stands for a worker that could not be started and is started again on its next job
+        worker = self.idle_workers.get()
+        start_time = time.time()
+
+        try:
+            if worker is None:
+                worker = self.start_worker()
+            result = worker.run_job(job, self.timeout)
+        except (OSError, EOFError, TimeoutError, RuntimeError) as error:
+            if worker is not None:
+                worker.kill()
+                error = "{}, see {}".format(str(error) or "worker exited", worker.log_path)
+            result = {"svg": job.get("svg"), "output": job.get("output"), "status": "failed", "error": str(error)}
+            worker = None
+
+        result["parameters"] = job.get("parameters", {})
+        #the time spent in the job itself versus including the round trip to the worker
+        result["wall_seconds"] = time.time() - start_time
+
+        #a dead or worn out worker is replaced right away, so the next job finds a warm one
+        if worker is None or worker.jobs_done >= self.jobs_per_worker:
+            if worker is not None:
+                worker.stop()
+            worker = self.try_start_worker()
+        self.idle_workers.put(worker)
+
+        return result
+
+    def try_start_worker(self):
+        try:
+            return self.start_worker()
+        except (OSError, RuntimeError):
+            return None
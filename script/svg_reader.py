@@ -0,0 +1,352 @@
+"""
+Reads the closed outlines of an SVG as flattened polygons, without Blender.
+
+Curves are flattened into a fixed number of segments, like the resolution of a Blender curve.
+Only closed shapes are kept since open curves are not filled when Blender imports an SVG.
+"""
+import math
+import re
+import xml.etree.ElementTree as ElementTree
+
+import numpy
+
+#the segments per curve Blender gives imported SVG curves
+DEFAULT_CURVE_RESOLUTION = 12
+
+COMMAND_PATTERN = re.compile(r"([MmZzLlHhVvCcSsQqTtAa])|([-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?)")
+NUMBER_PATTERN = re.compile(r"[-+]?(?:\d*\.\d+|\d+\.?)(?:[eE][-+]?\d+)?")
+TRANSFORM_PATTERN = re.compile(r"(matrix|translate|scale|rotate|skewX|skewY)\s*\(([^)]*)\)")
+
+#containers whose content is not drawn directly
+SKIPPED_ELEMENTS = ("defs", "clipPath", "mask", "symbol", "marker", "pattern", "metadata", "title", "desc")
+
+
+def read_svg_outlines(svg_path, curve_resolution=DEFAULT_CURVE_RESOLUTION):
+    """
+    :return: list of (points, 2) arrays of the closed outlines, in SVG user units with the Y axis pointing up
+    """
+    root = ElementTree.parse(svg_path).getroot()
+
+    outlines = []
+    collect_outlines(root, numpy.identity(3), curve_resolution, outlines)
+
+    for outline in outlines:
+        outline[:, 1] *= -1.0
+    return outlines
+
+
+def get_tag(element):
+    return element.tag.rsplit("}", 1)[-1]
+
+
+def collect_outlines(element, parent_transform, curve_resolution, outlines):
+    tag = get_tag(element)
+    if tag in SKIPPED_ELEMENTS or "none" in (element.get("display"), get_style(element, "display")):
+        return
+
+    transform = parent_transform.dot(parse_transform(element.get("transform", "")))
+
+    for subpath in get_element_subpaths(element, tag, curve_resolution):
+        points = remove_repeated_points(apply_transform(subpath, transform))
+        if len(points) >= 3:
+            outlines.append(points)
+
+    for child in element:
+        collect_outlines(child, transform, curve_resolution, outlines)
+
+
+def get_style(element, name):
+    for declaration in element.get("style", "").split(";"):
+        if ":" in declaration:
+            key, value = declaration.split(":", 1)
+            if key.strip() == name:
+                return value.strip()
+    return None
+
+
+def get_length(element, name, default=0.0):
+    value = element.get(name)
+    if value is None:
+        return default
+    match = NUMBER_PATTERN.match(value.strip())
+    return float(match.group(0)) if match else default
+
+
+def get_element_subpaths(element, tag, curve_resolution):
+    """
+    :return: the closed subpaths of a drawable element as lists of (x, y) points
+    """
+    if tag == "path":
+        return flatten_path(element.get("d", ""), curve_resolution)
+
+    if tag == "polygon":
+        values = [float(value) for value in NUMBER_PATTERN.findall(element.get("points", ""))]
+        return [list(zip(values[0::2], values[1::2]))]
+
+    if tag == "rect":
+        x, y = get_length(element, "x"), get_length(element, "y")
+        width, height = get_length(element, "width"), get_length(element, "height")
+        return [[(x, y), (x + width, y), (x + width, y + height), (x, y + height)]]
+
+    if tag in ("circle", "ellipse"):
+        center_x, center_y = get_length(element, "cx"), get_length(element, "cy")
+        if tag == "circle":
+            radius_x = radius_y = get_length(element, "r")
+        else:
+            radius_x, radius_y = get_length(element, "rx"), get_length(element, "ry")
+        #a Blender circle is four curves
+        segments = 4 * curve_resolution
+        return [[(center_x + radius_x * math.cos(2.0 * math.pi * step / segments),
+                  center_y + radius_y * math.sin(2.0 * math.pi * step / segments)) for step in range(segments)]]
+
+    return []
+
+
+def parse_transform(transform_text):
+    transform = numpy.identity(3)
+
+    for name, arguments in TRANSFORM_PATTERN.findall(transform_text):
+        values = [float(value) for value in NUMBER_PATTERN.findall(arguments)]
+        matrix = numpy.identity(3)
+
+        if name == "matrix":
+            matrix[0, :] = values[0], values[2], values[4]
+            matrix[1, :] = values[1], values[3], values[5]
+        elif name == "translate":
+            matrix[0, 2] = values[0]
+            matrix[1, 2] = values[1] if len(values) > 1 else 0.0
+        elif name == "scale":
+            matrix[0, 0] = values[0]
+            matrix[1, 1] = values[1] if len(values) > 1 else values[0]
+        elif name == "rotate":
+            angle = math.radians(values[0])
+            rotation = numpy.array([[math.cos(angle), -math.sin(angle), 0.0],
+                                    [math.sin(angle), math.cos(angle), 0.0],
+                                    [0.0, 0.0, 1.0]])
+            if len(values) == 3:
+                to_center = numpy.identity(3)
+                to_center[:2, 2] = values[1:]
+                from_center = numpy.identity(3)
+                from_center[:2, 2] = [-values[1], -values[2]]
+                rotation = to_center.dot(rotation).dot(from_center)
+            matrix = rotation
+        elif name == "skewX":
+            matrix[0, 1] = math.tan(math.radians(values[0]))
+        elif name == "skewY":
+            matrix[1, 0] = math.tan(math.radians(values[0]))
+
+        transform = transform.dot(matrix)
+
+    return transform
+
+
+def apply_transform(points, transform):
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 2)
+    return points.dot(transform[:2, :2].T) + transform[:2, 2]
+
+
+def remove_repeated_points(points, tolerance=1e-9):
+    """welds consecutive points together, including the last point repeating the first"""
+    if len(points) == 0:
+        return points
+    following = numpy.roll(points, -1, axis=0)
+    distinct = numpy.abs(points - following).max(axis=1) > tolerance
+    return points[distinct]
+
+
+def tokenize_path(path_data):
+    for command, number in COMMAND_PATTERN.findall(path_data):
+        yield command if command else float(number)
+
+
+def flatten_path(path_data, curve_resolution=DEFAULT_CURVE_RESOLUTION):
+    """
+    :return: the closed subpaths of the path data, as lists of (x, y) points
+    """
+    tokens = list(tokenize_path(path_data))
+    subpaths = []
+    points = []
+
+    current = (0.0, 0.0)
+    start = (0.0, 0.0)
+    last_control = None
+    previous_command = None
+    command = None
+    position = 0
+
+    def take(count):
+        values = tokens[position:position + count]
+        if len(values) < count or any(isinstance(value, str) for value in values):
+            raise ValueError("malformed path data near {}".format(values))
+        return values
+
+    while position < len(tokens):
+        if isinstance(tokens[position], str):
+            command = tokens[position]
+            position += 1
+        elif command is None:
+            raise ValueError("path data has to start with a command")
+
+        relative = command.islower()
+        upper = command.upper()
+        origin_x, origin_y = current if relative else (0.0, 0.0)
+
+        if upper == "Z":
+            if len(points) >= 3:
+                subpaths.append(points)
+            #drawing on without a move starts a new subpath at the same point
+            points = [start]
+            current = start
+            last_control = None
+            previous_command = upper
+            command = None
+            continue
+
+        if upper == "M":
+            x, y = take(2)
+            position += 2
+            add_if_closed(points, subpaths)
+            current = start = (x + origin_x, y + origin_y)
+            points = [current]
+            #following pairs are implicit line-tos
+            command = "l" if relative else "L"
+            last_control = None
+        elif upper in ("L", "H", "V"):
+            if upper == "L":
+                x, y = take(2)
+                position += 2
+                current = (x + origin_x, y + origin_y)
+            elif upper == "H":
+                x, = take(1)
+                position += 1
+                current = (x + origin_x, current[1])
+            else:
+                y, = take(1)
+                position += 1
+                current = (current[0], y + origin_y)
+            points.append(current)
+            last_control = None
+        elif upper in ("C", "S"):
+            if upper == "C":
+                values = take(6)
+                position += 6
+                control_1 = (values[0] + origin_x, values[1] + origin_y)
+                control_2, end = (values[2] + origin_x, values[3] + origin_y), (values[4] + origin_x, values[5] + origin_y)
+            else:
+                values = take(4)
+                position += 4
+                control_1 = reflect(last_control, current) if previous_command in ("C", "S") else current
+                control_2, end = (values[0] + origin_x, values[1] + origin_y), (values[2] + origin_x, values[3] + origin_y)
+            points.extend(flatten_cubic(current, control_1, control_2, end, curve_resolution))
+            last_control = control_2
+            current = end
+        elif upper in ("Q", "T"):
+            if upper == "Q":
+                values = take(4)
+                position += 4
+                control = (values[0] + origin_x, values[1] + origin_y)
+                end = (values[2] + origin_x, values[3] + origin_y)
+            else:
+                values = take(2)
+                position += 2
+                control = reflect(last_control, current) if previous_command in ("Q", "T") else current
+                end = (values[0] + origin_x, values[1] + origin_y)
+            points.extend(flatten_quadratic(current, control, end, curve_resolution))
+            last_control = control
+            current = end
+        elif upper == "A":
+            values = take(7)
+            position += 7
+            end = (values[5] + origin_x, values[6] + origin_y)
+            points.extend(flatten_arc(current, values[0], values[1], values[2], values[3] != 0, values[4] != 0,
+                                      end, curve_resolution))
+            last_control = None
+            current = end
+
+        previous_command = upper
+
+    add_if_closed(points, subpaths)
+    return subpaths
+
+
+def add_if_closed(points, subpaths):
+    """a subpath without a Z that ends where it started is closed as well"""
+    if len(points) > 3 and numpy.allclose(points[0], points[-1]):
+        subpaths.append(points)
+
+
+def reflect(control, point):
+    if control is None:
+        return point
+    return (2.0 * point[0] - control[0], 2.0 * point[1] - control[1])
+
+
+def flatten_cubic(start, control_1, control_2, end, curve_resolution):
+    """:return: the points after the start of the curve"""
+    t = numpy.arange(1, curve_resolution + 1, dtype=numpy.float64)[:, None] / curve_resolution
+    start, control_1, control_2, end = (numpy.asarray(point, dtype=numpy.float64)
+                                        for point in (start, control_1, control_2, end))
+    points = ((1 - t) ** 3 * start + 3 * (1 - t) ** 2 * t * control_1 +
+              3 * (1 - t) * t ** 2 * control_2 + t ** 3 * end)
+    return [tuple(point) for point in points.tolist()]
+
+
+def flatten_quadratic(start, control, end, curve_resolution):
+    """:return: the points after the start of the curve"""
+    t = numpy.arange(1, curve_resolution + 1, dtype=numpy.float64)[:, None] / curve_resolution
+    start, control, end = (numpy.asarray(point, dtype=numpy.float64) for point in (start, control, end))
+    points = (1 - t) ** 2 * start + 2 * (1 - t) * t * control + t ** 2 * end
+    return [tuple(point) for point in points.tolist()]
+
+
+def flatten_arc(start, radius_x, radius_y, rotation, large_arc, sweep, end, curve_resolution):
+    """
+    flattens an elliptical arc, using the endpoint to center conversion from the SVG specification
+    :return: the points after the start of the arc
+    """
+    if radius_x == 0 or radius_y == 0 or start == end:
+        return [end]
+
+    radius_x, radius_y = abs(radius_x), abs(radius_y)
+    angle = math.radians(rotation)
+    cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+
+    half_dx = (start[0] - end[0]) / 2.0
+    half_dy = (start[1] - end[1]) / 2.0
+    x1 = cos_angle * half_dx + sin_angle * half_dy
+    y1 = -sin_angle * half_dx + cos_angle * half_dy
+
+    #scale up radii that are too small to reach the end
+    radii_scale = (x1 / radius_x) ** 2 + (y1 / radius_y) ** 2
+    if radii_scale > 1.0:
+        radius_x *= math.sqrt(radii_scale)
+        radius_y *= math.sqrt(radii_scale)
+
+    numerator = (radius_x * radius_y) ** 2 - (radius_x * y1) ** 2 - (radius_y * x1) ** 2
+    denominator = (radius_x * y1) ** 2 + (radius_y * x1) ** 2
+    factor = math.sqrt(max(0.0, numerator / denominator))
+    if large_arc == sweep:
+        factor = -factor
+
+    center_x1 = factor * radius_x * y1 / radius_y
+    center_y1 = -factor * radius_y * x1 / radius_x
+    center_x = cos_angle * center_x1 - sin_angle * center_y1 + (start[0] + end[0]) / 2.0
+    center_y = sin_angle * center_x1 + cos_angle * center_y1 + (start[1] + end[1]) / 2.0
+
+    start_angle = math.atan2((y1 - center_y1) / radius_y, (x1 - center_x1) / radius_x)
+    end_angle = math.atan2((-y1 - center_y1) / radius_y, (-x1 - center_x1) / radius_x)
+    delta = end_angle - start_angle
+    if sweep and delta < 0:
+        delta += 2.0 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2.0 * math.pi
+
+    #resolution segments per quarter turn, like a Blender circle
+    segments = max(1, int(math.ceil(abs(delta) / (math.pi / 2.0) * curve_resolution)))
+    angles = start_angle + delta * numpy.arange(1, segments + 1, dtype=numpy.float64) / segments
+
+    x = radius_x * numpy.cos(angles)
+    y = radius_y * numpy.sin(angles)
+    points = numpy.column_stack((cos_angle * x - sin_angle * y + center_x, sin_angle * x + cos_angle * y + center_y))
+    points[-1] = end
+    return [tuple(point) for point in points.tolist()]
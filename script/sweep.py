@@ -0,0 +1,202 @@
+"""
+Runs many parameter variants of create_eyeglasses_from_svg for one SVG.
+
+    python sweep.py glasses.svg output/ --grid '{"lens_bend": [0.2, 0.26], "bridge_width": [10, 12]}'
+    python sweep.py glasses.svg output/ --random '{"frame_bend": [0.3, 0.4]}' --samples 20 --seed 1
+
+Variants that share the SVG, desired_width, desired_thickness, pipeline and quality are grouped,
+so each Blender worker builds the extruded and reoriented SVG once for all of its variants.
+Variants of the bmesh pipeline only share the imported SVG, they are formed from it one by one.
+The results table is written to sweep.csv in the output directory.
+"""
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from batch import find_blender, run_blender_job
+
+#parameters of the stages every variant of a group shares
+BASE_PARAMETERS = ("desired_width", "desired_thickness", "pipeline", "quality")
+
+RESULTS_TABLE_NAME = "sweep.csv"
+
+
+def grid(**values):
+    """
+    :param values: the values to try for each parameter
+    :return: every combination of the values
+    """
+    names = sorted(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+
+def random_samples(ranges, count, seed=None):
+    """
+    :param ranges: the (low, high) range to sample each parameter from
+    :return: count variants sampled uniformly from the ranges
+    """
+    generator = random.Random(seed)
+    names = sorted(ranges)
+    return [dict((name, generator.uniform(*ranges[name])) for name in names) for _ in range(count)]
+
+
+def get_base_key(parameters):
+    return tuple((name, parameters.get(name)) for name in BASE_PARAMETERS)
+
+
+def plan_worker_jobs(svg_path, variants, output_directory, workers, importer="blender", output_format="stl"):
+    """
+    Groups the variants by their shared stages and splits the groups so that every worker has work.
+    :return: the jobs for run.py, each with the indices of the variants it runs
+    """
+    if not variants:
+        return []
+
+    groups = {}
+    for index, parameters in enumerate(variants):
+        groups.setdefault(get_base_key(parameters), []).append(index)
+
+    #split the largest groups until there are enough jobs, at the cost of rebuilding the shared stages
+    chunks = sorted(groups.values(), key=len, reverse=True)
+    while len(chunks) < workers and len(chunks[0]) > 1:
+        largest = chunks.pop(0)
+        middle = len(largest) // 2
+        chunks.extend((largest[:middle], largest[middle:]))
+        chunks.sort(key=len, reverse=True)
+
+    name = os.path.splitext(os.path.basename(svg_path))[0]
+    jobs = []
+    for chunk in chunks:
+        base_parameters = dict((key, value) for key, value in get_base_key(variants[chunk[0]]) if value is not None)
+        job_variants = []
+        for index in chunk:
+            parameters = dict((key, value) for key, value in variants[index].items() if key not in BASE_PARAMETERS)
+            output_path = os.path.join(output_directory, "{}_{:05d}.{}".format(name, index, output_format))
+            job_variants.append({"output": output_path, "parameters": parameters})
+
+        jobs.append(({"svg": os.path.abspath(svg_path),
+                      "importer": importer,
+                      "base_parameters": base_parameters,
+                      "variants": job_variants}, chunk))
+    return jobs
+
+
+def get_rows(variant_indices, variants, result):
+    """flattens the result of a worker job into one row per variant"""
+    #a job that failed before reaching its variants fails all of them
+    variant_results = result.get("variants") or [{"status": "failed", "error": result.get("error")}
+                                                 for _ in variant_indices]
+
+    rows = []
+    for index, variant_result in zip(variant_indices, variant_results):
+        mesh_stats = variant_result.get("mesh", {})
+        #the bmesh pipeline forms every variant from the SVG, it has no shared stages
+        shares_stages = variants[index].get("pipeline") != "bmesh"
+        row = {"variant": index,
+               "status": variant_result["status"],
+               "output": variant_result.get("output", ""),
+               "seconds": variant_result.get("seconds", ""),
+               #the shared stages, paid once per worker job
+               "shared_seconds": result.get("base_seconds", "") if shares_stages else "",
+               "shared_with": len(variant_indices) if shares_stages else 1,
+               "vertices": mesh_stats.get("vertices", ""),
+               "edges": mesh_stats.get("edges", ""),
+               "faces": mesh_stats.get("faces", ""),
+               "error": variant_result.get("error") or ""}
+        row.update(variants[index])
+        rows.append(row)
+    return rows
+
+
+def run_sweep(svg_path, variants, output_directory, workers=None, blender_path=None, importer="blender",
+              output_format="stl", timeout=None):
+    """
+    :param variants: list of create_eyeglasses_from_svg arguments, from grid or random_samples
+    :return: the results table, one row per variant in the order of the variants
+    """
+    blender_path = find_blender(blender_path)
+    workers = workers or os.cpu_count() or 1
+
+    if not os.path.isdir(output_directory):
+        os.makedirs(output_directory)
+
+    jobs = plan_worker_jobs(svg_path, variants, output_directory, workers, importer, output_format)
+
+    rows = []
+    work_directory = tempfile.mkdtemp(prefix="pince-nez-sweep-")
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [(executor.submit(run_blender_job, job, blender_path, work_directory,
+                                        "{:06d}".format(position), timeout), variant_indices)
+                       for position, (job, variant_indices) in enumerate(jobs)]
+
+            for future, variant_indices in futures:
+                rows.extend(get_rows(variant_indices, variants, future.result()))
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    rows.sort(key=lambda row: row["variant"])
+    write_results_table(rows, os.path.join(output_directory, RESULTS_TABLE_NAME))
+    return rows
+
+
+def write_results_table(rows, path):
+    columns = []
+    for row in rows:
+        for column in row:
+            if column not in columns:
+                columns.append(column)
+
+    with open(path, "w") as table_file:
+        writer = csv.DictWriter(table_file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Sweep create_eyeglasses_from_svg parameters for one SVG.")
+    parser.add_argument("svg")
+    parser.add_argument("output_directory")
+    parser.add_argument("--grid", default=None, help="JSON of the list of values to try for each parameter")
+    parser.add_argument("--random", default=None, help="JSON of the [low, high] range of each parameter")
+    parser.add_argument("--samples", type=int, default=10, help="number of random variants")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--parameters", default="{}", help="JSON of arguments shared by every variant")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--blender", default=None)
+    parser.add_argument("--format", default="stl", choices=["stl", "3mf", "obj"])
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--mesh-core", action="store_true")
+    return parser.parse_args(arguments)
+
+
+def main(arguments=None):
+    arguments = parse_arguments(arguments)
+
+    if arguments.grid:
+        variants = grid(**json.loads(arguments.grid))
+    elif arguments.random:
+        variants = random_samples(json.loads(arguments.random), arguments.samples, arguments.seed)
+    else:
+        variants = [{}]
+
+    shared_parameters = json.loads(arguments.parameters)
+    variants = [dict(shared_parameters, **variant) for variant in variants]
+
+    rows = run_sweep(arguments.svg, variants, arguments.output_directory, arguments.workers, arguments.blender,
+                     "mesh_core" if arguments.mesh_core else "blender", arguments.format, arguments.timeout)
+
+    failures = [row for row in rows if row["status"] != "ok"]
+    print("{} variants, {} failed".format(len(rows), len(failures)))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Detects frames that are their own mirror image about x=0.
+
+Only one lens area of a symmetric frame has to be formed, the other one is its mirror image.
+The mirror images of the vertices are looked up in a grid of cells as wide as the tolerance,
+the grid of welding.py, so the check is linear in the number of vertices.
+"""
+import numpy
+
+from welding import get_cell_keys, NEIGHBOUR_OFFSETS
+
+#the own cell and all 26 neighbouring cells, a mirror image is not a vertex of the mesh itself
+CELL_OFFSETS = [(0, 0, 0)] + NEIGHBOUR_OFFSETS + [(-x, -y, -z) for x, y, z in NEIGHBOUR_OFFSETS]
+
+
+def mirror_coordinates(coordinates):
+    """:return: the coordinates mirrored about x=0"""
+    mirrored_coordinates = numpy.array(coordinates, dtype=numpy.float64)
+    mirrored_coordinates[:, 0] *= -1.0
+    return mirrored_coordinates
+
+
+def is_mirror_symmetric(coordinates, tolerance):
+    """
+    :param coordinates: (vertices, 3) array, centered on x=0
+    :param tolerance: how far the mirror image of a vertex may be from the closest vertex
+    :return: whether the mirror image of every vertex has a vertex within the tolerance
+    """
+    coordinates = numpy.asarray(coordinates, dtype=numpy.float64)
+    mirrored_coordinates = mirror_coordinates(coordinates)
+    if not len(coordinates):
+        return True
+
+    #one grid for both, so the cells of the vertices and of their mirror images line up
+    keys, steps = get_cell_keys(numpy.concatenate((coordinates, mirrored_coordinates)), tolerance)
+    keys, mirrored_keys = keys[:len(coordinates)], keys[len(coordinates):]
+    order = numpy.argsort(keys, kind="mergesort")
+    sorted_keys = keys[order]
+
+    matched = numpy.zeros(len(coordinates), dtype=bool)
+    for offset in CELL_OFFSETS:
+        unmatched = numpy.flatnonzero(~matched)
+        if not len(unmatched):
+            break
+
+        neighbour_keys = mirrored_keys[unmatched] + numpy.dot(offset, steps)
+        starts = numpy.searchsorted(sorted_keys, neighbour_keys, side="left")
+        counts = numpy.searchsorted(sorted_keys, neighbour_keys, side="right") - starts
+
+        first = numpy.repeat(unmatched, counts)
+        ramp = numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        second = order[numpy.repeat(starts, counts) + ramp]
+
+        close = ((mirrored_coordinates[first] - coordinates[second]) ** 2).sum(axis=1) <= tolerance ** 2
+        matched[first[close]] = True
+
+    return bool(matched.all())
@@ -0,0 +1,400 @@
+"""
+Ear clipping triangulation of polygons with holes, without Blender.
+
+This follows the earcut algorithm: holes are bridged into the outer ring,
+then ears are clipped from the resulting ring, with fallbacks for self touching rings.
+"""
+
+
+class Node(object):
+    """a vertex of the ring being clipped"""
+
+    __slots__ = ("index", "x", "y", "prev", "next", "steiner")
+
+    def __init__(self, index, x, y):
+        self.index = index
+        self.x = x
+        self.y = y
+        self.prev = None
+        self.next = None
+        self.steiner = False
+
+
+def triangulate_polygon(outer_ring, holes=()):
+    """
+    :param outer_ring: sequence of (x, y) points, without repeating the first point
+    :param holes: sequences of (x, y) points inside the outer ring
+    :return: list of (a, b, c) triangles, indices count through the outer ring then each hole in turn
+    """
+    coordinates = [tuple(point[:2]) for point in outer_ring]
+    hole_starts = []
+    for hole in holes:
+        hole_starts.append(len(coordinates))
+        coordinates.extend(tuple(point[:2]) for point in hole)
+
+    triangles = []
+    outer_end = hole_starts[0] if hole_starts else len(coordinates)
+    outer_node = linked_list(coordinates, 0, outer_end, True)
+    if outer_node is None or outer_node.next is outer_node.prev:
+        return triangles
+
+    if hole_starts:
+        outer_node = eliminate_holes(coordinates, hole_starts, outer_node)
+
+    earcut_linked(outer_node, triangles, 0)
+    return triangles
+
+
+def signed_area(coordinates, start, end):
+    total = 0.0
+    j = end - 1
+    for i in range(start, end):
+        total += (coordinates[j][0] - coordinates[i][0]) * (coordinates[i][1] + coordinates[j][1])
+        j = i
+    return total
+
+
+def linked_list(coordinates, start, end, clockwise):
+    last = None
+    if clockwise == (signed_area(coordinates, start, end) > 0):
+        indices = range(start, end)
+    else:
+        indices = range(end - 1, start - 1, -1)
+
+    for index in indices:
+        last = insert_node(index, coordinates[index][0], coordinates[index][1], last)
+
+    if last is not None and equals(last, last.next):
+        remove_node(last)
+        last = last.next
+
+    return last
+
+
+def insert_node(index, x, y, last):
+    node = Node(index, x, y)
+    if last is None:
+        node.prev = node
+        node.next = node
+    else:
+        node.next = last.next
+        node.prev = last
+        last.next.prev = node
+        last.next = node
+    return node
+
+
+def remove_node(node):
+    node.next.prev = node.prev
+    node.prev.next = node.next
+
+
+def area(p, q, r):
+    return (q.y - p.y) * (r.x - q.x) - (q.x - p.x) * (r.y - q.y)
+
+
+def equals(p, q):
+    return p.x == q.x and p.y == q.y
+
+
+def filter_points(start, end=None):
+    """removes duplicate and collinear points"""
+    if start is None:
+        return start
+    if end is None:
+        end = start
+
+    node = start
+    while True:
+        again = False
+        if not node.steiner and (equals(node, node.next) or area(node.prev, node, node.next) == 0):
+            remove_node(node)
+            node = end = node.prev
+            if node is node.next:
+                break
+            again = True
+        else:
+            node = node.next
+
+        if not again and node is end:
+            break
+
+    return end
+
+
+def earcut_linked(ear, triangles, attempt):
+    if ear is None:
+        return
+
+    stop = ear
+    while ear.prev is not ear.next:
+        prev_node = ear.prev
+        next_node = ear.next
+
+        if is_ear(ear):
+            triangles.append((prev_node.index, ear.index, next_node.index))
+            remove_node(ear)
+            ear = next_node.next
+            stop = next_node.next
+            continue
+
+        ear = next_node
+
+        #went all the way around without finding an ear
+        if ear is stop:
+            if attempt == 0:
+                earcut_linked(filter_points(ear), triangles, 1)
+            elif attempt == 1:
+                ear = cure_local_intersections(filter_points(ear), triangles)
+                earcut_linked(ear, triangles, 2)
+            elif attempt == 2:
+                split_earcut(ear, triangles)
+            break
+
+
+def is_ear(ear):
+    a, b, c = ear.prev, ear, ear.next
+    if area(a, b, c) >= 0:
+        #reflex, can't be an ear
+        return False
+
+    min_x, max_x = min(a.x, b.x, c.x), max(a.x, b.x, c.x)
+    min_y, max_y = min(a.y, b.y, c.y), max(a.y, b.y, c.y)
+
+    node = c.next
+    while node is not a:
+        if (min_x <= node.x <= max_x and min_y <= node.y <= max_y and
+                point_in_triangle(a.x, a.y, b.x, b.y, c.x, c.y, node.x, node.y) and
+                area(node.prev, node, node.next) >= 0):
+            return False
+        node = node.next
+
+    return True
+
+
+def cure_local_intersections(start, triangles):
+    node = start
+    while True:
+        a = node.prev
+        b = node.next.next
+
+        if not equals(a, b) and intersects(a, node, node.next, b) and locally_inside(a, b) and locally_inside(b, a):
+            triangles.append((a.index, node.index, b.index))
+            remove_node(node)
+            remove_node(node.next)
+            node = start = b
+
+        node = node.next
+        if node is start:
+            break
+
+    return filter_points(node)
+
+
+def split_earcut(start, triangles):
+    """splits the ring along a valid diagonal and triangulates both halves"""
+    a = start
+    while True:
+        b = a.next.next
+        while b is not a.prev:
+            if a.index != b.index and is_valid_diagonal(a, b):
+                c = split_polygon(a, b)
+                a = filter_points(a, a.next)
+                c = filter_points(c, c.next)
+                earcut_linked(a, triangles, 0)
+                earcut_linked(c, triangles, 0)
+                return
+            b = b.next
+
+        a = a.next
+        if a is start:
+            return
+
+
+def eliminate_holes(coordinates, hole_starts, outer_node):
+    leftmost_nodes = []
+    for position, start in enumerate(hole_starts):
+        end = hole_starts[position + 1] if position + 1 < len(hole_starts) else len(coordinates)
+        hole_node = linked_list(coordinates, start, end, False)
+        if hole_node is None:
+            continue
+        if hole_node is hole_node.next:
+            hole_node.steiner = True
+        leftmost_nodes.append(get_leftmost(hole_node))
+
+    leftmost_nodes.sort(key=lambda node: node.x)
+    for hole_node in leftmost_nodes:
+        outer_node = eliminate_hole(hole_node, outer_node)
+
+    return outer_node
+
+
+def eliminate_hole(hole, outer_node):
+    bridge = find_hole_bridge(hole, outer_node)
+    if bridge is None:
+        return outer_node
+
+    bridge_reverse = split_polygon(bridge, hole)
+    filter_points(bridge_reverse, bridge_reverse.next)
+    return filter_points(bridge, bridge.next)
+
+
+def find_hole_bridge(hole, outer_node):
+    """finds a vertex of the outer ring that can be joined to the hole without crossing an edge"""
+    node = outer_node
+    hole_x, hole_y = hole.x, hole.y
+    closest_x = float("-inf")
+    bridge = None
+
+    #segment of the outer ring left of the hole, along a ray from the hole
+    while True:
+        if node.next.y <= hole_y <= node.y and node.next.y != node.y:
+            x = node.x + (hole_y - node.y) * (node.next.x - node.x) / (node.next.y - node.y)
+            if hole_x >= x > closest_x:
+                closest_x = x
+                bridge = node if node.x < node.next.x else node.next
+                if x == hole_x:
+                    return bridge
+        node = node.next
+        if node is outer_node:
+            break
+
+    if bridge is None:
+        return None
+
+    #look for points inside the triangle of the hole, the segment intersection and its endpoint
+    stop = bridge
+    bridge_x, bridge_y = bridge.x, bridge.y
+    smallest_tangent = float("inf")
+
+    node = bridge
+    while True:
+        if hole_x >= node.x >= bridge_x and hole_x != node.x and point_in_triangle(
+                hole_x if hole_y < bridge_y else closest_x, hole_y,
+                bridge_x, bridge_y,
+                closest_x if hole_y < bridge_y else hole_x, hole_y,
+                node.x, node.y):
+            tangent = abs(hole_y - node.y) / (hole_x - node.x)
+            if locally_inside(node, hole) and (tangent < smallest_tangent or (
+                    tangent == smallest_tangent and (node.x > bridge.x or (
+                        node.x == bridge.x and sector_contains_sector(bridge, node))))):
+                bridge = node
+                smallest_tangent = tangent
+
+        node = node.next
+        if node is stop:
+            break
+
+    return bridge
+
+
+def sector_contains_sector(m, p):
+    return area(m.prev, m, p.prev) < 0 and area(p.next, m, m.next) < 0
+
+
+def get_leftmost(start):
+    node = start
+    leftmost = start
+    while True:
+        if node.x < leftmost.x or (node.x == leftmost.x and node.y < leftmost.y):
+            leftmost = node
+        node = node.next
+        if node is start:
+            return leftmost
+
+
+def point_in_triangle(ax, ay, bx, by, cx, cy, px, py):
+    return ((cx - px) * (ay - py) >= (ax - px) * (cy - py) and
+            (ax - px) * (by - py) >= (bx - px) * (ay - py) and
+            (bx - px) * (cy - py) >= (cx - px) * (by - py))
+
+
+def is_valid_diagonal(a, b):
+    if a.next.index == b.index or a.prev.index == b.index or intersects_polygon(a, b):
+        return False
+
+    #does not create opposite-facing sectors
+    if (locally_inside(a, b) and locally_inside(b, a) and middle_inside(a, b) and
+            (area(a.prev, a, b.prev) != 0 or area(a, b.prev, b) != 0)):
+        return True
+
+    #special zero-length case
+    return equals(a, b) and area(a.prev, a, a.next) > 0 and area(b.prev, b, b.next) > 0
+
+
+def sign(value):
+    return (value > 0) - (value < 0)
+
+
+def on_segment(p, q, r):
+    return min(p.x, r.x) <= q.x <= max(p.x, r.x) and min(p.y, r.y) <= q.y <= max(p.y, r.y)
+
+
+def intersects(p1, q1, p2, q2):
+    o1 = sign(area(p1, q1, p2))
+    o2 = sign(area(p1, q1, q2))
+    o3 = sign(area(p2, q2, p1))
+    o4 = sign(area(p2, q2, q1))
+
+    if o1 != o2 and o3 != o4:
+        return True
+
+    return ((o1 == 0 and on_segment(p1, p2, q1)) or
+            (o2 == 0 and on_segment(p1, q2, q1)) or
+            (o3 == 0 and on_segment(p2, p1, q2)) or
+            (o4 == 0 and on_segment(p2, q1, q2)))
+
+
+def intersects_polygon(a, b):
+    node = a
+    while True:
+        if (node.index != a.index and node.next.index != a.index and
+                node.index != b.index and node.next.index != b.index and
+                intersects(node, node.next, a, b)):
+            return True
+        node = node.next
+        if node is a:
+            return False
+
+
+def locally_inside(a, b):
+    if area(a.prev, a, a.next) < 0:
+        return area(a, b, a.next) >= 0 and area(a, a.prev, b) >= 0
+    return area(a, b, a.prev) < 0 or area(a, a.next, b) < 0
+
+
+def middle_inside(a, b):
+    node = a
+    inside = False
+    middle_x = (a.x + b.x) / 2.0
+    middle_y = (a.y + b.y) / 2.0
+
+    while True:
+        if ((node.y > middle_y) != (node.next.y > middle_y) and node.next.y != node.y and
+                middle_x < (node.next.x - node.x) * (middle_y - node.y) / (node.next.y - node.y) + node.x):
+            inside = not inside
+        node = node.next
+        if node is a:
+            return inside
+
+
+def split_polygon(a, b):
+    """links a and b with a diagonal, splitting the ring in two, returns a node of the second ring"""
+    a2 = Node(a.index, a.x, a.y)
+    b2 = Node(b.index, b.x, b.y)
+    a_next = a.next
+    b_prev = b.prev
+
+    a.next = b
+    b.prev = a
+
+    a2.next = a_next
+    a_next.prev = a2
+
+    b2.next = a2
+    a2.prev = b2
+
+    b_prev.next = b2
+    b2.prev = b_prev
+
+    return b2
@@ -0,0 +1,118 @@
+"""
+Bulk access to the vertices of a Blender mesh as NumPy arrays.
+
+Reading vertex.co one vertex at a time goes through the Python API for every vertex,
+foreach_get and foreach_set copy a whole attribute in a single call.
+The mesh has to be in OBJECT mode, edit mode changes are not synced to the mesh data.
+"""
+import numpy
+
+
+def get_vertex_coordinates(mesh, dtype=numpy.float64):
+    """
+    :return: (number of vertices, 3) array of the local vertex coordinates
+    """
+    #Blender stores single precision, float64 keeps comparisons identical to vertex.co in python,
+    #float32 copies the coordinates as they are stored
+    coordinates = numpy.empty(len(mesh.vertices) * 3, dtype=dtype)
+    mesh.vertices.foreach_get("co", coordinates)
+    return coordinates.reshape(-1, 3)
+
+
+def set_vertex_coordinates(mesh, coordinates):
+    mesh.vertices.foreach_set("co", numpy.ascontiguousarray(coordinates, dtype=numpy.float64).ravel())
+    mesh.update()
+
+
+def get_edge_vertices(mesh):
+    """
+    :return: (number of edges, 2) array of the vertex indices of every edge
+    """
+    edges = numpy.empty(len(mesh.edges) * 2, dtype=numpy.int32)
+    mesh.edges.foreach_get("vertices", edges)
+    return edges.reshape(-1, 2)
+
+
+def get_polygon_loops(mesh):
+    """
+    :return: the first loop and the number of loops of every polygon, and the vertex index of every loop
+    """
+    loop_starts = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    loop_totals = numpy.empty(len(mesh.polygons), dtype=numpy.int32)
+    mesh.polygons.foreach_get("loop_start", loop_starts)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+
+    loop_vertices = numpy.empty(len(mesh.loops), dtype=numpy.int32)
+    mesh.loops.foreach_get("vertex_index", loop_vertices)
+    return loop_starts, loop_totals, loop_vertices
+
+
+def get_polygon_triangles(mesh):
+    """
+    :return: (number of triangles, 3) array of vertex indices, every polygon split into a fan of triangles
+    """
+    loop_starts, loop_totals, loop_vertices = get_polygon_loops(mesh)
+
+    #the k-th triangle of a polygon is its first corner with corners k + 1 and k + 2
+    triangle_counts = loop_totals - 2
+    first_loops = numpy.repeat(loop_starts, triangle_counts)
+    corners = numpy.arange(triangle_counts.sum()) - numpy.repeat(numpy.cumsum(triangle_counts) - triangle_counts,
+                                                                 triangle_counts)
+
+    triangles = numpy.empty((len(first_loops), 3), dtype=numpy.int32)
+    triangles[:, 0] = loop_vertices[first_loops]
+    triangles[:, 1] = loop_vertices[first_loops + corners + 1]
+    triangles[:, 2] = loop_vertices[first_loops + corners + 2]
+    return triangles
+
+
+def get_vertex_normals(mesh):
+    """
+    :return: (number of vertices, 3) array of the local vertex normals, recalculated first
+    """
+    mesh.calc_normals()
+    normals = numpy.empty(len(mesh.vertices) * 3, dtype=numpy.float64)
+    mesh.vertices.foreach_get("normal", normals)
+    return normals.reshape(-1, 3)
+
+
+def get_vertex_selection(mesh):
+    selection = numpy.empty(len(mesh.vertices), dtype=bool)
+    mesh.vertices.foreach_get("select", selection)
+    return selection
+
+
+def set_vertex_selection(mesh, selection):
+    mesh.vertices.foreach_set("select", numpy.ascontiguousarray(selection, dtype=bool))
+
+
+def set_mesh_polygons(mesh, vertices, loop_totals, loop_vertices):
+    """
+    fills an empty mesh with polygons of any size
+    :param loop_totals: the number of corners of every polygon
+    :param loop_vertices: the vertex indices of the corners of all polygons, one polygon after the other
+    """
+    #in the types Blender stores, foreach_set only copies buffers of those in one block
+    vertices = numpy.ascontiguousarray(vertices, dtype=numpy.float32).reshape(-1, 3)
+    loop_totals = numpy.ascontiguousarray(loop_totals, dtype=numpy.int32)
+    loop_vertices = numpy.ascontiguousarray(loop_vertices, dtype=numpy.int32)
+
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set("co", vertices.ravel())
+
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set("vertex_index", loop_vertices)
+
+    mesh.polygons.add(len(loop_totals))
+    mesh.polygons.foreach_set("loop_start", (numpy.cumsum(loop_totals) - loop_totals).astype(numpy.int32))
+    mesh.polygons.foreach_set("loop_total", loop_totals)
+
+    mesh.update(calc_edges=True)
+
+
+def set_mesh_triangles(mesh, vertices, faces):
+    """
+    fills an empty mesh with triangles, such as the arrays of a mesh_core.ArrayMesh
+    """
+    faces = numpy.ascontiguousarray(faces, dtype=numpy.int32).reshape(-1, 3)
+    set_mesh_polygons(mesh, vertices, numpy.full(len(faces), 3, dtype=numpy.int32), faces.ravel())
@@ -0,0 +1,98 @@
+"""
+Welds vertices closer than a merge distance, the counterpart of remove_doubles.
+
+Vertices are bucketed into a grid of cells as wide as the merge distance,
+so a vertex only has to be compared with the vertices of its own and the 26 neighbouring cells.
+Like remove_doubles, every vertex merges into the lowest indexed vertex within the merge distance
+that is kept itself, and vertices that are merged into are never merged further.
+"""
+import numpy
+
+from mesh_core import ArrayMesh
+
+DEFAULT_MERGE_DISTANCE = 0.0001
+
+#half of the neighbouring cells, the other half is covered by visiting each pair from both ends
+NEIGHBOUR_OFFSETS = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1) if (x, y, z) > (0, 0, 0)]
+
+
+def get_cell_keys(coordinates, merge_distance):
+    """
+    :return: an integer key of the cell of every vertex and the key step of one cell along each axis
+    """
+    cells = numpy.floor(coordinates / merge_distance).astype(numpy.int64)
+    #one empty cell of padding on every side, so that neighbour keys never wrap around
+    cells -= cells.min(axis=0) - 1
+    spans = cells.max(axis=0) + 2
+
+    if float(spans[0]) * float(spans[1]) * float(spans[2]) >= 2 ** 62:
+        raise ValueError("merge distance {} is too small for the size of the mesh".format(merge_distance))
+
+    steps = numpy.array([spans[1] * spans[2], spans[2], 1], dtype=numpy.int64)
+    return cells.dot(steps), steps
+
+
+def find_close_pairs(coordinates, merge_distance):
+    """
+    :return: (pairs, 2) array of the vertex indices closer than the merge distance, lower index first
+    """
+    keys, steps = get_cell_keys(coordinates, merge_distance)
+    order = numpy.argsort(keys, kind="mergesort")
+    sorted_keys = keys[order]
+
+    pairs = []
+    for offset in [(0, 0, 0)] + NEIGHBOUR_OFFSETS:
+        neighbour_keys = keys + numpy.dot(offset, steps)
+        starts = numpy.searchsorted(sorted_keys, neighbour_keys, side="left")
+        counts = numpy.searchsorted(sorted_keys, neighbour_keys, side="right") - starts
+
+        #expand every vertex into one candidate pair per vertex of the neighbouring cell
+        first = numpy.repeat(numpy.arange(len(keys)), counts)
+        ramp = numpy.arange(len(first)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        second = order[numpy.repeat(starts, counts) + ramp]
+
+        if offset == (0, 0, 0):
+            same_cell = first < second
+            first, second = first[same_cell], second[same_cell]
+
+        close = ((coordinates[first] - coordinates[second]) ** 2).sum(axis=1) <= merge_distance ** 2
+        pairs.append(numpy.column_stack((first[close], second[close])))
+
+    pairs = numpy.concatenate(pairs)
+    pairs.sort(axis=1)
+    return pairs
+
+
+def find_weld_targets(coordinates, merge_distance=DEFAULT_MERGE_DISTANCE):
+    """
+    :return: the index of the vertex every vertex merges into, its own index if it is kept
+    """
+    targets = numpy.arange(len(coordinates))
+    if len(coordinates) < 2:
+        return targets
+
+    pairs = find_close_pairs(coordinates, merge_distance)
+
+    #by the merged vertex and then the target, the status of a lower index is final when it is looked at
+    pairs = pairs[numpy.lexsort((pairs[:, 0], pairs[:, 1]))]
+    for target, merged in pairs.tolist():
+        if targets[merged] == merged and targets[target] == target:
+            targets[merged] = target
+
+    return targets
+
+
+def weld_array_mesh(array_mesh, merge_distance=DEFAULT_MERGE_DISTANCE):
+    """
+    :return: the welded mesh_core.ArrayMesh and the number of vertices merged,
+             triangles that collapse are removed
+    """
+    targets = find_weld_targets(array_mesh.vertices, merge_distance)
+    kept = targets == numpy.arange(len(targets))
+
+    new_indices = numpy.cumsum(kept) - 1
+    faces = new_indices[targets][array_mesh.faces]
+    collapsed = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 2] == faces[:, 0])
+
+    welded_mesh = ArrayMesh(array_mesh.vertices[kept], faces[~collapsed])
+    return welded_mesh, int(len(targets) - kept.sum())
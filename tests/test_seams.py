@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "script"))
+
+import seams
+
+
+def get_quads_meeting_at_a_corner(z=0.0):
+    """
+    :return: the vertices, loop totals and loop vertices of two quads facing +z which share only one corner
+    """
+    vertices = numpy.array([[0, 0, z], [1, 0, z], [1, 1, z], [0, 1, z], [2, 1, z], [2, 2, z], [1, 2, z]], dtype=float)
+    return vertices, numpy.array([4, 4]), numpy.array([0, 1, 2, 3, 2, 4, 5, 6])
+
+
+def test_boundaries_touching_at_a_corner_are_split():
+    vertices, loop_totals, loop_vertices = get_quads_meeting_at_a_corner()
+
+    boundary_loops = seams.get_boundary_loops(vertices, loop_totals, loop_vertices)
+
+    assert sorted(sorted(boundary_loop.tolist()) for boundary_loop in boundary_loops) == [[0, 1, 2, 3], [2, 4, 5, 6]]
+
+
+def test_join_meshes_with_boundaries_touching_at_a_corner():
+    vertices, loop_totals, loop_vertices = get_quads_meeting_at_a_corner()
+    other_vertices, other_loop_totals, other_loop_vertices = get_quads_meeting_at_a_corner(z=1.0)
+    other_loop_vertices = numpy.concatenate((other_loop_vertices[3::-1], other_loop_vertices[:3:-1]))
+
+    coordinates, loop_totals, loop_vertices = seams.join_meshes(vertices, loop_totals, loop_vertices,
+                                                                other_vertices, other_loop_totals, other_loop_vertices)
+
+    assert len(coordinates) == 7
+    numpy.testing.assert_allclose(coordinates[:, 2], 0.5)
+    assert len(seams.get_boundary_edges(loop_totals, loop_vertices)[0]) == 0